@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+
+
+class ActivityStats:
+    """房间消息活跃度计数：按发送者、事件类型与一天中的小时累计。
+
+    只保存计数器，内存占用与扫描的事件数无关，可按房间统计后 merge() 汇总。
+    """
+
+    __slots__ = ("events", "senders", "types", "hours", "first_ts", "last_ts")
+
+    def __init__(self):
+        self.events = 0
+        self.senders: Counter[str] = Counter()
+        self.types: Counter[str] = Counter()
+        self.hours = [0] * 24
+        self.first_ts: float | None = None
+        self.last_ts: float | None = None
+
+    def add(self, event: dict) -> None:
+        self.events += 1
+        self.senders[str(event.get("sender") or "?")] += 1
+        self.types[str(event.get("type") or "?")] += 1
+        ts = event.get("origin_server_ts")
+        if isinstance(ts, (int, float)):
+            self.hours[time.localtime(ts / 1000).tm_hour] += 1
+            if self.first_ts is None or ts < self.first_ts:
+                self.first_ts = ts
+            if self.last_ts is None or ts > self.last_ts:
+                self.last_ts = ts
+
+    def merge(self, other: ActivityStats) -> None:
+        self.events += other.events
+        self.senders.update(other.senders)
+        self.types.update(other.types)
+        self.hours = [a + b for a, b in zip(self.hours, other.hours)]
+        for ts in (other.first_ts, other.last_ts):
+            if ts is None:
+                continue
+            if self.first_ts is None or ts < self.first_ts:
+                self.first_ts = ts
+            if self.last_ts is None or ts > self.last_ts:
+                self.last_ts = ts
+
+    def render_hours(self, width: int = 20) -> list[str]:
+        """按小时输出条形图，峰值占满 width 个字符。"""
+        peak = max(self.hours) or 1
+        return [
+            f"{hour:02d}时 {'█' * round(count * width / peak):<{width}} {count}"
+            for hour, count in enumerate(self.hours)
+            if count
+        ]
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from astrbot.api import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    actor TEXT NOT NULL DEFAULT '',
+    platform_id TEXT NOT NULL DEFAULT '',
+    command TEXT NOT NULL,
+    target_user TEXT NOT NULL DEFAULT '',
+    target_room TEXT NOT NULL DEFAULT '',
+    params TEXT NOT NULL DEFAULT '{}',
+    outcome TEXT NOT NULL,
+    latency_ms REAL NOT NULL DEFAULT 0,
+    detail TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit (ts);
+CREATE INDEX IF NOT EXISTS idx_audit_actor_ts ON audit (actor, ts);
+CREATE INDEX IF NOT EXISTS idx_audit_user_ts ON audit (target_user, ts);
+CREATE INDEX IF NOT EXISTS idx_audit_room_ts ON audit (target_room, ts);
+CREATE INDEX IF NOT EXISTS idx_audit_command_ts ON audit (command, ts);
+"""
+
+_COLUMNS = (
+    "ts",
+    "actor",
+    "platform_id",
+    "command",
+    "target_user",
+    "target_room",
+    "params",
+    "outcome",
+    "latency_ms",
+    "detail",
+)
+
+
+class AuditLog:
+    """管理操作审计日志（SQLite WAL）。
+
+    record() 只把记录放入队列，由后台任务批量写入，不阻塞命令处理；
+    查询在线程中执行，按 actor / target_user / target_room / command + ts 索引过滤。
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        retention_days: float = 180.0,
+        queue_size: int = 10000,
+        batch_size: int = 200,
+    ):
+        self.db_path = Path(db_path)
+        self.retention_days = max(0.0, float(retention_days or 0))
+        self.batch_size = max(1, int(batch_size))
+        self._queue: asyncio.Queue[tuple] = asyncio.Queue(maxsize=max(1, queue_size))
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._writer: asyncio.Task | None = None
+        self.dropped = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _prune_sync(self) -> int:
+        if not self.retention_days:
+            return 0
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute("DELETE FROM audit WHERE ts < ?", (cutoff,))
+            conn.commit()
+            return cursor.rowcount
+
+    async def start(self) -> None:
+        if self._writer is not None:
+            return
+        pruned = await asyncio.to_thread(self._prune_sync)
+        if pruned:
+            logger.info(f"[MatrixAdmin] 已清理 {pruned} 条过期审计记录")
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def record(
+        self,
+        command: str,
+        outcome: str,
+        actor: str = "",
+        platform_id: str = "",
+        target_user: str = "",
+        target_room: str = "",
+        params: dict | None = None,
+        latency: float = 0.0,
+        detail: str = "",
+    ) -> None:
+        row = (
+            time.time(),
+            actor or "",
+            platform_id or "",
+            command,
+            target_user or "",
+            target_room or "",
+            json.dumps(params or {}, ensure_ascii=False, default=str),
+            outcome,
+            round(latency * 1000, 1),
+            (detail or "")[:500],
+        )
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(
+                    f"[MatrixAdmin] 审计队列已满，累计丢弃 {self.dropped} 条"
+                )
+
+    def _insert_sync(self, rows: list[tuple]) -> None:
+        placeholders = ",".join("?" for _ in _COLUMNS)
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                f"INSERT INTO audit ({','.join(_COLUMNS)}) VALUES ({placeholders})",
+                rows,
+            )
+            conn.commit()
+
+    def _drain(self, first: tuple) -> list[tuple]:
+        rows = [first]
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return rows
+
+    async def _write_loop(self) -> None:
+        while True:
+            rows = self._drain(await self._queue.get())
+            try:
+                await asyncio.to_thread(self._insert_sync, rows)
+            except Exception as exc:
+                logger.error(f"[MatrixAdmin] 写入审计日志失败：{exc}")
+
+    def _query_sync(
+        self,
+        user: str = "",
+        room: str = "",
+        actor: str = "",
+        command: str = "",
+        since: float | None = None,
+        until: float | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        clauses: list[str] = []
+        args: list = []
+        if user:
+            # 用户既可能是操作者也可能是被操作对象，两列各有索引
+            clauses.append("(target_user = ? OR actor = ?)")
+            args += [user, user]
+        if room:
+            clauses.append("target_room = ?")
+            args.append(room)
+        if actor:
+            clauses.append("actor = ?")
+            args.append(actor)
+        if command:
+            clauses.append("command = ?")
+            args.append(command)
+        if since is not None:
+            clauses.append("ts >= ?")
+            args.append(since)
+        if until is not None:
+            clauses.append("ts <= ?")
+            args.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {','.join(_COLUMNS)} FROM audit {where} ORDER BY ts DESC LIMIT ?"
+        args.append(max(1, int(limit)))
+        with self._lock:
+            rows = self._connect().execute(sql, args).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    async def query(self, **filters) -> list[dict]:
+        return await asyncio.to_thread(self._query_sync, **filters)
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        rows: list[tuple] = []
+        while not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        try:
+            if rows:
+                await asyncio.to_thread(self._insert_sync, rows)
+        finally:
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+
+    def record_command(self, command: str, seconds: float, ok: bool, trace) -> None:
+        """根据命令 trace 记录一条审计：目标用户优先取命令解析后的完整 ID，
+        其次从参数中提取；结果取 trace.outcome（含命令自行回复的失败）。"""
+        event = getattr(trace, "event", None)
+        params = dict(getattr(trace, "params", None) or {})
+        target_user = str(getattr(trace, "target_user", "") or "")
+        target_room = ""
+        for value in params.values():
+            if not isinstance(value, str):
+                continue
+            for token in value.split():
+                if ":" not in token:
+                    continue
+                if token.startswith("@") and not target_user:
+                    target_user = token
+                elif token[:1] in ("!", "#") and not target_room:
+                    target_room = token
+        actor = ""
+        platform_id = ""
+        if event is not None:
+            actor = str(event.get_sender_id() or "")
+            platform_id = str(event.get_platform_id() or "")
+            if not target_room:
+                target_room = str(event.get_session_id() or "")
+        detail = str(getattr(trace, "last_output", "") or "").strip()
+        outcome = getattr(trace, "outcome", None) or ("ok" if ok else "error")
+        self.record(
+            command,
+            outcome,
+            actor=actor,
+            platform_id=platform_id,
+            target_user=target_user,
+            target_room=target_room,
+            params={k: str(v)[:200] for k, v in params.items()},
+            latency=seconds,
+            detail=detail.splitlines()[0] if detail else "",
+        )
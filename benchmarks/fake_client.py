@@ -0,0 +1,335 @@
+"""
+进程内的 Matrix 客户端替身，供离线基准测试使用。
+
+只实现 admin 命令实际调用到的接口，返回格式与适配器客户端保持一致；
+每次调用都会计数，并按配置注入延迟、抖动与限流。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+
+class FakeMatrixError(Exception):
+    """模拟服务器错误，文本格式与适配器抛出的异常一致（含状态码与 errcode）。"""
+
+
+@dataclass
+class FakeDataset:
+    rooms: int = 50
+    members_per_room: int = 200
+    messages_per_room: int = 1000
+    bot_message_ratio: float = 0.2
+    moderators_per_room: int = 3
+    knock_room_every: int = 5
+    knocks_per_room: int = 2
+    server_name: str = "bench.local"
+
+    @property
+    def bot_user_id(self) -> str:
+        return f"@bot:{self.server_name}"
+
+    @property
+    def space_id(self) -> str:
+        return f"!space:{self.server_name}"
+
+    def room_id(self, index: int) -> str:
+        return f"!room{index}:{self.server_name}"
+
+    def user_id(self, index: int) -> str:
+        return f"@user{index}:{self.server_name}"
+
+
+class FakeMatrixClient:
+    """按需生成数据集的 Matrix 客户端替身。
+
+    latency / jitter 单位为秒；rate 为每秒允许的请求数（0 表示不限流），
+    burst 为令牌桶容量。rate_limit_errors 为 True 时直接抛出 M_LIMIT_EXCEEDED，
+    否则像适配器内部重试一样等待令牌。
+    """
+
+    def __init__(
+        self,
+        dataset: FakeDataset | None = None,
+        latency: float = 0.02,
+        jitter: float = 0.01,
+        rate: float = 0.0,
+        burst: int = 10,
+        rate_limit_errors: bool = False,
+        seed: int = 0,
+    ):
+        self.dataset = dataset or FakeDataset()
+        self.user_id = self.dataset.bot_user_id
+        # 最新一条消息的时间戳为创建时刻，之后每条往前一分钟
+        self.now_ms = int(time.time() * 1000)
+        self.latency = max(0.0, float(latency))
+        self.jitter = max(0.0, float(jitter))
+        self.rate = max(0.0, float(rate))
+        self.burst = max(1, int(burst))
+        self.rate_limit_errors = rate_limit_errors
+        self.calls: Counter[str] = Counter()
+        self.throttled = 0
+        self.redacted: set[str] = set()
+        self._random = random.Random(seed)
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._room_index = {
+            self.dataset.room_id(i): i for i in range(self.dataset.rooms)
+        }
+
+    # ========== 调用计数 / 延迟 / 限流 ==========
+
+    def reset_stats(self) -> None:
+        self.calls.clear()
+        self.throttled = 0
+        self.redacted.clear()
+
+    def _take_token(self) -> float:
+        """消耗一个令牌，返回需要等待的秒数（0 表示立即放行）。"""
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._refilled_at) * self.rate
+        )
+        self._refilled_at = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return 0.0
+        wait = (1.0 - self._tokens) / self.rate
+        self._tokens -= 1.0
+        return wait
+
+    async def _call(self, method: str) -> None:
+        self.calls[method] += 1
+        if self.rate:
+            wait = self._take_token()
+            if wait > 0:
+                self.throttled += 1
+                if self.rate_limit_errors:
+                    self._tokens += 1.0
+                    raise FakeMatrixError(
+                        "429 M_LIMIT_EXCEEDED: Too Many Requests "
+                        f"(retry_after_ms={int(wait * 1000) + 1})"
+                    )
+                await asyncio.sleep(wait)
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(0.0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _room(self, room_id: str) -> int:
+        index = self._room_index.get(room_id)
+        if index is None:
+            raise FakeMatrixError(f"404 M_NOT_FOUND: Unknown room {room_id}")
+        return index
+
+    def _is_knock_room(self, index: int) -> bool:
+        every = self.dataset.knock_room_every
+        return bool(every) and index % every == 0
+
+    # ========== 数据生成 ==========
+
+    def _member_events(self, index: int) -> list[dict]:
+        ds = self.dataset
+        events = [
+            {
+                "type": "m.room.member",
+                "state_key": ds.bot_user_id,
+                "sender": ds.bot_user_id,
+                "content": {"membership": "join", "displayname": "bot"},
+            }
+        ]
+        for n in range(ds.members_per_room):
+            user_id = ds.user_id(n)
+            events.append(
+                {
+                    "type": "m.room.member",
+                    "state_key": user_id,
+                    "sender": user_id,
+                    "content": {
+                        "membership": "join",
+                        "displayname": f"user {n}",
+                        "avatar_url": f"mxc://{ds.server_name}/avatar{n}",
+                    },
+                }
+            )
+        if self._is_knock_room(index):
+            for n in range(ds.knocks_per_room):
+                user_id = f"@knocker{n}:{ds.server_name}"
+                events.append(
+                    {
+                        "type": "m.room.member",
+                        "state_key": user_id,
+                        "sender": user_id,
+                        "content": {"membership": "knock", "reason": "let me in"},
+                    }
+                )
+        return events
+
+    def _power_levels(self) -> dict:
+        ds = self.dataset
+        users = {ds.bot_user_id: 100}
+        for n in range(min(ds.moderators_per_room, ds.members_per_room)):
+            users[ds.user_id(n)] = 50
+        return {"users": users, "users_default": 0, "state_default": 50}
+
+    def _state_content(self, index: int, event_type: str) -> dict | None:
+        ds = self.dataset
+        if event_type == "m.room.create":
+            return {"creator": ds.bot_user_id, "room_version": "10"}
+        if event_type == "m.room.name":
+            return {"name": f"Room {index}"}
+        if event_type == "m.room.topic":
+            return {"topic": f"Benchmark room {index}"}
+        if event_type == "m.room.canonical_alias":
+            return {"alias": f"#room{index}:{ds.server_name}"}
+        if event_type == "m.room.join_rules":
+            return {"join_rule": "knock" if self._is_knock_room(index) else "invite"}
+        if event_type == "m.room.encryption" and index % 2:
+            return {"algorithm": "m.megolm.v1.aes-sha2"}
+        if event_type == "m.room.power_levels":
+            return self._power_levels()
+        return None
+
+    def _message_event(self, index: int, seq: int) -> dict:
+        ds = self.dataset
+        ratio = ds.bot_message_ratio
+        from_bot = int(seq * ratio) != int((seq + 1) * ratio)
+        sender = (
+            ds.bot_user_id
+            if from_bot
+            else ds.user_id(seq % max(1, ds.members_per_room))
+        )
+        return {
+            "type": "m.room.message",
+            "event_id": f"$r{index}e{seq}",
+            "sender": sender,
+            "origin_server_ts": self.now_ms - (ds.messages_per_room - seq) * 60_000,
+            "content": {"msgtype": "m.text", "body": f"message {seq}"},
+        }
+
+    # ========== 客户端接口 ==========
+
+    async def whoami(self) -> dict:
+        await self._call("whoami")
+        return {"user_id": self.user_id}
+
+    async def get_joined_rooms(self) -> dict:
+        await self._call("get_joined_rooms")
+        return {
+            "joined_rooms": [self.dataset.room_id(i) for i in range(self.dataset.rooms)]
+        }
+
+    async def get_room_members(self, room_id: str, **_kwargs) -> dict:
+        await self._call("get_room_members")
+        return {"chunk": self._member_events(self._room(room_id))}
+
+    async def get_power_levels(self, room_id: str) -> dict:
+        await self._call("get_power_levels")
+        self._room(room_id)
+        return self._power_levels()
+
+    async def get_room_state(self, room_id: str) -> list[dict]:
+        await self._call("get_room_state")
+        index = self._room(room_id)
+        events = self._member_events(index)
+        for event_type in (
+            "m.room.create",
+            "m.room.name",
+            "m.room.topic",
+            "m.room.canonical_alias",
+            "m.room.join_rules",
+            "m.room.encryption",
+            "m.room.power_levels",
+        ):
+            content = self._state_content(index, event_type)
+            if content is not None:
+                events.append({"type": event_type, "state_key": "", "content": content})
+        return events
+
+    async def get_room_state_event(
+        self, room_id: str, event_type: str, state_key: str = ""
+    ) -> dict:
+        await self._call("get_room_state_event")
+        if room_id == self.dataset.space_id and event_type == "m.room.create":
+            return {"creator": self.user_id, "type": "m.space"}
+        content = self._state_content(self._room(room_id), event_type)
+        if content is None:
+            raise FakeMatrixError(f"404 M_NOT_FOUND: {event_type} not found")
+        return content
+
+    async def get_room_hierarchy(
+        self,
+        room_id: str,
+        limit: int = 100,
+        from_token: str | None = None,
+        **_kwargs,
+    ) -> dict:
+        await self._call("get_room_hierarchy")
+        if room_id != self.dataset.space_id:
+            raise FakeMatrixError(f"404 M_NOT_FOUND: {room_id} is not a space")
+        entries = [{"room_id": room_id, "name": "Space", "room_type": "m.space"}]
+        entries += [
+            {
+                "room_id": self.dataset.room_id(i),
+                "name": f"Room {i}",
+                "canonical_alias": f"#room{i}:{self.dataset.server_name}",
+            }
+            for i in range(self.dataset.rooms)
+        ]
+        start = int(from_token or 0)
+        end = start + max(1, int(limit))
+        result = {"rooms": entries[start:end]}
+        if end < len(entries):
+            result["next_batch"] = str(end)
+        return result
+
+    async def get_room_alias(self, alias: str) -> dict:
+        await self._call("get_room_alias")
+        name = alias.lstrip("#").split(":", 1)[0]
+        if name.startswith("room") and name[4:].isdigit():
+            index = int(name[4:])
+            if index < self.dataset.rooms:
+                return {"room_id": self.dataset.room_id(index)}
+        raise FakeMatrixError(f"404 M_NOT_FOUND: alias {alias} not found")
+
+    async def room_messages(
+        self,
+        room_id: str,
+        from_token: str | None = None,
+        direction: str = "b",
+        limit: int = 10,
+        **_kwargs,
+    ) -> dict:
+        await self._call("room_messages")
+        index = self._room(room_id)
+        total = self.dataset.messages_per_room
+        if direction == "b":
+            start = total if from_token is None else int(from_token)
+            seqs = range(start - 1, max(start - limit, 0) - 1, -1)
+            end = max(start - limit, 0)
+        else:
+            start = 0 if from_token is None else int(from_token)
+            seqs = range(start, min(start + limit, total))
+            end = min(start + limit, total)
+        chunk = [self._message_event(index, seq) for seq in seqs]
+        result = {"chunk": chunk, "start": str(start)}
+        if chunk and 0 < end < total:
+            result["end"] = str(end)
+        return result
+
+    async def redact_event(
+        self, room_id: str, event_id: str, reason: str | None = None
+    ) -> dict:
+        await self._call("redact_event")
+        self._room(room_id)
+        self.redacted.add(event_id)
+        return {"event_id": f"$redaction{len(self.redacted)}"}
+
+    async def get_account_data(self, event_type: str) -> dict:
+        await self._call("get_account_data")
+        raise FakeMatrixError(f"404 M_NOT_FOUND: {event_type} not found")
@@ -0,0 +1,264 @@
+"""
+离线基准测试：用 FakeMatrixClient 驱动 admin 命令，报告耗时、请求数与峰值内存。
+
+用法（在插件目录下执行，需要安装 AstrBot）：
+    python benchmarks/run.py
+    python benchmarks/run.py --scenarios roomrefresh_all,purgebot --rooms 200
+    python benchmarks/run.py --latency 0.05 --rate 20 --burst 10 --json
+
+也可以用 python -m benchmarks.run 以模块方式执行，参数相同。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import sys
+import time
+import tracemalloc
+import types
+from pathlib import Path
+
+try:
+    from .fake_client import FakeDataset, FakeMatrixClient
+except ImportError:
+    # 以脚本方式运行（python benchmarks/run.py）时没有父包
+    from fake_client import FakeDataset, FakeMatrixClient
+
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+
+
+class BenchEvent:
+    """最小化的消息事件替身，只提供命令用到的方法。"""
+
+    def __init__(self, room_id: str, sender_id: str = "@admin:bench.local"):
+        self.room_id = room_id
+        self.sender_id = sender_id
+        self.message_str = ""
+        self._extras: dict = {}
+        self.output_bytes = 0
+
+    def get_platform_name(self) -> str:
+        return "matrix"
+
+    def get_platform_id(self) -> str:
+        return "bench"
+
+    def get_session_id(self) -> str:
+        return self.room_id
+
+    def get_sender_id(self) -> str:
+        return self.sender_id
+
+    def get_extra(self, key: str, default=None):
+        return self._extras.get(key, default)
+
+    def set_extra(self, key: str, value) -> None:
+        self._extras[key] = value
+
+    def plain_result(self, text: str) -> str:
+        self.output_bytes += len(str(text).encode("utf-8"))
+        return text
+
+
+class _MemoryStore:
+    """替代适配器的成员 / 用户缓存，避免基准测试写入真实数据目录。"""
+
+    def __init__(self, *args, **kwargs):
+        self.records: dict = {}
+
+    def upsert(self, *args, **kwargs) -> None:
+        key = kwargs.get("room_id") or (args[0] if args else None)
+        self.records[key] = (args, kwargs)
+
+    def get(self, key):
+        return None
+
+
+def install_memory_stores() -> None:
+    package = types.ModuleType("astrbot_plugin_matrix_adapter")
+    package.__path__ = []
+    member_module = types.ModuleType("astrbot_plugin_matrix_adapter.room_member_store")
+    member_module.MatrixRoomMemberStore = type(
+        "MatrixRoomMemberStore", (_MemoryStore,), {}
+    )
+    user_module = types.ModuleType("astrbot_plugin_matrix_adapter.user_store")
+    user_module.MatrixUserStore = type("MatrixUserStore", (_MemoryStore,), {})
+    sys.modules["astrbot_plugin_matrix_adapter"] = package
+    sys.modules[member_module.__name__] = member_module
+    sys.modules[user_module.__name__] = user_module
+
+
+def build_plugin(client: FakeMatrixClient, concurrency: int):
+    """用插件的命令 mixin 组装一个不依赖 Star 运行时的实例。"""
+    if str(PLUGIN_ROOT.parent) not in sys.path:
+        sys.path.insert(0, str(PLUGIN_ROOT.parent))
+    commands = importlib.import_module(f"{PLUGIN_ROOT.name}.commands")
+    base = importlib.import_module(f"{PLUGIN_ROOT.name}.commands.base")
+
+    class BenchPlugin(
+        commands.KnockCommandsMixin,
+        commands.AliasCommandsMixin,
+        commands.StatsCommandsMixin,
+        commands.RoomCommandsMixin,
+        commands.BotCommandsMixin,
+        commands.PowerCommandsMixin,
+    ):
+        def __init__(self):
+            self.context = None
+            self.config = {}
+            self.bulk_concurrency = concurrency
+
+        def _build_command_context(self, event):
+            room_id = event.get_session_id()
+            return base.MatrixCommandContext(
+                client=client,
+                platform_id=event.get_platform_id(),
+                room_id=room_id,
+                room_server_name=room_id.split(":", 1)[1],
+                bot_user_id=client.user_id,
+                server_name=client.dataset.server_name,
+            )
+
+    return BenchPlugin()
+
+
+def build_scenarios(dataset: FakeDataset) -> dict:
+    room = dataset.room_id(0)
+    return {
+        "admins": (room, lambda p, e: p.cmd_admins(e)),
+        "spacechildren": (
+            room,
+            lambda p, e: p.cmd_space_children(e, dataset.space_id, 500),
+        ),
+        "purgebot": (
+            room,
+            lambda p, e: p.cmd_purge_bot_messages(e, dataset.messages_per_room),
+        ),
+        "roomrefresh": (room, lambda p, e: p.cmd_room_refresh(e)),
+        "roomrefresh_all": (room, lambda p, e: p.cmd_room_refresh(e, "all")),
+        "roomstats_all": (room, lambda p, e: p.cmd_roomstats(e, "all", "24h")),
+        "aliasaudit": (room, lambda p, e: p.cmd_alias_audit(e, "all")),
+        "knocks": (room, lambda p, e: p.cmd_knocks(e, "refresh")),
+    }
+
+
+async def run_scenario(name, room_id, command, client, concurrency) -> dict:
+    plugin = build_plugin(client, concurrency)
+    event = BenchEvent(room_id)
+    client.reset_stats()
+    tracemalloc.start()
+    started = time.perf_counter()
+    outputs: list[str] = []
+    error = ""
+    try:
+        async for item in command(plugin, event):
+            outputs.append(str(item))
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "scenario": name,
+        "wall_seconds": round(wall, 4),
+        "rpc_total": sum(client.calls.values()),
+        "rpc": dict(sorted(client.calls.items())),
+        "throttled": client.throttled,
+        "peak_kib": round(peak / 1024, 1),
+        "output_bytes": event.output_bytes,
+        "last_output": outputs[-1].splitlines()[0] if outputs else "",
+        "error": error,
+    }
+
+
+def format_report(results: list[dict]) -> str:
+    lines = [
+        f"{'scenario':<16} {'wall(s)':>9} {'rpc':>7} {'throttled':>9} "
+        f"{'peak(KiB)':>10} {'out(B)':>8}"
+    ]
+    for item in results:
+        lines.append(
+            f"{item['scenario']:<16} {item['wall_seconds']:>9.3f} "
+            f"{item['rpc_total']:>7} {item['throttled']:>9} "
+            f"{item['peak_kib']:>10.1f} {item['output_bytes']:>8}"
+        )
+        lines.append("    " + ", ".join(f"{k}={v}" for k, v in item["rpc"].items()))
+        if item["error"]:
+            lines.append(f"    error: {item['error']}")
+        elif item["last_output"]:
+            lines.append(f"    -> {item['last_output']}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Matrix admin 命令离线基准测试")
+    parser.add_argument("--scenarios", default="all", help="逗号分隔，默认全部")
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--bot-ratio", type=float, default=0.2)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="单次请求延迟（秒）"
+    )
+    parser.add_argument("--jitter", type=float, default=0.01, help="随机抖动上限（秒）")
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="每秒请求上限，0 不限流"
+    )
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument(
+        "--rate-limit-errors",
+        action="store_true",
+        help="超限时抛出 M_LIMIT_EXCEEDED 而不是等待",
+    )
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    install_memory_stores()
+    dataset = FakeDataset(
+        rooms=args.rooms,
+        members_per_room=args.members,
+        messages_per_room=args.messages,
+        bot_message_ratio=args.bot_ratio,
+    )
+    scenarios = build_scenarios(dataset)
+    selected = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    if not selected or "all" in selected:
+        selected = list(scenarios)
+    unknown = [name for name in selected if name not in scenarios]
+    if unknown:
+        print(f"未知场景：{', '.join(unknown)}（可选：{', '.join(scenarios)}）")
+        return 2
+
+    results = []
+    for name in selected:
+        client = FakeMatrixClient(
+            dataset,
+            latency=args.latency,
+            jitter=args.jitter,
+            rate=args.rate,
+            burst=args.burst,
+            rate_limit_errors=args.rate_limit_errors,
+            seed=args.seed,
+        )
+        room_id, command = scenarios[name]
+        results.append(
+            await run_scenario(name, room_id, command, client, args.concurrency)
+        )
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(results))
+    return 1 if any(item["error"] for item in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -2,22 +2,38 @@
 Matrix Admin Plugin Commands
 """
 
+from .alias_commands import AliasCommandsMixin
+from .audit_commands import AuditCommandsMixin
 from .base import AdminCommandMixin
 from .bot_commands import BotCommandsMixin
 from .ignore_commands import IgnoreCommandsMixin
+from .job_commands import JobCommandsMixin
+from .knock_commands import KnockCommandsMixin
 from .power_commands import PowerCommandsMixin
+from .provision_commands import ProvisionCommandsMixin
 from .query_commands import QueryCommandsMixin
 from .room_commands import RoomCommandsMixin
 from .runtime_commands import RuntimeCommandsMixin
+from .snapshot_commands import SnapshotCommandsMixin
+from .stats_commands import StatsCommandsMixin
+from .upgrade_commands import UpgradeCommandsMixin
 from .user_commands import UserCommandsMixin
 
 __all__ = [
     "AdminCommandMixin",
+    "AliasCommandsMixin",
+    "AuditCommandsMixin",
     "BotCommandsMixin",
     "IgnoreCommandsMixin",
+    "JobCommandsMixin",
+    "KnockCommandsMixin",
     "PowerCommandsMixin",
+    "ProvisionCommandsMixin",
     "QueryCommandsMixin",
     "RuntimeCommandsMixin",
+    "SnapshotCommandsMixin",
+    "StatsCommandsMixin",
     "RoomCommandsMixin",
+    "UpgradeCommandsMixin",
     "UserCommandsMixin",
 ]
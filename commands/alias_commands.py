@@ -0,0 +1,176 @@
+"""
+Matrix Admin Plugin - Alias Commands
+房间别名巡检相关命令
+"""
+
+from astrbot.api import logger
+from astrbot.api.event import AstrMessageEvent
+
+from .room_commands import RoomCommandsMixin
+
+
+class AliasCommandsMixin(RoomCommandsMixin):
+    """别名巡检命令：aliasaudit"""
+
+    @staticmethod
+    def _alias_server(alias: str) -> str:
+        return alias.split(":", 1)[1] if ":" in alias else ""
+
+    @staticmethod
+    def _canonical_aliases(canonical_alias: dict) -> list[str]:
+        aliases = [canonical_alias.get("alias")]
+        alt_aliases = canonical_alias.get("alt_aliases")
+        if isinstance(alt_aliases, list):
+            aliases.extend(alt_aliases)
+        return list(
+            dict.fromkeys(
+                a for a in aliases if isinstance(a, str) and a.startswith("#")
+            )
+        )
+
+    async def _resolve_aliases(
+        self,
+        client,
+        aliases: list[str],
+        concurrency: int,
+    ) -> dict[str, tuple[str, str]]:
+        """并发解析别名，返回 alias -> (room_id, error)；每个别名只请求一次。"""
+
+        async def _resolve(alias: str) -> tuple[str, str]:
+            try:
+                result = await client.get_room_alias(alias)
+            except Exception as e:
+                if self._is_not_found_error(e):
+                    return "", "not_found"
+                return "", str(e)
+            return str(result.get("room_id", "") or ""), ""
+
+        results = await self._run_bounded(aliases, _resolve, concurrency)
+        return {
+            alias: item if not isinstance(item, Exception) else ("", str(item))
+            for alias, item in zip(aliases, results)
+        }
+
+    async def cmd_alias_audit(
+        self,
+        event: AstrMessageEvent,
+        rooms: str = "all",
+        repair: str = "no",
+        concurrency: str = "",
+    ):
+        """巡检房间 canonical alias 是否仍指向本房间
+
+        用法：/admin aliasaudit [all|space_id|room_id,...] [是否修复] [并发数]
+
+        - 悬空：别名已不存在，修复时在本服务器重新创建
+        - 过期：别名仍指向已被升级替换的旧房间，修复时改指新房间
+        - 冲突：别名指向无关房间，仅报告不自动修复
+        """
+        client = self._get_matrix_client(event)
+        if not client:
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
+            return
+
+        room_ids, error = await self._resolve_room_set(client, event, rooms or "all")
+        if error:
+            yield self._fail_result(event, error)
+            return
+
+        limit = self._normalize_concurrency(concurrency)
+        do_repair = str(repair or "").strip().lower() in ("yes", "true", "1", "on")
+        local_server = self._resolve_server_name(event)
+
+        async def _load_state(room_id: str) -> dict:
+            return await self._get_room_alias_state(client, room_id)
+
+        state_results = await self._run_bounded(room_ids, _load_state, limit, bulk=True)
+        room_states: dict[str, dict] = {}
+        unreadable = 0
+        for room_id, item in zip(room_ids, state_results):
+            if isinstance(item, Exception):
+                unreadable += 1
+                logger.debug(f"读取房间 {room_id} 别名状态失败：{item}")
+                continue
+            room_states[room_id] = item
+
+        claims: list[tuple[str, str]] = []
+        for room_id, state in room_states.items():
+            if state.get("replacement_room"):
+                continue
+            for alias in self._canonical_aliases(state.get("canonical_alias") or {}):
+                claims.append((room_id, alias))
+
+        unique_aliases = list(dict.fromkeys(alias for _, alias in claims))
+        resolved = await self._resolve_aliases(client, unique_aliases, limit)
+
+        async def _replacement_of(other_room_id: str) -> str:
+            state = room_states.get(other_room_id)
+            if state is None:
+                try:
+                    state = await self._get_room_alias_state(client, other_room_id)
+                except Exception:
+                    return ""
+            return str(state.get("replacement_room") or "")
+
+        findings: list[tuple[str, str, str, str]] = []
+        ok_count = 0
+        for room_id, alias in claims:
+            target, resolve_error = resolved.get(alias, ("", "unknown"))
+            if target == room_id:
+                ok_count += 1
+            elif resolve_error == "not_found":
+                findings.append(("dangling", room_id, alias, ""))
+            elif resolve_error:
+                findings.append(("error", room_id, alias, resolve_error))
+            elif await _replacement_of(target) == room_id:
+                findings.append(("stale", room_id, alias, target))
+            else:
+                findings.append(("conflict", room_id, alias, target))
+
+        async def _repair(finding: tuple[str, str, str, str]) -> None:
+            kind, room_id, alias, _ = finding
+            if kind == "stale":
+                await client.delete_room_alias(alias)
+            await client.create_room_alias(alias, room_id)
+
+        repairable = [
+            item
+            for item in findings
+            if item[0] in ("dangling", "stale")
+            and self._alias_server(item[2]) == local_server
+        ]
+        repaired: dict[tuple[str, str], str] = {}
+        if do_repair and repairable:
+            repair_results = await self._run_bounded(repairable, _repair, limit)
+            for item, result in zip(repairable, repair_results):
+                repaired[(item[1], item[2])] = (
+                    f"修复失败：{result}" if isinstance(result, Exception) else "已修复"
+                )
+
+        labels = {
+            "dangling": "悬空",
+            "stale": "过期",
+            "conflict": "冲突",
+            "error": "解析失败",
+        }
+        lines = [
+            f"别名巡检完成：房间 {len(room_ids)} 个，别名 {len(unique_aliases)} 个，"
+            f"正常 {ok_count} 个，异常 {len(findings)} 个"
+        ]
+        if unreadable:
+            lines.append(f"无法读取状态的房间：{unreadable} 个")
+        for kind, room_id, alias, detail in findings[:50]:
+            line = f"- [{labels[kind]}] {alias} @ {room_id}"
+            if kind in ("stale", "conflict"):
+                line += f" -> {detail}"
+            elif kind == "error":
+                line += f"：{detail}"
+            if (room_id, alias) in repaired:
+                line += f"（{repaired[(room_id, alias)]}）"
+            lines.append(line)
+        if repairable and not do_repair:
+            lines.append(
+                f"可自动修复 {len(repairable)} 项，追加参数 yes 执行修复："
+                "/admin aliasaudit <范围> yes"
+            )
+        yield event.plain_result("\n".join(lines))
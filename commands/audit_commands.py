@@ -0,0 +1,103 @@
+"""
+Matrix Admin Plugin - Audit Commands
+管理操作审计查询命令
+"""
+
+import re
+import time
+from datetime import datetime
+
+from astrbot.api import logger
+from astrbot.api.event import AstrMessageEvent
+
+from .base import AdminCommandMixin
+
+
+class AuditCommandsMixin(AdminCommandMixin):
+    """审计命令：audit"""
+
+    _AUDIT_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+    _AUDIT_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    _AUDIT_FILTER_KEYS = {"user", "room", "actor", "cmd", "since", "until", "limit"}
+
+    @classmethod
+    def _parse_audit_time(cls, text: str) -> float | None:
+        """解析 2h / 30m / 7d 这样的相对时间，或 2026-10-01 / 2026-10-01T12:00 形式的绝对时间。"""
+        match = cls._AUDIT_DURATION_RE.match(text)
+        if match:
+            return (
+                time.time() - float(match.group(1)) * cls._AUDIT_UNITS[match.group(2)]
+            )
+        try:
+            return datetime.fromisoformat(text).timestamp()
+        except ValueError:
+            return None
+
+    def _parse_audit_query(self, query: str) -> tuple[dict, str]:
+        filters: dict = {"limit": 20}
+        for token in str(query or "").split():
+            key, sep, value = token.partition(":")
+            key = key.lower()
+            if not (sep and key in self._AUDIT_FILTER_KEYS and value):
+                if token.startswith("@"):
+                    key, value = "user", token
+                elif token[:1] in ("!", "#"):
+                    key, value = "room", token
+                else:
+                    return {}, f"无法识别的筛选条件：{token}"
+
+            if key in ("since", "until"):
+                ts = self._parse_audit_time(value)
+                if ts is None:
+                    return {}, f"时间格式无效：{value}（示例：2h、7d、2026-10-01）"
+                filters[key] = ts
+            elif key == "limit":
+                try:
+                    filters["limit"] = max(1, min(int(value), 100))
+                except ValueError:
+                    return {}, "limit 必须是整数"
+            elif key == "cmd":
+                filters["command"] = value.lower()
+            else:
+                filters[key] = value
+        return filters, ""
+
+    async def cmd_audit(self, event: AstrMessageEvent, query: str = ""):
+        """查询管理操作审计记录
+
+        用法：/admin audit [@user] [!room] [actor:@admin] [cmd:kick] [since:24h] [until:2026-10-01] [limit:20]
+        """
+        if self.audit_log is None:
+            yield self._fail_result(event, "审计日志未启用")
+            return
+
+        filters, error = self._parse_audit_query(query)
+        if error:
+            yield self._fail_result(event, error)
+            return
+
+        try:
+            rows = await self.audit_log.query(**filters)
+        except Exception as e:
+            logger.error(f"查询审计日志失败：{e}")
+            yield self._fail_result(event, f"查询审计日志失败：{e}")
+            return
+
+        if not rows:
+            yield event.plain_result("没有匹配的审计记录")
+            return
+
+        lines = [f"审计记录（最近 {len(rows)} 条）："]
+        for row in rows:
+            at = time.strftime("%m-%d %H:%M:%S", time.localtime(row["ts"]))
+            targets = " ".join(t for t in (row["target_user"], row["target_room"]) if t)
+            status = "" if row["outcome"] == "ok" else " ❌"
+            line = (
+                f"- {at} {row['actor'] or '-'} {row['command']}"
+                f"{' ' + targets if targets else ''}"
+                f"（{row['latency_ms']:.0f} ms）{status}"
+            )
+            if row["detail"]:
+                line += f"：{row['detail'][:80]}"
+            lines.append(line)
+        yield event.plain_result("\n".join(lines))
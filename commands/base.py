@@ -3,20 +3,55 @@ Matrix Admin Plugin - Base Mixin
 提供共享的工具方法
 """
 
-from typing import TYPE_CHECKING
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
 
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
 
+from ..governor import PRIORITY_BULK, RateGovernor, set_priority
+from ..jobs import Job
+from ..metrics import (
+    CommandTrace,
+    TracedClient,
+    current_trace,
+    note_command_failed,
+    note_target_user,
+)
+
 if TYPE_CHECKING:
     from astrbot.api.star import Context
 
 
+@dataclass
+class MatrixCommandContext:
+    """单次命令调用内共享的 Matrix 解析结果"""
+
+    client: Any
+    platform_id: str
+    room_id: str | None
+    room_server_name: str
+    bot_user_id: str
+    server_name: str
+
+
 class AdminCommandMixin:
     """Admin 命令基类，提供共享工具方法"""
 
     context: "Context"
     _matrix_utils_cls = None
+    _matrix_platform_index: dict | None = None
+    _matrix_platform_index_built_at: float = 0.0
+    _PLATFORM_INDEX_MISS_REFRESH_INTERVAL = 30.0
+    _COMMAND_CONTEXT_KEY = "matrix_admin_command_context"
+    bulk_concurrency: int = 4
+    client_call_tracer: Any = None
+    job_manager: Any = None
+    audit_log: Any = None
+    rate_governor_options: dict | None = None
+    _rate_governors: dict | None = None
 
     def _get_matrix_utils_cls(self):
         if self._matrix_utils_cls is not None:
@@ -30,35 +65,74 @@ class AdminCommandMixin:
         self._matrix_utils_cls = MatrixUtils
         return MatrixUtils
 
-    def _find_matrix_platform_by_selector(self, selector: str):
+    def _refresh_matrix_platform_index(self) -> dict:
+        """重建 selector（meta id / webhook_uuid）-> Matrix 平台实例的索引。"""
+        index: dict = {}
         matrix_utils_cls = self._get_matrix_utils_cls()
-        if matrix_utils_cls is None:
+        if matrix_utils_cls is not None:
+            for platform in matrix_utils_cls.iter_platform_instances(self.context):
+                try:
+                    meta = platform.meta()
+                except Exception:
+                    continue
+
+                meta_name = str(getattr(meta, "name", "") or "").strip().lower()
+                if meta_name != "matrix":
+                    continue
+
+                config = getattr(platform, "config", {})
+                if not isinstance(config, dict):
+                    config = {}
+
+                meta_id = str(getattr(meta, "id", "") or "").strip()
+                webhook_uuid = str(config.get("webhook_uuid") or "").strip()
+                for key in (meta_id, webhook_uuid):
+                    if key:
+                        index.setdefault(key, platform)
+
+        self._matrix_platform_index = index
+        self._matrix_platform_index_built_at = time.monotonic()
+        return index
+
+    def _find_matrix_platform_by_selector(self, selector: str):
+        if self._get_matrix_utils_cls() is None:
             return None
 
         normalized_selector = str(selector or "").strip()
         if not normalized_selector:
             return None
 
-        for platform in matrix_utils_cls.iter_platform_instances(self.context):
-            try:
-                meta = platform.meta()
-            except Exception:
-                continue
+        index = self._matrix_platform_index
+        if index is None:
+            index = self._refresh_matrix_platform_index()
+        platform = index.get(normalized_selector)
+        if platform is not None:
+            return platform
 
-            meta_name = str(getattr(meta, "name", "") or "").strip().lower()
-            if meta_name != "matrix":
+        # 未命中时限频重建，兼容未触发 on_platform_loaded 的平台热加载
+        elapsed = time.monotonic() - self._matrix_platform_index_built_at
+        if elapsed < self._PLATFORM_INDEX_MISS_REFRESH_INTERVAL:
+            return None
+        return self._refresh_matrix_platform_index().get(normalized_selector)
+
+    def _list_matrix_platforms(self) -> list[tuple[str, object]]:
+        """返回 (platform_id, platform) 列表，同一平台只出现一次。"""
+        index = self._matrix_platform_index
+        if index is None:
+            index = self._refresh_matrix_platform_index()
+
+        platforms: list[tuple[str, object]] = []
+        seen: set[int] = set()
+        for platform in index.values():
+            if id(platform) in seen:
                 continue
-
-            config = getattr(platform, "config", {})
-            if not isinstance(config, dict):
-                config = {}
-
-            meta_id = str(getattr(meta, "id", "") or "").strip()
-            webhook_uuid = str(config.get("webhook_uuid") or "").strip()
-            if normalized_selector in {meta_id, webhook_uuid}:
-                return platform
-
-        return None
+            seen.add(id(platform))
+            try:
+                platform_id = str(getattr(platform.meta(), "id", "") or "matrix")
+            except Exception:
+                platform_id = "matrix"
+            platforms.append((platform_id, platform))
+        return platforms
 
     def _resolve_matrix_platform(
         self, event: AstrMessageEvent, matrix_platform_id: str = ""
@@ -68,7 +142,6 @@ class AdminCommandMixin:
             return None, "未检测到 Matrix 适配器插件"
 
         requested_platform_id = str(matrix_platform_id or "").strip()
-        current_platform_name = str(event.get_platform_name() or "").strip().lower()
         current_platform_id = str(event.get_platform_id() or "").strip()
 
         if requested_platform_id:
@@ -77,11 +150,6 @@ class AdminCommandMixin:
                 return None, "指定的 Matrix 适配器不存在或不可用"
             return platform, None
 
-        if current_platform_name == "matrix":
-            platform = self._find_matrix_platform_by_selector(current_platform_id)
-            if platform is not None:
-                return platform, None
-
         if current_platform_id:
             platform = self._find_matrix_platform_by_selector(current_platform_id)
             if platform is not None:
@@ -134,23 +202,134 @@ class AdminCommandMixin:
             logger.debug(f"获取 e2ee_manager 失败：{exc}")
         return None
 
-    def _get_matrix_client(self, event: AstrMessageEvent):
-        """获取 Matrix 客户端实例"""
-        platform_name = str(event.get_platform_name() or "").strip().lower()
-        if platform_name != "matrix":
+    @staticmethod
+    def _get_room_member_store():
+        try:
+            from astrbot_plugin_matrix_adapter.room_member_store import (
+                MatrixRoomMemberStore,
+            )
+        except Exception:
+            return None
+        return MatrixRoomMemberStore()
+
+    def _load_room_member_record(self, room_id: str) -> dict | None:
+        """读取适配器成员缓存中的房间记录，不存在或不可用时返回 None。"""
+        store = self._get_room_member_store()
+        getter = getattr(store, "get", None)
+        if not callable(getter):
+            return None
+        try:
+            record = getter(room_id)
+        except Exception as exc:
+            logger.debug(f"读取房间成员缓存失败：{exc}")
             return None
+        if record is not None and not isinstance(record, dict):
+            record = getattr(record, "__dict__", None)
+        return record or None
+
+    def _build_command_context(self, event: AstrMessageEvent) -> MatrixCommandContext:
+        platform_name = str(event.get_platform_name() or "").strip().lower()
+        platform_id = str(event.get_platform_id() or "").strip()
+        room_id = str(event.get_session_id() or "").strip() or None
 
+        client = None
         matrix_utils_cls = self._get_matrix_utils_cls()
-        if matrix_utils_cls is None:
+        if platform_name == "matrix" and matrix_utils_cls is not None:
+            try:
+                client = matrix_utils_cls.get_matrix_client(self.context, platform_id)
+            except Exception as e:
+                logger.debug(f"获取 Matrix 客户端失败：{e}")
+            if client is not None:
+                tracer = self.client_call_tracer
+                client = TracedClient(
+                    client,
+                    tracer.record if tracer else None,
+                    self._get_rate_governor(platform_id),
+                )
+
+        bot_user_id = str(getattr(client, "user_id", "") or "")
+        return MatrixCommandContext(
+            client=client,
+            platform_id=platform_id,
+            room_id=room_id,
+            room_server_name=room_id.split(":", 1)[1]
+            if room_id and ":" in room_id
+            else "",
+            bot_user_id=bot_user_id,
+            server_name=bot_user_id.split(":", 1)[1] if ":" in bot_user_id else "",
+        )
+
+    def _get_command_context(self, event: AstrMessageEvent) -> MatrixCommandContext:
+        """返回本次命令调用的解析上下文，同一事件内只解析一次。"""
+        get_extra = getattr(event, "get_extra", None)
+        if callable(get_extra):
+            cached = get_extra(self._COMMAND_CONTEXT_KEY)
+            if isinstance(cached, MatrixCommandContext):
+                return cached
+
+        context = self._build_command_context(event)
+        set_extra = getattr(event, "set_extra", None)
+        if callable(set_extra) and context.client is not None:
+            set_extra(self._COMMAND_CONTEXT_KEY, context)
+        return context
+
+    def _get_rate_governor(self, platform_id: str) -> RateGovernor | None:
+        """返回该 adapter 共享的限速器；未配置限速时返回 None。"""
+        if self.rate_governor_options is None:
             return None
+        if self._rate_governors is None:
+            self._rate_governors = {}
+        governor = self._rate_governors.get(platform_id)
+        if governor is None:
+            governor = RateGovernor(**self.rate_governor_options)
+            self._rate_governors[platform_id] = governor
+        return governor
+
+    async def _start_job(
+        self,
+        event: AstrMessageEvent,
+        kind: str,
+        description: str,
+        runner,
+        background: bool = True,
+    ) -> str:
+        """把耗时操作提交为后台任务并返回提示；background 为 False 或未启用任务管理时
+        直接执行并返回结果。
+
+        runner 为 async (job) -> str，可调用 job.progress() 汇报进度。
+        """
+        if not background or self.job_manager is None:
+            return await runner(Job("-", kind, description))
+        # 任务以 job:<kind> 单独记录审计与指标，沿用提交命令的事件、参数与目标用户
+        origin_trace = current_trace()
+        trace = CommandTrace(
+            f"job:{kind}",
+            getattr(origin_trace, "event", None) or event,
+            dict(getattr(origin_trace, "params", None) or {}),
+        )
+        trace.target_user = getattr(origin_trace, "target_user", "") or ""
+        job = self.job_manager.submit(
+            kind,
+            description,
+            runner,
+            origin=str(getattr(event, "unified_msg_origin", "") or ""),
+            trace=trace,
+        )
+        trace.params["job_id"] = job.id
+        return (
+            f"已提交后台任务 #{job.id}：{description}\n"
+            f"使用 /admin job {job.id} 查看进度，/admin cancel {job.id} 取消"
+        )
 
-        try:
-            target_platform_id = str(event.get_platform_id() or "")
-            return matrix_utils_cls.get_matrix_client(self.context, target_platform_id)
-        except Exception as e:
-            logger.debug(f"获取 Matrix 客户端失败：{e}")
+    @staticmethod
+    def _fail_result(event: AstrMessageEvent, text: str):
+        """回复失败说明，并把本次命令在指标与审计中的结果记为 failed。"""
+        note_command_failed()
+        return event.plain_result(text)
 
-        return None
+    def _get_matrix_client(self, event: AstrMessageEvent):
+        """获取 Matrix 客户端实例"""
+        return self._get_command_context(event).client
 
     def _parse_user_id(
         self,
@@ -158,7 +337,18 @@ class AdminCommandMixin:
         event: AstrMessageEvent,
         room_id_hint: str = "",
     ) -> str | None:
-        """解析用户输入为完整的 Matrix 用户 ID"""
+        """解析用户输入为完整的 Matrix 用户 ID，并记为本次命令的审计目标"""
+        user_id = self._resolve_user_input(user_input, event, room_id_hint)
+        if user_id:
+            note_target_user(user_id)
+        return user_id
+
+    def _resolve_user_input(
+        self,
+        user_input: str,
+        event: AstrMessageEvent,
+        room_id_hint: str = "",
+    ) -> str | None:
         user_text = str(user_input or "").strip()
         if not user_text:
             return None
@@ -169,17 +359,13 @@ class AdminCommandMixin:
         if ":" in user_text and not user_text.startswith("@"):
             return f"@{user_text}"
 
-        # 尝试从房间 ID 提取服务器域名
-        room_id = str(room_id_hint or event.get_session_id() or "")
-        server = ""
-        if ":" in room_id:
-            server = room_id.split(":", 1)[1]
-
-        if not server:
-            client = self._get_matrix_client(event)
-            client_user_id = str(getattr(client, "user_id", "") or "")
-            if ":" in client_user_id:
-                server = client_user_id.split(":", 1)[1]
+        # 优先使用房间 ID 的服务器域名，其次是 Bot 所在服务器
+        room_hint = str(room_id_hint or "")
+        context = self._get_command_context(event)
+        if ":" in room_hint:
+            server = room_hint.split(":", 1)[1]
+        else:
+            server = context.room_server_name or context.server_name
 
         if server:
             if user_text.startswith("@"):
@@ -188,16 +374,94 @@ class AdminCommandMixin:
 
         return None
 
-    @staticmethod
-    def _resolve_event_room_id(event: AstrMessageEvent) -> str | None:
-        room_id = str(event.get_session_id() or "").strip()
-        return room_id or None
+    def _resolve_event_room_id(self, event: AstrMessageEvent) -> str | None:
+        return self._get_command_context(event).room_id
 
-    @staticmethod
     def _resolve_target_room_id(
-        event: AstrMessageEvent, room_id: str = ""
+        self, event: AstrMessageEvent, room_id: str = ""
     ) -> str | None:
         room_id_text = str(room_id or "").strip()
         if room_id_text:
             return room_id_text
-        return AdminCommandMixin._resolve_event_room_id(event)
+        return self._resolve_event_room_id(event)
+
+    def _normalize_concurrency(self, value=None, upper: int = 32) -> int:
+        """解析并发参数，非法或缺省时回落到配置的 bulk_concurrency。"""
+        try:
+            concurrency = int(value)
+        except (TypeError, ValueError):
+            concurrency = int(self.bulk_concurrency or 4)
+        return max(1, min(upper, concurrency))
+
+    @staticmethod
+    async def _scan_room_history(
+        client,
+        room_id: str,
+        limit: int | None = None,
+        since_ts: float | None = None,
+        page_size: int = 100,
+    ):
+        """按时间倒序流式遍历房间历史，逐条产出事件，已处理的分页不会保留。
+
+        limit 限制最多扫描的事件数；since_ts（毫秒）给定时遇到更早的事件即停止。
+        拉取分页失败时异常直接抛给调用方。
+        """
+        from_token = None
+        scanned = 0
+        while limit is None or scanned < limit:
+            batch = page_size if limit is None else min(page_size, limit - scanned)
+            resp = await client.room_messages(
+                room_id=room_id,
+                from_token=from_token,
+                direction="b",
+                limit=batch,
+            )
+            chunk = resp.get("chunk", []) or []
+            if not chunk:
+                return
+            for msg in chunk:
+                if since_ts is not None:
+                    ts = msg.get("origin_server_ts")
+                    if isinstance(ts, (int, float)) and ts < since_ts:
+                        return
+                scanned += 1
+                yield msg
+                if limit is not None and scanned >= limit:
+                    return
+            from_token = resp.get("end")
+            if not from_token:
+                return
+
+    @staticmethod
+    async def _run_bounded(items, worker, concurrency: int, bulk: bool = False) -> list:
+        """以有限并发执行 worker，结果顺序与 items 一致；异常作为结果返回。
+
+        bulk 为 True 时子任务以低优先级排队，仅用于遍历全部房间等批量入口；
+        默认沿用调用方的优先级（后台任务中已是批量优先级）。
+        """
+        semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+        async def _run(item):
+            if bulk:
+                set_priority(PRIORITY_BULK)
+            async with semaphore:
+                return await worker(item)
+
+        return await asyncio.gather(
+            *(_run(item) for item in items), return_exceptions=True
+        )
+
+    @staticmethod
+    async def _list_joined_rooms(client) -> list[str]:
+        """获取机器人已加入的房间 ID 列表，返回格式无效时抛出 ValueError。"""
+        rooms = await client.get_joined_rooms()
+        if isinstance(rooms, dict):
+            rooms = rooms.get("joined_rooms", [])
+        if not isinstance(rooms, (list, tuple, set)):
+            raise ValueError("返回格式无效")
+        joined: list[str] = []
+        for room in rooms:
+            room_id = str(room or "").strip()
+            if room_id and room_id not in joined:
+                joined.append(room_id)
+        return joined
@@ -15,6 +15,9 @@ from .base import AdminCommandMixin
 class BotCommandsMixin(AdminCommandMixin):
     """Bot 资料管理命令：setname, setavatar, setstatus"""
 
+    # 超过该数量的 purgebot 提交为后台任务
+    _PURGE_INLINE_LIMIT = 500
+
     # 状态映射
     STATUS_MAP = {
         "online": ("online", "在线"),
@@ -39,11 +42,11 @@ class BotCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         if not name or not name.strip():
-            yield event.plain_result("请提供有效的名称")
+            yield self._fail_result(event, "请提供有效的名称")
             return
 
         try:
@@ -51,7 +54,7 @@ class BotCommandsMixin(AdminCommandMixin):
             yield event.plain_result(f"已将 Bot 名称修改为：**{name.strip()}**")
         except Exception as e:
             logger.error(f"修改 Bot 名称失败：{e}")
-            yield event.plain_result(f"修改 Bot 名称失败：{e}")
+            yield self._fail_result(event, f"修改 Bot 名称失败：{e}")
 
     async def cmd_setavatar(self, event: AstrMessageEvent):
         """通过引用图片修改 Bot 的头像
@@ -65,13 +68,13 @@ class BotCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         # 获取原始消息中的引用信息
         room_id = self._resolve_event_room_id(event)
         if not room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
         reply_event_id = None
         image_mxc_url = None
@@ -93,12 +96,13 @@ class BotCommandsMixin(AdminCommandMixin):
             logger.debug(f"获取引用事件 ID 失败：{e}")
 
         if not reply_event_id:
-            yield event.plain_result(
+            yield self._fail_result(
+                event,
                 "请引用一条包含图片的消息后再使用此命令\n\n"
                 "用法:\n"
                 "1. 找到或发送一张图片\n"
                 "2. 引用该图片消息\n"
-                "3. 发送 /admin setavatar"
+                "3. 发送 /admin setavatar",
             )
             return
 
@@ -106,7 +110,7 @@ class BotCommandsMixin(AdminCommandMixin):
         try:
             reply_event = await client.get_event(room_id, reply_event_id)
             if not reply_event:
-                yield event.plain_result("无法获取被引用的消息")
+                yield self._fail_result(event, "无法获取被引用的消息")
                 return
 
             reply_content = reply_event.get("content", {})
@@ -120,13 +124,14 @@ class BotCommandsMixin(AdminCommandMixin):
                 # 贴纸也可以作为头像
                 image_mxc_url = reply_content.get("url")
             else:
-                yield event.plain_result(
-                    f"被引用的消息不是图片 (类型：{msgtype})\n请引用一条包含图片的消息"
+                yield self._fail_result(
+                    event,
+                    f"被引用的消息不是图片 (类型：{msgtype})\n请引用一条包含图片的消息",
                 )
                 return
 
             if not image_mxc_url:
-                yield event.plain_result("无法从被引用的消息中获取图片 URL")
+                yield self._fail_result(event, "无法从被引用的消息中获取图片 URL")
                 return
 
             # 设置头像
@@ -137,7 +142,7 @@ class BotCommandsMixin(AdminCommandMixin):
 
         except Exception as e:
             logger.error(f"修改 Bot 头像失败：{e}")
-            yield event.plain_result(f"修改 Bot 头像失败：{e}")
+            yield self._fail_result(event, f"修改 Bot 头像失败：{e}")
 
     async def cmd_setstatus(
         self, event: AstrMessageEvent, status: str = "", message: str = ""
@@ -158,7 +163,7 @@ class BotCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         if not status:
@@ -185,8 +190,8 @@ class BotCommandsMixin(AdminCommandMixin):
                     for k in ["online", "away", "offline", "在线", "离开", "离线"]
                 ]
             )
-            yield event.plain_result(
-                f"无效的状态：`{status}`\n\n可用状态：{valid_statuses}"
+            yield self._fail_result(
+                event, f"无效的状态：`{status}`\n\n可用状态：{valid_statuses}"
             )
             return
 
@@ -207,7 +212,7 @@ class BotCommandsMixin(AdminCommandMixin):
             yield event.plain_result(result_msg)
         except Exception as e:
             logger.error(f"修改 Bot 状态失败：{e}")
-            yield event.plain_result(f"修改 Bot 状态失败：{e}")
+            yield self._fail_result(event, f"修改 Bot 状态失败：{e}")
 
     async def cmd_statusmsg(self, event: AstrMessageEvent, message: str = ""):
         """设置或清除 Bot 的状态消息（不改变在线状态）
@@ -221,7 +226,7 @@ class BotCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         try:
@@ -240,7 +245,7 @@ class BotCommandsMixin(AdminCommandMixin):
                 yield event.plain_result("已清除状态消息")
         except Exception as e:
             logger.error(f"设置状态消息失败：{e}")
-            yield event.plain_result(f"设置状态消息失败：{e}")
+            yield self._fail_result(event, f"设置状态消息失败：{e}")
 
     async def cmd_purge_bot_messages(
         self, event: AstrMessageEvent, limit: int = 100, room_id: str = ""
@@ -256,76 +261,69 @@ class BotCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         try:
             limit = int(limit)
         except (TypeError, ValueError):
-            yield event.plain_result("数量必须是整数")
+            yield self._fail_result(event, "数量必须是整数")
             return
 
         if limit <= 0:
-            yield event.plain_result("数量必须大于 0")
+            yield self._fail_result(event, "数量必须大于 0")
             return
 
-        target_room_id = room_id.strip() or str(event.get_session_id() or "").strip()
+        target_room_id = self._resolve_target_room_id(event, room_id)
         if not target_room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
-        bot_user_id = getattr(client, "user_id", None)
+        bot_user_id = self._get_command_context(event).bot_user_id
         if not bot_user_id:
             try:
                 whoami = await client.whoami()
                 bot_user_id = whoami.get("user_id")
             except Exception as e:
-                yield event.plain_result(f"获取 Bot 用户 ID 失败：{e}")
+                yield self._fail_result(event, f"获取 Bot 用户 ID 失败：{e}")
                 return
 
-        scanned = 0
-        redacted = 0
-        failed = 0
-        from_token = None
-        remaining = limit
+        async def _purge(job) -> str:
+            scanned = 0
+            redacted = 0
+            failed = 0
 
-        while remaining > 0:
-            batch_limit = min(100, remaining)
             try:
-                resp = await client.room_messages(
-                    room_id=target_room_id,
-                    from_token=from_token,
-                    direction="b",
-                    limit=batch_limit,
-                )
-            except Exception as e:
-                yield event.plain_result(f"拉取房间消息失败：{e}")
-                return
-
-            chunk = resp.get("chunk", []) or []
-            if not chunk:
-                break
-
-            for msg in chunk:
-                scanned += 1
-                if msg.get("sender") != bot_user_id:
-                    continue
-                event_id = msg.get("event_id")
-                if not event_id:
-                    continue
-                try:
-                    await client.redact_event(
-                        target_room_id, event_id, reason="admin purge bot messages"
+                async for msg in self._scan_room_history(
+                    client, target_room_id, limit=limit
+                ):
+                    scanned += 1
+                    if msg.get("sender") == bot_user_id and msg.get("event_id"):
+                        try:
+                            await client.redact_event(
+                                target_room_id,
+                                msg["event_id"],
+                                reason="admin purge bot messages",
+                            )
+                            redacted += 1
+                        except Exception:
+                            failed += 1
+                    job.progress(
+                        scanned, limit, f"撤回 {redacted} 条，失败 {failed} 条"
                     )
-                    redacted += 1
-                except Exception:
-                    failed += 1
+            except Exception as e:
+                return (
+                    f"拉取房间消息失败：{e}（已扫描 {scanned} 条，撤回 {redacted} 条）"
+                )
 
-            remaining -= len(chunk)
-            from_token = resp.get("end")
-            if not from_token:
-                break
+            return f"清理完成：扫描 {scanned} 条，撤回 {redacted} 条，失败 {failed} 条"
 
         yield event.plain_result(
-            f"清理完成：扫描 {scanned} 条，撤回 {redacted} 条，失败 {failed} 条"
+            await self._start_job(
+                event,
+                "purgebot",
+                f"清理房间 {target_room_id} 最近 {limit} 条中的机器人消息",
+                _purge,
+                background=limit > self._PURGE_INLINE_LIMIT,
+            )
         )
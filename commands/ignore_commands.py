@@ -22,12 +22,12 @@ class IgnoreCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         user_id = self._parse_user_id(user, event)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         try:
@@ -35,7 +35,7 @@ class IgnoreCommandsMixin(AdminCommandMixin):
             yield event.plain_result(f"已屏蔽 {user_id}")
         except Exception as e:
             logger.error(f"屏蔽用户失败：{e}")
-            yield event.plain_result(f"屏蔽用户失败：{e}")
+            yield self._fail_result(event, f"屏蔽用户失败：{e}")
 
     async def cmd_unignore(self, event: AstrMessageEvent, user: str):
         """取消屏蔽用户
@@ -47,12 +47,12 @@ class IgnoreCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         user_id = self._parse_user_id(user, event)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         try:
@@ -60,7 +60,7 @@ class IgnoreCommandsMixin(AdminCommandMixin):
             yield event.plain_result(f"已取消屏蔽 {user_id}")
         except Exception as e:
             logger.error(f"取消屏蔽失败：{e}")
-            yield event.plain_result(f"取消屏蔽失败：{e}")
+            yield self._fail_result(event, f"取消屏蔽失败：{e}")
 
     async def cmd_ignorelist(self, event: AstrMessageEvent):
         """查看屏蔽列表
@@ -69,7 +69,7 @@ class IgnoreCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         try:
@@ -87,4 +87,4 @@ class IgnoreCommandsMixin(AdminCommandMixin):
 
         except Exception as e:
             logger.error(f"获取屏蔽列表失败：{e}")
-            yield event.plain_result(f"获取屏蔽列表失败：{e}")
+            yield self._fail_result(event, f"获取屏蔽列表失败：{e}")
@@ -0,0 +1,83 @@
+"""
+Matrix Admin Plugin - Job Commands
+后台任务查看与取消命令
+"""
+
+import time
+
+from astrbot.api.event import AstrMessageEvent
+
+from ..jobs import JOB_STATUS_LABELS
+from .base import AdminCommandMixin
+
+
+class JobCommandsMixin(AdminCommandMixin):
+    """后台任务命令：jobs, job, cancel"""
+
+    async def cmd_jobs(self, event: AstrMessageEvent):
+        """列出后台任务
+
+        用法：/admin jobs
+        """
+        if self.job_manager is None:
+            yield self._fail_result(event, "后台任务未启用")
+            return
+
+        jobs = self.job_manager.list()
+        if not jobs:
+            yield event.plain_result("当前没有后台任务")
+            return
+
+        active = [job for job in jobs if not job.finished]
+        lines = [f"后台任务（进行中 {len(active)} 个，共 {len(jobs)} 个）："]
+        for job in jobs[:30]:
+            lines.append(f"- {job.summary()}")
+        yield event.plain_result("\n".join(lines))
+
+    async def cmd_job(self, event: AstrMessageEvent, job_id: str):
+        """查看后台任务详情
+
+        用法：/admin job <id>
+        """
+        if self.job_manager is None:
+            yield self._fail_result(event, "后台任务未启用")
+            return
+
+        job = self.job_manager.get(job_id)
+        if job is None:
+            yield self._fail_result(event, f"未找到后台任务 #{job_id}")
+            return
+
+        created = time.strftime("%m-%d %H:%M:%S", time.localtime(job.created_at))
+        lines = [
+            f"任务 #{job.id} [{job.kind}]：{job.description}",
+            f"状态：{JOB_STATUS_LABELS.get(job.status, job.status)}",
+            f"进度：{job.progress_text()}" + (f"（{job.note}）" if job.note else ""),
+            f"提交：{created}，用时 {job.elapsed():.1f}s",
+        ]
+        if job.error:
+            lines.append(f"错误：{job.error}")
+        if job.result:
+            lines.append(f"结果：\n{job.result}")
+        yield event.plain_result("\n".join(lines))
+
+    async def cmd_cancel(self, event: AstrMessageEvent, job_id: str):
+        """取消后台任务
+
+        用法：/admin cancel <id>
+        """
+        if self.job_manager is None:
+            yield self._fail_result(event, "后台任务未启用")
+            return
+
+        job = self.job_manager.cancel(job_id)
+        if job is None:
+            yield self._fail_result(event, f"未找到后台任务 #{job_id}")
+            return
+        if job.finished:
+            label = JOB_STATUS_LABELS.get(job.status, job.status)
+            yield event.plain_result(f"任务 #{job.id} 已结束（{label}），无需取消")
+            return
+        yield event.plain_result(
+            f"已请求取消任务 #{job.id}，当前进度 {job.progress_text()}"
+        )
@@ -0,0 +1,310 @@
+"""
+Matrix Admin Plugin - Knock Commands
+敲门请求队列相关命令
+"""
+
+import time
+
+from astrbot.api import logger
+from astrbot.api.event import AstrMessageEvent
+
+from .room_commands import RoomCommandsMixin
+
+
+class KnockCommandsMixin(RoomCommandsMixin):
+    """敲门队列命令：knocks, knockapprove, knockdeny"""
+
+    _KNOCK_INDEX_TTL = 120.0
+    _KNOCK_JOIN_RULES = {"knock", "knock_restricted"}
+    _knock_index: dict | None = None
+
+    def _knock_index_state(self, client) -> dict:
+        """按 bot 用户返回敲门索引：{"knocks": {(room, user): reason}, "refreshed_at"}。"""
+        if self._knock_index is None:
+            self._knock_index = {}
+        bot_user_id = str(getattr(client, "user_id", "") or "")
+        return self._knock_index.setdefault(
+            bot_user_id, {"knocks": {}, "refreshed_at": 0.0}
+        )
+
+    async def _scan_room_knocks(self, client, room_id: str) -> dict[str, str]:
+        """返回房间内 membership=knock 的用户及理由；非敲门房间直接跳过成员拉取。"""
+        try:
+            join_rules = await client.get_room_state_event(room_id, "m.room.join_rules")
+        except Exception as e:
+            if self._is_not_found_error(e):
+                return {}
+            raise
+        if isinstance(join_rules, dict) and isinstance(join_rules.get("content"), dict):
+            join_rules = join_rules["content"]
+        if not isinstance(join_rules, dict):
+            return {}
+        if join_rules.get("join_rule") not in self._KNOCK_JOIN_RULES:
+            return {}
+
+        members_resp = await client.get_room_members(room_id)
+        chunk = members_resp.get("chunk", []) if isinstance(members_resp, dict) else []
+        knocks: dict[str, str] = {}
+        for evt in chunk or []:
+            if not isinstance(evt, dict) or evt.get("type") != "m.room.member":
+                continue
+            content = evt.get("content", {})
+            user_id = evt.get("state_key")
+            if isinstance(content, dict) and user_id:
+                if content.get("membership") == "knock":
+                    knocks[user_id] = str(content.get("reason") or "")
+        return knocks
+
+    async def _knock_permission_issue(
+        self, client, room_id: str, actions: tuple[str, ...] = ("invite", "kick")
+    ) -> str:
+        """检查机器人在房间内的 invite / kick 权限，不足时返回说明，否则返回空串。"""
+        try:
+            power_levels = await client.get_power_levels(room_id)
+        except Exception as e:
+            return f"无法读取 power levels：{e}"
+        if not isinstance(power_levels, dict):
+            return "无法读取 power levels"
+        users = power_levels.get("users", {})
+        if not isinstance(users, dict):
+            users = {}
+        bot_user_id = str(getattr(client, "user_id", "") or "")
+        try:
+            bot_power = int(
+                users.get(bot_user_id, power_levels.get("users_default", 0))
+            )
+        except (TypeError, ValueError):
+            bot_power = 0
+
+        missing = []
+        for action in actions:
+            default = 0 if action == "invite" else 50
+            try:
+                required = int(power_levels.get(action, default))
+            except (TypeError, ValueError):
+                required = default
+            if bot_power < required:
+                missing.append(f"{action} 需要 >= {required}")
+        if not missing:
+            return ""
+        return f"机器人权限 {bot_power}，" + "、".join(missing)
+
+    async def _refresh_knock_index(self, client, concurrency: int) -> tuple[int, int]:
+        """重建敲门索引，返回 (扫描房间数, 失败房间数)。"""
+        room_ids = await self._list_joined_rooms(client)
+
+        async def _scan(room_id: str) -> dict[str, str]:
+            return await self._scan_room_knocks(client, room_id)
+
+        results = await self._run_bounded(room_ids, _scan, concurrency, bulk=True)
+        knocks: dict[tuple[str, str], str] = {}
+        failed = 0
+        for room_id, item in zip(room_ids, results):
+            if isinstance(item, Exception):
+                failed += 1
+                logger.debug(f"扫描房间 {room_id} 敲门请求失败：{item}")
+                continue
+            for user_id, reason in item.items():
+                knocks[(room_id, user_id)] = reason
+
+        # 只对有敲门请求的房间检查权限，列表中标出机器人无法处理的房间
+        knock_rooms = sorted({room_id for room_id, _ in knocks})
+        issues = await self._run_bounded(
+            knock_rooms,
+            lambda room_id: self._knock_permission_issue(client, room_id),
+            concurrency,
+        )
+        blocked = {
+            room_id: str(issue) for room_id, issue in zip(knock_rooms, issues) if issue
+        }
+
+        state = self._knock_index_state(client)
+        state["knocks"] = knocks
+        state["blocked"] = blocked
+        state["refreshed_at"] = time.monotonic()
+        return len(room_ids), failed
+
+    async def _get_pending_knocks(
+        self,
+        client,
+        concurrency: int,
+        refresh: bool = False,
+    ) -> dict[tuple[str, str], str]:
+        state = self._knock_index_state(client)
+        if refresh or time.monotonic() - state["refreshed_at"] >= self._KNOCK_INDEX_TTL:
+            await self._refresh_knock_index(client, concurrency)
+        return state["knocks"]
+
+    @staticmethod
+    def _match_knocks(
+        knocks: dict[tuple[str, str], str],
+        selector: str,
+    ) -> list[tuple[str, str]]:
+        """按 all / room_id / user_id（逗号分隔）筛选敲门请求；未给出选择器时不匹配任何请求。"""
+        tokens = {
+            item.strip() for item in str(selector or "").split(",") if item.strip()
+        }
+        if not tokens:
+            return []
+        if "all" in {t.lower() for t in tokens}:
+            return sorted(knocks)
+        return sorted(key for key in knocks if key[0] in tokens or key[1] in tokens)
+
+    async def cmd_knocks(self, event: AstrMessageEvent, refresh: str = ""):
+        """列出机器人所管理房间中待处理的敲门请求
+
+        用法：/admin knocks [refresh]
+        """
+        client = self._get_matrix_client(event)
+        if not client:
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
+            return
+
+        force = str(refresh or "").strip().lower() in ("refresh", "yes", "1", "true")
+        try:
+            knocks = await self._get_pending_knocks(
+                client, self._normalize_concurrency(), refresh=force
+            )
+        except Exception as e:
+            logger.error(f"获取敲门请求失败：{e}")
+            yield self._fail_result(event, f"获取敲门请求失败：{e}")
+            return
+
+        if not knocks:
+            yield event.plain_result("当前没有待处理的敲门请求")
+            return
+
+        blocked = self._knock_index_state(client).get("blocked") or {}
+        lines = [f"待处理敲门请求（共 {len(knocks)} 条）："]
+        current_room = None
+        for room_id, user_id in sorted(knocks):
+            if room_id != current_room:
+                current_room = room_id
+                issue = blocked.get(room_id)
+                lines.append(
+                    f"房间 `{room_id}`："
+                    + (f"（⚠️ 无法处理：{issue}）" if issue else "")
+                )
+            reason = knocks[(room_id, user_id)]
+            lines.append(f"  - {user_id}" + (f"：{reason}" if reason else ""))
+        lines.append(
+            "使用 /admin knockapprove 或 /admin knockdeny 加 all / 房间 / 用户批量处理"
+        )
+        yield event.plain_result("\n".join(lines))
+
+    async def _handle_knocks(
+        self,
+        event: AstrMessageEvent,
+        selector: str,
+        approve: bool,
+        reason: str = "",
+    ):
+        client = self._get_matrix_client(event)
+        if not client:
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
+            return
+
+        if not str(selector or "").strip():
+            command = "knockapprove" if approve else "knockdeny"
+            yield self._fail_result(
+                event,
+                f"请指定要处理的敲门请求：/admin {command} <all|room_id|user_id,...>",
+            )
+            return
+
+        concurrency = self._normalize_concurrency()
+        try:
+            knocks = await self._get_pending_knocks(client, concurrency)
+        except Exception as e:
+            logger.error(f"获取敲门请求失败：{e}")
+            yield self._fail_result(event, f"获取敲门请求失败：{e}")
+            return
+
+        targets = self._match_knocks(knocks, selector)
+        if not targets:
+            yield event.plain_result("没有匹配的敲门请求")
+            return
+
+        reason_text = str(reason or "").strip() or None
+        action = "批准" if approve else "拒绝"
+        lines: list[str] = []
+
+        # 执行前重新检查权限，跳过机器人无法处理的房间
+        rooms = sorted({room_id for room_id, _ in targets})
+        issues = await self._run_bounded(
+            rooms,
+            lambda room_id: self._knock_permission_issue(
+                client, room_id, ("invite",) if approve else ("kick",)
+            ),
+            concurrency,
+        )
+        blocked_rooms: set[str] = set()
+        for room_id, issue in zip(rooms, issues):
+            if issue:
+                blocked_rooms.add(room_id)
+                lines.append(f"- ⚠️ 房间 {room_id} 无法{action}：{issue}")
+        targets = [target for target in targets if target[0] not in blocked_rooms]
+
+        async def _process(target: tuple[str, str]) -> str:
+            room_id, user_id = target
+            # 索引可能已过期：只在对方仍处于 knock 状态时操作，避免误踢已入房成员
+            member = await client.get_room_member(room_id, user_id)
+            membership = (
+                str(member.get("membership") or "") if isinstance(member, dict) else ""
+            )
+            if membership != "knock":
+                return membership or "unknown"
+            if approve:
+                await client.invite_user(room_id, user_id)
+            else:
+                await client.kick_user(room_id, user_id, reason_text)
+            return ""
+
+        results = await self._run_bounded(targets, _process, concurrency)
+        ok_count = 0
+        stale_count = 0
+        failed_count = 0
+        for target, item in zip(targets, results):
+            if isinstance(item, Exception):
+                failed_count += 1
+                lines.append(f"- ❌ {target[1]} @ {target[0]}：{item}")
+                continue
+            knocks.pop(target, None)
+            if item:
+                stale_count += 1
+                lines.append(
+                    f"- ⏭️ {target[1]} @ {target[0]}：当前状态为 {item}，已跳过"
+                )
+                continue
+            ok_count += 1
+        header = (
+            f"已{action}敲门请求：成功 {ok_count} 条，失败 {failed_count} 条，"
+            f"已不在敲门状态 {stale_count} 条"
+        )
+        if blocked_rooms:
+            header += f"，{len(blocked_rooms)} 个房间权限不足"
+        lines.insert(0, header)
+        yield event.plain_result("\n".join(lines[:51]))
+
+    async def cmd_knock_approve(self, event: AstrMessageEvent, selector: str = ""):
+        """批量批准敲门请求（邀请入房）
+
+        用法：/admin knockapprove <all|room_id|user_id,...>
+        """
+        async for result in self._handle_knocks(event, selector, approve=True):
+            yield result
+
+    async def cmd_knock_deny(
+        self,
+        event: AstrMessageEvent,
+        selector: str = "",
+        reason: str = "",
+    ):
+        """批量拒绝敲门请求（踢出敲门成员）
+
+        用法：/admin knockdeny <all|room_id|user_id,...> [原因]
+        """
+        async for result in self._handle_knocks(
+            event, selector, approve=False, reason=reason
+        ):
+            yield result
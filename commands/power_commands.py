@@ -33,7 +33,7 @@ class PowerCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target_room_id = self._resolve_target_room_id(event, room_id)
@@ -48,12 +48,12 @@ class PowerCommandsMixin(AdminCommandMixin):
             level_text = "mod"
 
         if not target_room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
         user_id = self._parse_user_id(user, event, target_room_id)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         level_map = {
@@ -74,7 +74,7 @@ class PowerCommandsMixin(AdminCommandMixin):
             )
         except Exception as e:
             logger.error(f"提升权限失败：{e}")
-            yield event.plain_result(f"提升权限失败：{e}")
+            yield self._fail_result(event, f"提升权限失败：{e}")
 
     async def cmd_demote(self, event: AstrMessageEvent, user: str, room_id: str = ""):
         """降低用户权限为普通成员
@@ -87,17 +87,17 @@ class PowerCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target_room_id = self._resolve_target_room_id(event, room_id)
         if not target_room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
         user_id = self._parse_user_id(user, event, target_room_id)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         try:
@@ -107,7 +107,7 @@ class PowerCommandsMixin(AdminCommandMixin):
             )
         except Exception as e:
             logger.error(f"降级失败：{e}")
-            yield event.plain_result(f"降级失败：{e}")
+            yield self._fail_result(event, f"降级失败：{e}")
 
     async def cmd_power(
         self,
@@ -130,17 +130,17 @@ class PowerCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target_room_id = self._resolve_target_room_id(event, room_id)
         if not target_room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
         user_id = self._parse_user_id(user, event, target_room_id)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         try:
@@ -150,7 +150,7 @@ class PowerCommandsMixin(AdminCommandMixin):
             )
         except Exception as e:
             logger.error(f"设置权限失败：{e}")
-            yield event.plain_result(f"设置权限失败：{e}")
+            yield self._fail_result(event, f"设置权限失败：{e}")
 
     async def cmd_admins(self, event: AstrMessageEvent, room_id: str = ""):
         """列出房间管理员
@@ -159,12 +159,12 @@ class PowerCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target_room_id = self._resolve_target_room_id(event, room_id)
         if not target_room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
         try:
@@ -200,4 +200,4 @@ class PowerCommandsMixin(AdminCommandMixin):
 
         except Exception as e:
             logger.error(f"获取管理员列表失败：{e}")
-            yield event.plain_result(f"获取管理员列表失败：{e}")
+            yield self._fail_result(event, f"获取管理员列表失败：{e}")
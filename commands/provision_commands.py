@@ -0,0 +1,302 @@
+"""
+Matrix Admin Plugin - Provision Commands
+按模板批量创建 Space 与子房间
+"""
+
+import asyncio
+import json
+from pathlib import Path
+
+from astrbot.api import logger
+from astrbot.api.event import AstrMessageEvent
+from astrbot.core.star.filter.command import GreedyStr
+
+from ..tool import get_plugin_data_dir
+from .room_commands import RoomCommandsMixin
+
+
+class ProvisionCommandsMixin(RoomCommandsMixin):
+    """模板化创建命令：provision"""
+
+    JOIN_RULES = {"public", "invite", "knock", "restricted", "knock_restricted"}
+    HISTORY_VISIBILITY = {"world_readable", "shared", "invited", "joined"}
+
+    _TEMPLATE_SUFFIXES = (".yaml", ".yml", ".json")
+
+    @staticmethod
+    def _provision_template_dir() -> Path:
+        return get_plugin_data_dir() / "provision_templates"
+
+    @staticmethod
+    def _parse_template_text(text: str, suffix: str = "") -> dict:
+        """解析 JSON / YAML 模板文本，YAML 需要安装 PyYAML。
+
+        解析错误只返回行列号，不回显解析器给出的原文片段。
+        """
+        if suffix in (".yaml", ".yml") or not text.lstrip().startswith("{"):
+            try:
+                import yaml
+            except ImportError as exc:
+                raise ValueError("解析 YAML 模板需要安装 PyYAML，或改用 JSON") from exc
+            try:
+                data = yaml.safe_load(text)
+            except yaml.YAMLError as exc:
+                logger.debug(f"解析 YAML 模板失败：{exc}")
+                mark = getattr(exc, "problem_mark", None)
+                where = f"（第 {mark.line + 1} 行）" if mark is not None else ""
+                raise ValueError(f"YAML 解析失败{where}") from None
+        else:
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError as exc:
+                logger.debug(f"解析 JSON 模板失败：{exc}")
+                raise ValueError(
+                    f"JSON 解析失败（第 {exc.lineno} 行第 {exc.colno} 列）"
+                ) from None
+        if not isinstance(data, dict):
+            raise ValueError("模板顶层必须是对象")
+        return data
+
+    def _resolve_template_path(self, name: str) -> Path:
+        """模板只能是 provision_templates 目录下的相对路径，拒绝绝对路径与 ..。"""
+        relative = Path(name)
+        if relative.is_absolute() or name.startswith("~") or ".." in relative.parts:
+            raise ValueError("模板只能是 provision_templates 目录下的相对路径")
+        base = self._provision_template_dir().resolve()
+        candidates = [base / relative]
+        if not relative.suffix:
+            candidates += [
+                base / f"{name}{suffix}" for suffix in self._TEMPLATE_SUFFIXES
+            ]
+        for candidate in candidates:
+            path = candidate.resolve()
+            # 解析符号链接后仍须位于模板目录内
+            if path.is_relative_to(base) and path.is_file():
+                return path
+        raise ValueError(
+            f"模板文件不存在：{name}（请放在插件数据目录 provision_templates/ 下）"
+        )
+
+    async def _load_provision_template(self, template: str) -> dict:
+        template_text = str(template or "").strip()
+        if not template_text:
+            raise ValueError("请提供模板名称或 JSON 内容")
+        if template_text.startswith("{"):
+            return self._parse_template_text(template_text)
+
+        path = self._resolve_template_path(template_text)
+        text = await asyncio.to_thread(path.read_text, encoding="utf-8")
+        return self._parse_template_text(text, path.suffix.lower())
+
+    def _build_create_room_kwargs(
+        self,
+        room_spec: dict,
+        defaults: dict,
+        parent_space_id: str = "",
+        via_server: str = "",
+    ) -> dict:
+        """把模板条目转换为 create_room 参数，所有状态一次性放入 initial_state。
+
+        模板字段类型不符时抛出 ValueError。
+        """
+        if not isinstance(room_spec, dict) or not isinstance(defaults, dict):
+            raise ValueError("房间条目与 defaults 必须是对象")
+        for source, label in ((defaults, "defaults."), (room_spec, "")):
+            if not isinstance(source.get("initial_state") or [], list):
+                raise ValueError(f"{label}initial_state 必须是列表")
+            if not isinstance(source.get("power_levels") or {}, dict):
+                raise ValueError(f"{label}power_levels 必须是对象")
+        merged = {**defaults, **room_spec}
+        public = bool(merged.get("public", False))
+
+        join_rule = str(merged.get("join_rule") or "").strip()
+        if join_rule and join_rule not in self.JOIN_RULES:
+            raise ValueError(f"join_rule 无效：{join_rule}")
+        history_visibility = str(merged.get("history_visibility") or "").strip()
+        if history_visibility and history_visibility not in self.HISTORY_VISIBILITY:
+            raise ValueError(f"history_visibility 无效：{history_visibility}")
+
+        initial_state: list[dict] = []
+        if merged.get("encrypted"):
+            initial_state.append(
+                {
+                    "type": "m.room.encryption",
+                    "state_key": "",
+                    "content": {"algorithm": "m.megolm.v1.aes-sha2"},
+                }
+            )
+        if join_rule:
+            join_content: dict = {"join_rule": join_rule}
+            if join_rule in ("restricted", "knock_restricted"):
+                if not parent_space_id:
+                    raise ValueError(f"join_rule={join_rule} 需要所属 Space")
+                join_content["allow"] = [
+                    {"type": "m.room_membership", "room_id": parent_space_id}
+                ]
+            initial_state.append(
+                {"type": "m.room.join_rules", "state_key": "", "content": join_content}
+            )
+        if history_visibility:
+            initial_state.append(
+                {
+                    "type": "m.room.history_visibility",
+                    "state_key": "",
+                    "content": {"history_visibility": history_visibility},
+                }
+            )
+        if parent_space_id:
+            initial_state.append(
+                {
+                    "type": "m.space.parent",
+                    "state_key": parent_space_id,
+                    "content": {"via": [via_server], "canonical": True},
+                }
+            )
+        for extra in (defaults.get("initial_state") or []) + (
+            room_spec.get("initial_state") or []
+        ):
+            if isinstance(extra, dict) and extra.get("type"):
+                initial_state.append(
+                    {
+                        "type": extra["type"],
+                        "state_key": str(extra.get("state_key", "") or ""),
+                        "content": extra.get("content") or {},
+                    }
+                )
+
+        kwargs: dict = {
+            "name": str(merged.get("name") or "").strip() or None,
+            "topic": str(merged.get("topic") or "").strip() or None,
+            "is_public": public,
+            "initial_state": initial_state,
+        }
+        alias = str(room_spec.get("alias") or "").strip().lstrip("#").split(":", 1)[0]
+        if alias:
+            kwargs["room_alias_name"] = alias
+
+        power_levels = dict(defaults.get("power_levels") or {})
+        for key, value in (room_spec.get("power_levels") or {}).items():
+            if isinstance(value, dict) and isinstance(power_levels.get(key), dict):
+                power_levels[key] = {**power_levels[key], **value}
+            else:
+                power_levels[key] = value
+        if power_levels:
+            kwargs["power_level_content_override"] = power_levels
+        return kwargs
+
+    async def cmd_provision(self, event: AstrMessageEvent, template: GreedyStr):
+        """按模板批量创建 Space 及其子房间
+
+        用法：/admin provision <模板名称|JSON>
+
+        模板文件放在插件数据目录的 provision_templates/ 下，可省略 .yaml/.yml/.json 后缀。
+
+        模板示例（YAML）：
+            space: {name: 活动 2026, topic: 年度活动, alias: event2026}
+            defaults: {encrypted: true, join_rule: restricted, power_levels: {users_default: 0}}
+            rooms:
+              - {name: 公告, alias: event2026-news, power_levels: {events_default: 50}}
+              - {name: 闲聊, alias: event2026-chat}
+        """
+        client = self._get_matrix_client(event)
+        if not client:
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
+            return
+
+        try:
+            data = await self._load_provision_template(template)
+        except Exception as e:
+            yield self._fail_result(event, f"读取模板失败：{e}")
+            return
+
+        space_spec = data.get("space") or {}
+        defaults = data.get("defaults") or {}
+        room_specs = data.get("rooms") or []
+        if not isinstance(space_spec, dict) or not isinstance(defaults, dict):
+            yield self._fail_result(event, "模板格式无效：space/defaults 必须是对象")
+            return
+        if not isinstance(room_specs, list) or not all(
+            isinstance(item, dict) for item in room_specs
+        ):
+            yield self._fail_result(event, "模板格式无效：rooms 必须是对象列表")
+            return
+        if not space_spec.get("name"):
+            yield self._fail_result(event, "模板格式无效：缺少 space.name")
+            return
+
+        server_name = self._resolve_server_name(event)
+        if not self._is_valid_server_name(server_name):
+            yield self._fail_result(
+                event, "无法确定有效的 homeserver（via），请确保机器人已登录 Matrix"
+            )
+            return
+
+        # 创建任何房间之前先完整校验模板，避免留下半成品 Space
+        try:
+            space_kwargs = self._build_create_room_kwargs(space_spec, {})
+            for spec in room_specs:
+                self._build_create_room_kwargs(
+                    spec, defaults, f"!placeholder:{server_name}", server_name
+                )
+        except ValueError as e:
+            yield self._fail_result(event, f"模板格式无效：{e}")
+            return
+
+        try:
+            result = await client.create_room(
+                creation_content={"type": "m.space"}, **space_kwargs
+            )
+        except Exception as e:
+            logger.error(f"创建 Space 失败：{e}")
+            yield self._fail_result(event, f"创建 Space 失败：{e}")
+            return
+        space_id = str(result.get("room_id", "") or "")
+        if not space_id:
+            yield self._fail_result(event, "创建 Space 失败：未返回 room_id")
+            return
+
+        async def _create_child(spec: dict) -> tuple[str, str, str]:
+            kwargs = self._build_create_room_kwargs(
+                spec, defaults, space_id, server_name
+            )
+            child = await client.create_room(**kwargs)
+            child_id = str(child.get("room_id", "") or "")
+            if not child_id:
+                raise ValueError("未返回 room_id")
+            link_error = ""
+            try:
+                await client.set_room_state_event(
+                    room_id=space_id,
+                    event_type="m.space.child",
+                    content={
+                        "via": [server_name],
+                        "suggested": bool(spec.get("suggested", True)),
+                    },
+                    state_key=child_id,
+                )
+            except Exception as e:
+                link_error = str(e)
+            return child_id, str(kwargs.get("name") or "未命名"), link_error
+
+        concurrency = self._normalize_concurrency(data.get("concurrency"))
+        results = await self._run_bounded(
+            room_specs, _create_child, concurrency, bulk=True
+        )
+
+        lines = [f"已创建 Space **{space_spec.get('name')}**：`{space_id}`"]
+        ok_count = 0
+        for spec, item in zip(room_specs, results):
+            if isinstance(item, Exception):
+                logger.error(f"创建子房间失败：{item}")
+                lines.append(f"- ❌ {spec.get('name') or '未命名'}：{item}")
+                continue
+            child_id, child_name, link_error = item
+            if link_error:
+                lines.append(f"- ⚠️ {child_name} (`{child_id}`) 挂载失败：{link_error}")
+                continue
+            ok_count += 1
+            lines.append(f"- ✅ {child_name} (`{child_id}`)")
+        lines.insert(
+            1, f"子房间：成功 {ok_count} 个，失败 {len(room_specs) - ok_count} 个"
+        )
+        yield event.plain_result("\n".join(lines))
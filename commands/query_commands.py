@@ -22,17 +22,17 @@ class QueryCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         user_id = self._parse_user_id(user, event)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         room_id = self._resolve_event_room_id(event)
         if not room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
         try:
@@ -74,7 +74,7 @@ class QueryCommandsMixin(AdminCommandMixin):
 
         except Exception as e:
             logger.error(f"查询用户信息失败：{e}")
-            yield event.plain_result(f"查询用户信息失败：{e}")
+            yield self._fail_result(event, f"查询用户信息失败：{e}")
 
     async def cmd_search(self, event: AstrMessageEvent, keyword: str, limit: int = 10):
         """搜索用户
@@ -87,7 +87,7 @@ class QueryCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         try:
@@ -120,4 +120,4 @@ class QueryCommandsMixin(AdminCommandMixin):
 
         except Exception as e:
             logger.error(f"搜索用户失败：{e}")
-            yield event.plain_result(f"搜索用户失败：{e}")
+            yield self._fail_result(event, f"搜索用户失败：{e}")
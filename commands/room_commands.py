@@ -3,7 +3,9 @@ Matrix Admin Plugin - Room Commands
 房间管理相关命令
 """
 
+import asyncio
 import re
+import time
 
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
@@ -16,6 +18,10 @@ class RoomCommandsMixin(AdminCommandMixin):
 
     _ROOM_ID_RE = re.compile(r"^![^\s:]+:[^\s:]+$")
     _SERVER_NAME_RE = re.compile(r"^[A-Za-z0-9.-]+(?::\d{1,5})?$")
+    _DIRECT_CACHE_TTL = 300.0
+    _direct_rooms_cache: dict | None = None
+    _ROOM_STATE_CACHE_TTL = 600.0
+    _room_alias_state_cache: dict | None = None
 
     @classmethod
     def _is_valid_room_id(cls, room_id: str) -> bool:
@@ -192,18 +198,86 @@ class RoomCommandsMixin(AdminCommandMixin):
         room_id_text = str(room_id or "").strip()
         if ":" in room_id_text:
             return room_id_text.split(":", 1)[1]
-        client = self._get_matrix_client(event)
-        client_user_id = str(getattr(client, "user_id", "") or "")
-        if ":" in client_user_id:
-            return client_user_id.split(":", 1)[1]
-        return ""
+        return self._get_command_context(event).server_name
 
-    @staticmethod
-    def _resolve_target_room(event: AstrMessageEvent, room_id: str = "") -> str | None:
+    def _resolve_target_room(
+        self, event: AstrMessageEvent, room_id: str = ""
+    ) -> str | None:
         if isinstance(room_id, str) and room_id.strip():
             return room_id.strip()
-        session_room = str(event.get_session_id() or "").strip()
-        return session_room or None
+        return self._resolve_event_room_id(event)
+
+    async def _collect_space_rooms(
+        self,
+        client,
+        space_id: str,
+        limit: int = 1000,
+    ) -> list[str]:
+        """分页遍历 Space 层级，返回其下的普通房间（不含子 Space 本身）。"""
+        next_token = None
+        room_ids: list[str] = []
+        seen: set[str] = {space_id}
+        while len(seen) <= limit:
+            request_kwargs = {"limit": 100}
+            if next_token:
+                request_kwargs["from_token"] = next_token
+            result = await client.get_room_hierarchy(space_id, **request_kwargs)
+            page_rooms = result.get("rooms", []) or []
+            for room in page_rooms:
+                if not isinstance(room, dict):
+                    continue
+                rid = str(room.get("room_id", "") or "")
+                if not rid or rid in seen:
+                    continue
+                seen.add(rid)
+                if room.get("room_type") == "m.space":
+                    continue
+                room_ids.append(rid)
+            next_token = result.get("next_batch")
+            if not next_token or not page_rooms:
+                break
+        return room_ids[:limit]
+
+    async def _resolve_room_set(
+        self,
+        client,
+        event: AstrMessageEvent,
+        spec: str = "",
+    ) -> tuple[list[str], str]:
+        """解析房间集合参数：all / Space ID / 逗号分隔的 room_id 列表。
+
+        返回 (room_ids, error)，error 非空时 room_ids 为空列表。
+        """
+        spec_text = str(spec or "").strip()
+        if spec_text.lower() == "all":
+            try:
+                return await self._list_joined_rooms(client), ""
+            except Exception as e:
+                return [], f"获取已加入房间失败：{e}"
+
+        room_ids = [
+            item.strip() for item in re.split(r"[,\s]+", spec_text) if item.strip()
+        ]
+        if not room_ids:
+            target = self._resolve_target_room(event)
+            return ([target], "") if target else ([], "无法获取房间 ID")
+
+        invalid = [rid for rid in room_ids if not self._is_valid_room_id(rid)]
+        if invalid:
+            return [], f"room_id 格式无效：{', '.join(invalid)}"
+
+        if len(room_ids) == 1:
+            is_space, _ = await self._ensure_space_room(client, room_ids[0])
+            if is_space:
+                try:
+                    children = await self._collect_space_rooms(client, room_ids[0])
+                except Exception as e:
+                    return [], f"获取 Space 子房间失败：{e}"
+                if not children:
+                    return [], "该 Space 下暂无子房间"
+                return children, ""
+
+        return list(dict.fromkeys(room_ids)), ""
 
     async def cmd_createroom(
         self,
@@ -221,7 +295,7 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         public = is_public.lower() in ("yes", "true", "1", "public")
@@ -235,10 +309,133 @@ class RoomCommandsMixin(AdminCommandMixin):
             )
         except Exception as e:
             logger.error(f"创建房间失败：{e}")
-            yield event.plain_result(f"创建房间失败：{e}")
+            yield self._fail_result(event, f"创建房间失败：{e}")
+
+    def _cache_room_alias_state(
+        self,
+        room_id: str,
+        canonical_alias: dict,
+        replacement_room: str = "",
+    ) -> None:
+        """记录房间的 canonical alias 与 tombstone，供 aliasaudit 等命令复用。"""
+        if self._room_alias_state_cache is None:
+            self._room_alias_state_cache = {}
+        self._room_alias_state_cache[room_id] = {
+            "canonical_alias": canonical_alias
+            if isinstance(canonical_alias, dict)
+            else {},
+            "replacement_room": replacement_room,
+            "fetched_at": time.monotonic(),
+        }
+
+    async def _get_room_alias_state(self, client, room_id: str) -> dict:
+        """返回 {"canonical_alias": content, "replacement_room": str}，优先读缓存。"""
+        cache = self._room_alias_state_cache or {}
+        cached = cache.get(room_id)
+        if (
+            cached
+            and time.monotonic() - cached["fetched_at"] < self._ROOM_STATE_CACHE_TTL
+        ):
+            return cached
+
+        async def _read_state(event_type: str) -> dict:
+            try:
+                content = await client.get_room_state_event(room_id, event_type)
+            except Exception as e:
+                if self._is_not_found_error(e):
+                    return {}
+                raise
+            if not isinstance(content, dict):
+                return {}
+            inner = content.get("content")
+            return inner if isinstance(inner, dict) else content
+
+        canonical_alias, tombstone = await asyncio.gather(
+            _read_state("m.room.canonical_alias"),
+            _read_state("m.room.tombstone"),
+        )
+        self._cache_room_alias_state(
+            room_id,
+            canonical_alias,
+            str(tombstone.get("replacement_room") or ""),
+        )
+        return self._room_alias_state_cache[room_id]
+
+    def _direct_rooms_state(self, client) -> dict:
+        """按 bot 用户返回 m.direct 缓存槽位：{"lock", "loaded_at", "rooms"}。"""
+        if self._direct_rooms_cache is None:
+            self._direct_rooms_cache = {}
+        bot_user_id = str(getattr(client, "user_id", "") or "")
+        return self._direct_rooms_cache.setdefault(
+            bot_user_id, {"lock": asyncio.Lock(), "loaded_at": 0.0, "rooms": {}}
+        )
+
+    @staticmethod
+    async def _fetch_direct_rooms(client) -> dict[str, list[str]]:
+        content = await client.get_account_data("m.direct")
+        if not isinstance(content, dict):
+            return {}
+        direct_rooms: dict[str, list[str]] = {}
+        for user_id, rooms in content.items():
+            if isinstance(rooms, list):
+                direct_rooms[str(user_id)] = [str(r) for r in rooms if r]
+        return direct_rooms
+
+    async def _get_direct_rooms(self, client) -> dict[str, list[str]]:
+        """返回缓存的 m.direct 映射，过期后重新拉取账户数据。"""
+        state = self._direct_rooms_state(client)
+        if time.monotonic() - state["loaded_at"] < self._DIRECT_CACHE_TTL:
+            return state["rooms"]
+        async with state["lock"]:
+            if time.monotonic() - state["loaded_at"] >= self._DIRECT_CACHE_TTL:
+                state["rooms"] = await self._fetch_direct_rooms(client)
+                state["loaded_at"] = time.monotonic()
+        return state["rooms"]
+
+    async def _record_direct_room(self, client, user_id: str, room_id: str) -> None:
+        """在锁内读取最新 m.direct、合并新房间后写回，避免覆盖其他客户端的修改。"""
+        state = self._direct_rooms_state(client)
+        async with state["lock"]:
+            direct_rooms = await self._fetch_direct_rooms(client)
+            rooms = direct_rooms.setdefault(user_id, [])
+            if room_id not in rooms:
+                rooms.append(room_id)
+                await client.set_account_data("m.direct", direct_rooms)
+            state["rooms"] = direct_rooms
+            state["loaded_at"] = time.monotonic()
+
+    async def _find_existing_dm_room(self, client, user_id: str) -> str | None:
+        """在 m.direct 记录中查找机器人与对方仍都在的私聊房间。"""
+        direct_rooms = await self._get_direct_rooms(client)
+        candidates = direct_rooms.get(user_id, [])
+        if not candidates:
+            return None
+
+        joined_rooms = set(await self._list_joined_rooms(client))
+        for room_id in reversed(candidates):
+            if room_id not in joined_rooms:
+                continue
+            record = self._load_room_member_record(room_id)
+            members = record.get("members") if record else None
+            if isinstance(members, dict) and members:
+                if user_id in members:
+                    return room_id
+                continue
+            try:
+                member = await client.get_room_member(room_id, user_id)
+            except Exception:
+                continue
+            if isinstance(member, dict) and member.get("membership") in (
+                "join",
+                "invite",
+            ):
+                return room_id
+        return None
 
     async def cmd_dm(self, event: AstrMessageEvent, user: str):
-        """创建与用户的私聊房间
+        """获取或创建与用户的私聊房间
+
+        优先复用 m.direct 中记录且双方仍在的私聊房间，不存在时才新建。
 
         用法：/admin dm <用户 ID>
 
@@ -247,23 +444,39 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         user_id = self._parse_user_id(user, event)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         try:
-            result = await client.create_dm_room(user_id)
-            room_id = result.get("room_id", "未知")
+            existing_room_id = await self._find_existing_dm_room(client, user_id)
+        except Exception as e:
+            logger.debug(f"查找已有私聊房间失败：{e}")
+            existing_room_id = None
+        if existing_room_id:
             yield event.plain_result(
-                f"已创建与 {user_id} 的私聊房间\n房间 ID: `{room_id}`"
+                f"已存在与 {user_id} 的私聊房间\n房间 ID: `{existing_room_id}`"
             )
+            return
+
+        try:
+            result = await client.create_dm_room(user_id)
+            room_id = result.get("room_id", "未知")
         except Exception as e:
             logger.error(f"创建私聊房间失败：{e}")
-            yield event.plain_result(f"创建私聊房间失败：{e}")
+            yield self._fail_result(event, f"创建私聊房间失败：{e}")
+            return
+
+        if room_id != "未知":
+            try:
+                await self._record_direct_room(client, user_id, room_id)
+            except Exception as e:
+                logger.warning(f"更新 m.direct 失败：{e}")
+        yield event.plain_result(f"已创建与 {user_id} 的私聊房间\n房间 ID: `{room_id}`")
 
     async def cmd_alias_set(
         self, event: AstrMessageEvent, alias: str, room_id: str = ""
@@ -275,17 +488,17 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target_room = self._resolve_target_room(event, room_id)
         if not target_room:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
         server_name = self._resolve_server_name(event, target_room)
         room_alias = self._parse_room_alias(alias, target_room, server_name)
         if not room_alias:
-            yield event.plain_result("无效的别名格式")
+            yield self._fail_result(event, "无效的别名格式")
             return
 
         try:
@@ -293,7 +506,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             yield event.plain_result(f"已设置别名：{room_alias}")
         except Exception as e:
             logger.error(f"设置别名失败：{e}")
-            yield event.plain_result(f"设置别名失败：{e}")
+            yield self._fail_result(event, f"设置别名失败：{e}")
 
     async def cmd_alias_del(self, event: AstrMessageEvent, alias: str):
         """删除房间别名
@@ -302,13 +515,13 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         server_name = self._resolve_server_name(event)
         room_alias = self._parse_room_alias(alias, "", server_name)
         if not room_alias:
-            yield event.plain_result("无效的别名格式")
+            yield self._fail_result(event, "无效的别名格式")
             return
 
         try:
@@ -316,7 +529,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             yield event.plain_result(f"已删除别名：{room_alias}")
         except Exception as e:
             logger.error(f"删除别名失败：{e}")
-            yield event.plain_result(f"删除别名失败：{e}")
+            yield self._fail_result(event, f"删除别名失败：{e}")
 
     async def cmd_alias_get(self, event: AstrMessageEvent, alias: str):
         """解析房间别名
@@ -325,13 +538,13 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         server_name = self._resolve_server_name(event)
         room_alias = self._parse_room_alias(alias, "", server_name)
         if not room_alias:
-            yield event.plain_result("无效的别名格式")
+            yield self._fail_result(event, "无效的别名格式")
             return
 
         try:
@@ -344,7 +557,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             )
         except Exception as e:
             logger.error(f"解析别名失败：{e}")
-            yield event.plain_result(f"解析别名失败：{e}")
+            yield self._fail_result(event, f"解析别名失败：{e}")
 
     async def cmd_publicrooms(
         self, event: AstrMessageEvent, server: str = "", limit: int = 20
@@ -355,7 +568,7 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         server_name = server.strip() or None
@@ -379,7 +592,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             yield event.plain_result("\n".join(lines))
         except Exception as e:
             logger.error(f"获取公共房间失败：{e}")
-            yield event.plain_result(f"获取公共房间失败：{e}")
+            yield self._fail_result(event, f"获取公共房间失败：{e}")
 
     async def cmd_forget(self, event: AstrMessageEvent, room_id: str = ""):
         """忘记房间（需先离开）
@@ -388,19 +601,19 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target_room = self._resolve_target_room(event, room_id)
         if not target_room:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
         try:
             await client.forget_room(target_room)
             yield event.plain_result(f"已忘记房间：`{target_room}`")
         except Exception as e:
             logger.error(f"忘记房间失败：{e}")
-            yield event.plain_result(f"忘记房间失败：{e}")
+            yield self._fail_result(event, f"忘记房间失败：{e}")
 
     async def cmd_upgrade(
         self, event: AstrMessageEvent, new_version: str, room_id: str = ""
@@ -411,12 +624,12 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target_room = self._resolve_target_room(event, room_id)
         if not target_room:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
         try:
             result = await client.upgrade_room(target_room, new_version)
@@ -426,7 +639,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             )
         except Exception as e:
             logger.error(f"升级房间失败：{e}")
-            yield event.plain_result(f"升级房间失败：{e}")
+            yield self._fail_result(event, f"升级房间失败：{e}")
 
     async def cmd_hierarchy(
         self, event: AstrMessageEvent, room_id: str = "", limit: int = 20
@@ -437,12 +650,12 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target_room = self._resolve_target_room(event, room_id)
         if not target_room:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
         try:
             result = await client.get_room_hierarchy(target_room, limit=limit)
@@ -459,7 +672,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             yield event.plain_result("\n".join(lines))
         except Exception as e:
             logger.error(f"获取房间层级失败：{e}")
-            yield event.plain_result(f"获取房间层级失败：{e}")
+            yield self._fail_result(event, f"获取房间层级失败：{e}")
 
     async def cmd_knock(
         self, event: AstrMessageEvent, room_id_or_alias: str, reason: str = ""
@@ -470,7 +683,7 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         try:
@@ -481,7 +694,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             yield event.plain_result(f"已发起 knock 请求：`{room_id}`")
         except Exception as e:
             logger.error(f"敲门请求失败：{e}")
-            yield event.plain_result(f"敲门请求失败：{e}")
+            yield self._fail_result(event, f"敲门请求失败：{e}")
 
     async def cmd_space_create(
         self,
@@ -496,12 +709,12 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         name = str(name or "").strip()
         if not name:
-            yield event.plain_result("Space 名称不能为空")
+            yield self._fail_result(event, "Space 名称不能为空")
             return
 
         topic_text = str(topic or "").strip()
@@ -518,7 +731,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             "",
         }
         if normalized_public not in valid_public_values:
-            yield event.plain_result("is_public 参数无效，请使用 yes/no")
+            yield self._fail_result(event, "is_public 参数无效，请使用 yes/no")
             return
         public = normalized_public in ("yes", "true", "1", "public")
 
@@ -531,7 +744,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             )
             space_id = str(result.get("room_id", "") or "")
             if not space_id:
-                yield event.plain_result("创建 Space 失败：未返回 room_id")
+                yield self._fail_result(event, "创建 Space 失败：未返回 room_id")
                 return
             visibility = "公开" if public else "私有"
             lines = [
@@ -544,7 +757,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             yield event.plain_result("\n".join(lines))
         except Exception as e:
             logger.error(f"创建 Space 失败：{e}")
-            yield event.plain_result(f"创建 Space 失败：{e}")
+            yield self._fail_result(event, f"创建 Space 失败：{e}")
 
     async def cmd_space_link(
         self,
@@ -559,27 +772,27 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         space_id = str(space_id or "").strip()
         child_room_id = str(child_room_id or "").strip()
         if not space_id or not child_room_id:
-            yield event.plain_result("space_id 和 child_room_id 不能为空")
+            yield self._fail_result(event, "space_id 和 child_room_id 不能为空")
             return
         if not self._is_valid_room_id(space_id):
-            yield event.plain_result("space_id 格式无效，应为 !room:server")
+            yield self._fail_result(event, "space_id 格式无效，应为 !room:server")
             return
         if not self._is_valid_room_id(child_room_id):
-            yield event.plain_result("child_room_id 格式无效，应为 !room:server")
+            yield self._fail_result(event, "child_room_id 格式无效，应为 !room:server")
             return
         if space_id == child_room_id:
-            yield event.plain_result("space_id 与 child_room_id 不能相同")
+            yield self._fail_result(event, "space_id 与 child_room_id 不能相同")
             return
 
         ok, space_message = await self._ensure_space_room(client, space_id)
         if not ok:
-            yield event.plain_result(space_message)
+            yield self._fail_result(event, space_message)
             return
 
         ok, permission_message = await self._ensure_state_event_permission(
@@ -588,7 +801,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             "m.space.child",
         )
         if not ok:
-            yield event.plain_result(permission_message)
+            yield self._fail_result(event, permission_message)
             return
 
         ok, permission_message = await self._ensure_state_event_permission(
@@ -597,15 +810,16 @@ class RoomCommandsMixin(AdminCommandMixin):
             "m.space.parent",
         )
         if not ok:
-            yield event.plain_result(permission_message)
+            yield self._fail_result(event, permission_message)
             return
 
         server_name = self._resolve_server_name(event, child_room_id)
         if not server_name:
             server_name = self._resolve_server_name(event, space_id)
         if not self._is_valid_server_name(server_name):
-            yield event.plain_result(
-                "无法确定有效的 homeserver（via），请显式使用完整 room_id 并确保机器人已登录 Matrix"
+            yield self._fail_result(
+                event,
+                "无法确定有效的 homeserver（via），请显式使用完整 room_id 并确保机器人已登录 Matrix",
             )
             return
 
@@ -666,7 +880,7 @@ class RoomCommandsMixin(AdminCommandMixin):
                 except Exception as rollback_error:
                     logger.error(f"Space 挂载回滚失败：{rollback_error}")
             logger.error(f"Space 挂载失败：{e}")
-            yield event.plain_result(f"Space 挂载失败：{e}")
+            yield self._fail_result(event, f"Space 挂载失败：{e}")
 
     async def cmd_space_unlink(
         self,
@@ -680,27 +894,27 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         space_id = str(space_id or "").strip()
         child_room_id = str(child_room_id or "").strip()
         if not space_id or not child_room_id:
-            yield event.plain_result("space_id 和 child_room_id 不能为空")
+            yield self._fail_result(event, "space_id 和 child_room_id 不能为空")
             return
         if not self._is_valid_room_id(space_id):
-            yield event.plain_result("space_id 格式无效，应为 !room:server")
+            yield self._fail_result(event, "space_id 格式无效，应为 !room:server")
             return
         if not self._is_valid_room_id(child_room_id):
-            yield event.plain_result("child_room_id 格式无效，应为 !room:server")
+            yield self._fail_result(event, "child_room_id 格式无效，应为 !room:server")
             return
         if space_id == child_room_id:
-            yield event.plain_result("space_id 与 child_room_id 不能相同")
+            yield self._fail_result(event, "space_id 与 child_room_id 不能相同")
             return
 
         ok, space_message = await self._ensure_space_room(client, space_id)
         if not ok:
-            yield event.plain_result(space_message)
+            yield self._fail_result(event, space_message)
             return
 
         ok, permission_message = await self._ensure_state_event_permission(
@@ -709,7 +923,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             "m.space.child",
         )
         if not ok:
-            yield event.plain_result(permission_message)
+            yield self._fail_result(event, permission_message)
             return
 
         ok, permission_message = await self._ensure_state_event_permission(
@@ -718,7 +932,7 @@ class RoomCommandsMixin(AdminCommandMixin):
             "m.space.parent",
         )
         if not ok:
-            yield event.plain_result(permission_message)
+            yield self._fail_result(event, permission_message)
             return
 
         previous_child_event = None
@@ -773,7 +987,7 @@ class RoomCommandsMixin(AdminCommandMixin):
                     except Exception as rollback_error:
                         logger.error(f"Space 解绑回滚失败：{rollback_error}")
             logger.error(f"Space 解绑失败：{e}")
-            yield event.plain_result(f"Space 解绑失败：{e}")
+            yield self._fail_result(event, f"Space 解绑失败：{e}")
 
     async def cmd_space_children(
         self,
@@ -787,20 +1001,20 @@ class RoomCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         space_id = str(space_id or "").strip()
         if not space_id:
-            yield event.plain_result("space_id 不能为空")
+            yield self._fail_result(event, "space_id 不能为空")
             return
         if not self._is_valid_room_id(space_id):
-            yield event.plain_result("space_id 格式无效，应为 !room:server")
+            yield self._fail_result(event, "space_id 格式无效，应为 !room:server")
             return
 
         ok, space_message = await self._ensure_space_room(client, space_id)
         if not ok:
-            yield event.plain_result(space_message)
+            yield self._fail_result(event, space_message)
             return
 
         try:
@@ -809,35 +1023,40 @@ class RoomCommandsMixin(AdminCommandMixin):
             requested_limit = 20
 
         page_size = min(requested_limit, 100)
-        next_token = None
-        rooms: list[dict] = []
-        room_ids: set[str] = set()
 
-        try:
-            while len(rooms) < requested_limit:
-                request_kwargs = {"limit": page_size}
-                if next_token:
-                    request_kwargs["from_token"] = next_token
-                result = await client.get_room_hierarchy(space_id, **request_kwargs)
-                page_rooms = result.get("rooms", [])
-                for room in page_rooms:
-                    if not isinstance(room, dict):
-                        continue
-                    rid = str(room.get("room_id", "") or "")
-                    if rid and rid in room_ids:
-                        continue
-                    if rid:
-                        room_ids.add(rid)
-                    rooms.append(room)
-                    if len(rooms) >= requested_limit:
+        async def _list_children(job) -> str:
+            next_token = None
+            rooms: list[dict] = []
+            room_ids: set[str] = set()
+
+            try:
+                while len(rooms) < requested_limit:
+                    request_kwargs = {"limit": page_size}
+                    if next_token:
+                        request_kwargs["from_token"] = next_token
+                    result = await client.get_room_hierarchy(space_id, **request_kwargs)
+                    page_rooms = result.get("rooms", [])
+                    for room in page_rooms:
+                        if not isinstance(room, dict):
+                            continue
+                        rid = str(room.get("room_id", "") or "")
+                        if rid and rid in room_ids:
+                            continue
+                        if rid:
+                            room_ids.add(rid)
+                        rooms.append(room)
+                        if len(rooms) >= requested_limit:
+                            break
+                    job.progress(len(rooms), requested_limit)
+                    next_token = result.get("next_batch")
+                    if not next_token or not page_rooms:
                         break
-                next_token = result.get("next_batch")
-                if not next_token or not page_rooms:
-                    break
+            except Exception as e:
+                logger.error(f"获取 Space 子房间失败：{e}")
+                return f"获取 Space 子房间失败：{e}"
 
             if not rooms:
-                yield event.plain_result("该 Space 下暂无子房间")
-                return
+                return "该 Space 下暂无子房间"
 
             lines = [f"Space `{space_id}` 子房间（显示 {len(rooms)} 项）："]
             for room in rooms:
@@ -846,10 +1065,17 @@ class RoomCommandsMixin(AdminCommandMixin):
                 lines.append(f"- {name} ({rid})")
             if next_token and len(rooms) >= requested_limit:
                 lines.append("- ...（仍有更多子房间，调大 limit 可查看更多）")
-            yield event.plain_result("\n".join(lines))
-        except Exception as e:
-            logger.error(f"获取 Space 子房间失败：{e}")
-            yield event.plain_result(f"获取 Space 子房间失败：{e}")
+            return "\n".join(lines)
+
+        yield event.plain_result(
+            await self._start_job(
+                event,
+                "space",
+                f"遍历 Space {space_id} 子房间（最多 {requested_limit} 项）",
+                _list_children,
+                background=requested_limit > page_size,
+            )
+        )
 
     async def cmd_room_refresh(self, event: AstrMessageEvent, room_id: str = ""):
         """重新获取房间信息并刷新本地缓存
@@ -862,17 +1088,17 @@ class RoomCommandsMixin(AdminCommandMixin):
             )
             from astrbot_plugin_matrix_adapter.user_store import MatrixUserStore
         except Exception:
-            yield event.plain_result("未安装 Matrix 适配器插件，无法刷新房间缓存")
+            yield self._fail_result(event, "未安装 Matrix 适配器插件，无法刷新房间缓存")
             return
 
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target = self._resolve_target_room(event, room_id)
         if not target:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
         async def _refresh_room(target_room: str) -> tuple[bool, str]:
@@ -924,6 +1150,8 @@ class RoomCommandsMixin(AdminCommandMixin):
             room_name = None
             room_topic = None
             canonical_alias = None
+            canonical_alias_content: dict = {}
+            replacement_room = ""
             is_encrypted = False
             try:
                 state_events = await client.get_room_state(target_room)
@@ -942,8 +1170,14 @@ class RoomCommandsMixin(AdminCommandMixin):
                         room_topic = content.get("topic")
                     elif evt_type == "m.room.canonical_alias":
                         canonical_alias = content.get("alias")
+                        canonical_alias_content = content
                     elif evt_type == "m.room.encryption":
                         is_encrypted = True
+                    elif evt_type == "m.room.tombstone":
+                        replacement_room = str(content.get("replacement_room") or "")
+                self._cache_room_alias_state(
+                    target_room, canonical_alias_content, replacement_room
+                )
             except Exception as e:
                 logger.debug(f"获取房间状态失败：{e}")
 
@@ -964,31 +1198,41 @@ class RoomCommandsMixin(AdminCommandMixin):
                 if isinstance(rooms, dict):
                     rooms = rooms.get("joined_rooms", [])
                 if not isinstance(rooms, (list, tuple, set)):
-                    yield event.plain_result("获取已加入房间失败：返回格式无效")
+                    yield self._fail_result(event, "获取已加入房间失败：返回格式无效")
                     return
             except Exception as e:
-                yield event.plain_result(f"获取已加入房间失败：{e}")
+                yield self._fail_result(event, f"获取已加入房间失败：{e}")
                 return
 
             if not rooms:
                 yield event.plain_result("没有已加入的房间可刷新")
                 return
 
-            ok_count = 0
-            fail_count = 0
-            for room in rooms:
-                room_id = str(room or "").strip()
-                if not room_id:
-                    fail_count += 1
-                    continue
-                ok, _ = await _refresh_room(room_id)
-                if ok:
-                    ok_count += 1
-                else:
-                    fail_count += 1
+            rooms = list(rooms)
+
+            async def _refresh_all(job) -> str:
+                ok_count = 0
+                fail_count = 0
+                for index, room in enumerate(rooms):
+                    room_id = str(room or "").strip()
+                    if not room_id:
+                        fail_count += 1
+                        continue
+                    ok, _ = await _refresh_room(room_id)
+                    if ok:
+                        ok_count += 1
+                    else:
+                        fail_count += 1
+                    job.progress(index + 1, len(rooms), f"失败 {fail_count} 个")
+                return f"已刷新所有房间：成功 {ok_count} 个，失败 {fail_count} 个"
 
             yield event.plain_result(
-                f"已刷新所有房间：成功 {ok_count} 个，失败 {fail_count} 个"
+                await self._start_job(
+                    event,
+                    "roomrefresh",
+                    f"刷新全部已加入房间（{len(rooms)} 个）",
+                    _refresh_all,
+                )
             )
             return
 
@@ -996,4 +1240,4 @@ class RoomCommandsMixin(AdminCommandMixin):
         if ok:
             yield event.plain_result(message)
         else:
-            yield event.plain_result(message)
+            yield self._fail_result(event, message)
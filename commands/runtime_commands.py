@@ -3,15 +3,37 @@ Matrix Admin Plugin - Runtime Commands
 Matrix 适配器运行态与验证辅助命令
 """
 
+import asyncio
+import contextlib
+import inspect
+import os
+import random
+import tempfile
+import time
+
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
 from astrbot.core.message.components import Image, Reply
 
+from ..governor import rate_limit_delay
 from .base import AdminCommandMixin
 
 
 class RuntimeCommandsMixin(AdminCommandMixin):
-    """运行态命令：scanqr, matrixstatus, reconnect, resendpending"""
+    """运行态命令：scanqr, matrixstatus, reconnect, resendpending, perf, slowcalls"""
+
+    _QR_MAX_INPUT_BYTES = 20 * 1024 * 1024
+    _QR_MAX_EDGE = 1280
+    _QR_TEMP_PREFIX = "matrix_admin_qr_"
+    _STATUS_TIMEOUT = 5.0
+    _UNHEALTHY_STATE_KEYWORDS = ("error", "fail", "stop", "disconnect", "backoff")
+    _fleet_failed_seen: dict[str, int] | None = None
+    _RECONNECT_GATE_TIMEOUT = 60.0
+    _RECONNECT_GATE_POLL = 1.0
+    _RESEND_BATCH_SIZE = 100
+    _RESEND_DRAIN_CAP = 100000
+    _RESEND_PROGRESS_EVERY = 10
+    _RESEND_MAX_LIMITED_ROUNDS = 10
 
     @staticmethod
     def _normalize_qr_input(qr_input: str) -> str:
@@ -20,6 +42,46 @@ class RuntimeCommandsMixin(AdminCommandMixin):
             return normalized.split(";base64,", 1)[1].strip()
         return normalized
 
+    @classmethod
+    def _prepare_qr_image_file(cls, source_path: str) -> str:
+        """校验图片大小并按需缩放为灰度小图，返回用于扫码的文件路径。
+
+        该方法会读取并解码整张图片，必须在线程中调用。
+        """
+        size = os.path.getsize(source_path)
+        if size > cls._QR_MAX_INPUT_BYTES:
+            raise ValueError(
+                f"二维码图片过大（{size // 1024} KiB），"
+                f"上限 {cls._QR_MAX_INPUT_BYTES // 1024 // 1024} MiB"
+            )
+        try:
+            from PIL import Image as PILImage
+        except ImportError:
+            return source_path
+
+        with PILImage.open(source_path) as image:
+            if max(image.size) <= cls._QR_MAX_EDGE:
+                return source_path
+            scaled = image.convert("L")
+        scaled.thumbnail((cls._QR_MAX_EDGE, cls._QR_MAX_EDGE))
+        fd, output_path = tempfile.mkstemp(prefix=cls._QR_TEMP_PREFIX, suffix=".png")
+        os.close(fd)
+        scaled.save(output_path, "PNG")
+        return output_path
+
+    @classmethod
+    def _is_scaled_qr_file(cls, path: str) -> bool:
+        return os.path.dirname(path) == tempfile.gettempdir() and os.path.basename(
+            path
+        ).startswith(cls._QR_TEMP_PREFIX)
+
+    async def _load_qr_image_component(self, component: Image) -> str | None:
+        """把图片组件落地为本地文件并在线程中预处理，返回文件路径。"""
+        source_path = await component.convert_to_file_path()
+        if not source_path:
+            return None
+        return await asyncio.to_thread(self._prepare_qr_image_file, source_path)
+
     async def _extract_qr_input_from_reply(
         self, event: AstrMessageEvent
     ) -> tuple[str | None, str | None]:
@@ -32,10 +94,11 @@ class RuntimeCommandsMixin(AdminCommandMixin):
                 if not isinstance(reply_component, Image):
                     continue
                 try:
-                    payload = await reply_component.convert_to_base64()
-                    payload = self._normalize_qr_input(payload)
+                    payload = await self._load_qr_image_component(reply_component)
                     if payload:
                         return payload, None
+                except ValueError as exc:
+                    return None, str(exc)
                 except Exception as exc:
                     logger.debug(f"从引用图片提取二维码载荷失败：{exc}")
 
@@ -48,20 +111,31 @@ class RuntimeCommandsMixin(AdminCommandMixin):
     ) -> tuple[str | None, str | None]:
         normalized_input = self._normalize_qr_input(qr_input)
         if normalized_input:
+            if os.path.isfile(normalized_input):
+                try:
+                    return await asyncio.to_thread(
+                        self._prepare_qr_image_file, normalized_input
+                    ), None
+                except ValueError as exc:
+                    return None, str(exc)
+                except OSError as exc:
+                    # PIL 对非图片 / 截断文件抛出 UnidentifiedImageError（OSError 子类）
+                    return None, f"无法读取二维码图片：{exc}"
             return normalized_input, None
 
-        reply_payload, _ = await self._extract_qr_input_from_reply(event)
-        if reply_payload:
-            return reply_payload, None
+        reply_payload, reply_error = await self._extract_qr_input_from_reply(event)
+        if reply_payload or reply_error:
+            return reply_payload, reply_error
 
         for component in event.get_messages() or []:
             if not isinstance(component, Image):
                 continue
             try:
-                payload = await component.convert_to_base64()
-                payload = self._normalize_qr_input(payload)
+                payload = await self._load_qr_image_component(component)
                 if payload:
                     return payload, None
+            except ValueError as exc:
+                return None, str(exc)
             except Exception as exc:
                 logger.debug(f"从消息图片提取二维码载荷失败：{exc}")
 
@@ -85,51 +159,182 @@ class RuntimeCommandsMixin(AdminCommandMixin):
                 matrix_platform_id,
             )
             if error:
-                yield event.plain_result(error)
+                yield self._fail_result(event, error)
                 return
 
         verification = getattr(e2ee_manager, "_verification", None)
         if not verification:
-            yield event.plain_result("验证模块未初始化")
+            yield self._fail_result(event, "验证模块未初始化")
+            return
+
+        # 先确认支持扫码，再准备图片：缩放会生成临时文件，之后的路径都要经过 finally 清理
+        scan_method = getattr(verification, "scan_qr", None)
+        if not callable(scan_method):
+            yield self._fail_result(event, "当前验证模块不支持扫码验证")
             return
 
         resolved_qr_input, input_error = await self._resolve_scan_qr_input(
             event, qr_input
         )
         if input_error:
-            yield event.plain_result(input_error)
-            return
-
-        scan_method = getattr(verification, "scan_qr", None)
-        if not callable(scan_method):
-            yield event.plain_result("当前验证模块不支持扫码验证")
+            yield self._fail_result(event, input_error)
             return
 
         try:
             ok, message = await scan_method(user_id, device_id, resolved_qr_input)
-            prefix = "✅" if ok else "❌"
-            yield event.plain_result(f"{prefix} {message}")
+            if ok:
+                yield event.plain_result(f"✅ {message}")
+            else:
+                yield self._fail_result(event, f"❌ {message}")
         except Exception as exc:
             logger.error(f"扫码验证失败：{exc}")
-            yield event.plain_result(f"❌ 扫码验证失败：{exc}")
+            yield self._fail_result(event, f"❌ 扫码验证失败：{exc}")
+        finally:
+            # 清理缩放时生成的临时文件
+            if self._is_scaled_qr_file(resolved_qr_input):
+                with contextlib.suppress(OSError):
+                    os.remove(resolved_qr_input)
+
+    async def _get_platform_runtime_status(self, platform) -> dict | None:
+        """读取适配器运行状态，兼容同步与异步实现；不支持时返回 None。"""
+        get_status = getattr(platform, "get_runtime_status", None)
+        if not callable(get_status):
+            return None
+        status = get_status()
+        if inspect.isawaitable(status):
+            status = await asyncio.wait_for(status, timeout=self._STATUS_TIMEOUT)
+        return status if isinstance(status, dict) else {}
+
+    @classmethod
+    def _summarize_runtime_status(cls, status: dict) -> dict:
+        """提取运行状态中的关键计数，并给出健康判定。
+
+        outbound failed 是累计计数，不参与健康判定；健康只看 sync 状态与连续失败次数。
+        """
+        sync = status.get("sync", {}) or {}
+        outbound = status.get("outbound", {}) or {}
+
+        def _int(value) -> int:
+            try:
+                return int(value or 0)
+            except (TypeError, ValueError):
+                return 0
+
+        summary = {
+            "sync_state": str(status.get("sync_state") or "-"),
+            "sync_success": _int(sync.get("sync_success_count")),
+            "sync_failure": _int(sync.get("sync_failure_count")),
+            "consecutive_failures": _int(sync.get("consecutive_failures")),
+            "outbound_pending": _int(outbound.get("pending")),
+            "outbound_failed": _int(outbound.get("failed")),
+            "outbound_sent": _int(outbound.get("sent")),
+            "last_error": str(status.get("last_error_message") or ""),
+            "recent_errors": len(status.get("recent_errors") or []),
+        }
+        state_text = f"{summary['sync_state']} {status.get('lifecycle_state') or ''}"
+        summary["healthy"] = not (
+            summary["consecutive_failures"] > 0
+            or any(k in state_text.lower() for k in cls._UNHEALTHY_STATE_KEYWORDS)
+        )
+        return summary
+
+    async def _collect_adapter_summaries(self) -> list[tuple[str, dict]]:
+        """并发读取所有适配器运行状态，返回 (platform_id, summary) 列表。
+
+        读取失败或不支持时 summary 含 error 字段且 healthy 为 False。
+        """
+        platforms = self._list_matrix_platforms()
+        if not platforms:
+            return []
+
+        async def _collect(item) -> dict | None:
+            return await self._get_platform_runtime_status(item[1])
+
+        results = await self._run_bounded(platforms, _collect, len(platforms))
+        rows: list[tuple[str, dict]] = []
+        for (platform_id, _), status in zip(platforms, results):
+            if isinstance(status, BaseException):
+                message = str(status) or type(status).__name__
+                rows.append(
+                    (
+                        platform_id,
+                        {"healthy": False, "error": f"读取状态失败：{message}"},
+                    )
+                )
+            elif status is None:
+                rows.append(
+                    (platform_id, {"healthy": False, "error": "未提供运行状态"})
+                )
+            else:
+                rows.append((platform_id, self._summarize_runtime_status(status)))
+        return rows
+
+    async def _render_fleet_status(self) -> str:
+        rows = await self._collect_adapter_summaries()
+        if not rows:
+            return "未检测到可用的 Matrix 适配器"
+
+        rows.sort(
+            key=lambda row: (
+                row[1]["healthy"],
+                -row[1].get("consecutive_failures", 0),
+                row[0],
+            )
+        )
+        # 出站失败按相对上一次总览的增量展示，避免历史累计值一直显示为异常
+        if self._fleet_failed_seen is None:
+            self._fleet_failed_seen = {}
+        seen = self._fleet_failed_seen
+        unhealthy = sum(1 for _, summary in rows if not summary["healthy"])
+        lines = [f"Matrix 适配器总览：共 {len(rows)} 个，异常 {unhealthy} 个"]
+        for platform_id, summary in rows:
+            prefix = "✅" if summary["healthy"] else "⚠️"
+            if "error" in summary:
+                lines.append(f"{prefix} {platform_id} | {summary['error']}")
+                continue
+            failed = summary["outbound_failed"]
+            previous = seen.get(platform_id)
+            seen[platform_id] = failed
+            failed_text = f"failed {failed}"
+            if previous is not None and failed > previous:
+                failed_text += f" (+{failed - previous})"
+            line = (
+                f"{prefix} {platform_id} | {summary['sync_state']} "
+                f"| sync ✓{summary['sync_success']} ✗{summary['sync_failure']} "
+                f"连续✗{summary['consecutive_failures']} "
+                f"| out pending {summary['outbound_pending']} "
+                f"{failed_text}"
+            )
+            if summary["last_error"]:
+                line += f" | {summary['last_error'][:80]}"
+            lines.append(line)
+        return "\n".join(lines)
 
     async def cmd_matrixstatus(
         self,
         event: AstrMessageEvent,
         matrix_platform_id: str = "",
     ):
-        """查看 Matrix 运行状态。"""
+        """查看 Matrix 运行状态；参数为 all 时汇总全部适配器。"""
+        if str(matrix_platform_id or "").strip().lower() == "all":
+            yield event.plain_result(await self._render_fleet_status())
+            return
+
         platform, error = self._resolve_matrix_platform(event, matrix_platform_id)
         if error:
-            yield event.plain_result(error)
+            yield self._fail_result(event, error)
             return
 
-        get_status = getattr(platform, "get_runtime_status", None)
-        if not callable(get_status):
-            yield event.plain_result("当前 Matrix 适配器未提供运行状态")
+        try:
+            status = await self._get_platform_runtime_status(platform)
+        except Exception as e:
+            logger.error(f"获取 Matrix 运行状态失败：{e}")
+            yield self._fail_result(event, f"获取 Matrix 运行状态失败：{e}")
+            return
+        if status is None:
+            yield self._fail_result(event, "当前 Matrix 适配器未提供运行状态")
             return
 
-        status = get_status()
         sync = status.get("sync", {}) if isinstance(status, dict) else {}
         outbound = status.get("outbound", {}) if isinstance(status, dict) else {}
         recent_errors = (
@@ -169,27 +374,136 @@ class RuntimeCommandsMixin(AdminCommandMixin):
 
         yield event.plain_result("\n".join(lines))
 
+    async def _wait_for_sync_success(
+        self,
+        platform,
+        baseline: int,
+        timeout: float,
+    ) -> bool:
+        """等待适配器 sync_success_count 超过 baseline，超时返回 False。"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self._RECONNECT_GATE_POLL)
+            try:
+                status = await self._get_platform_runtime_status(platform)
+            except Exception:
+                continue
+            if status is None:
+                return False
+            if self._summarize_runtime_status(status)["sync_success"] > baseline:
+                return True
+        return False
+
+    async def _reconnect_all(
+        self, platforms: list, stagger: float, gate: bool, job
+    ) -> list[str]:
+        """按顺序错峰重连所有适配器，stagger 附带 ±50% 抖动，进度写入 job。"""
+        lines: list[str] = []
+        for index, (platform_id, platform) in enumerate(platforms):
+            job.progress(index, len(platforms), note=platform_id)
+            request_reconnect = getattr(platform, "request_reconnect", None)
+            if not callable(request_reconnect):
+                lines.append(f"- ⏭️ {platform_id}：不支持主动重连")
+                continue
+
+            baseline = 0
+            if gate:
+                try:
+                    status = await self._get_platform_runtime_status(platform)
+                    if status is not None:
+                        summary = self._summarize_runtime_status(status)
+                        baseline = summary["sync_success"]
+                except Exception:
+                    pass
+
+            if not request_reconnect():
+                lines.append(f"- ❌ {platform_id}：sync 当前未运行")
+                continue
+
+            if gate:
+                recovered = await self._wait_for_sync_success(
+                    platform, baseline, self._RECONNECT_GATE_TIMEOUT
+                )
+                if recovered:
+                    lines.append(f"- ✅ {platform_id}：已重连，sync 已恢复")
+                else:
+                    lines.append(
+                        f"- ⚠️ {platform_id}：已重连，"
+                        f"{int(self._RECONNECT_GATE_TIMEOUT)}s 内未观察到 sync 成功"
+                    )
+            else:
+                lines.append(f"- ✅ {platform_id}：已请求重连")
+
+            if index < len(platforms) - 1 and stagger > 0:
+                await asyncio.sleep(stagger * random.uniform(0.5, 1.5))
+        job.progress(len(platforms), len(platforms))
+        return lines
+
     async def cmd_reconnect(
         self,
         event: AstrMessageEvent,
         matrix_platform_id: str = "",
+        stagger: str = "",
+        gate: str = "",
     ):
-        """请求 Matrix sync 立即重连。"""
+        """请求 Matrix sync 立即重连；参数为 all 时错峰重连全部适配器。"""
+        if str(matrix_platform_id or "").strip().lower() == "all":
+            try:
+                stagger_seconds = max(0.0, min(300.0, float(stagger or 5)))
+            except ValueError:
+                stagger_seconds = 5.0
+            use_gate = str(gate or "").strip().lower() in ("gate", "yes", "1", "true")
+            platforms = self._list_matrix_platforms()
+            if not platforms:
+                yield self._fail_result(event, "未检测到可用的 Matrix 适配器")
+                return
+
+            async def _reconnect(job) -> str:
+                lines = await self._reconnect_all(
+                    platforms, stagger_seconds, use_gate, job
+                )
+                return "\n".join(["错峰重连完成：", *lines])
+
+            # 多个适配器错峰或等待 sync 恢复时耗时较长，作为后台任务执行
+            yield event.plain_result(
+                await self._start_job(
+                    event,
+                    "reconnect",
+                    f"错峰重连 {len(platforms)} 个适配器（间隔约 {stagger_seconds:g}s"
+                    + ("，等待 sync 恢复" if use_gate else "")
+                    + "）",
+                    _reconnect,
+                    background=len(platforms) > 1 or use_gate,
+                )
+            )
+            return
+
         platform, error = self._resolve_matrix_platform(event, matrix_platform_id)
         if error:
-            yield event.plain_result(error)
+            yield self._fail_result(event, error)
             return
 
         request_reconnect = getattr(platform, "request_reconnect", None)
         if not callable(request_reconnect):
-            yield event.plain_result("当前 Matrix 适配器不支持主动重连")
+            yield self._fail_result(event, "当前 Matrix 适配器不支持主动重连")
             return
 
         ok = request_reconnect()
         if ok:
             yield event.plain_result("✅ 已请求 Matrix sync 重连")
         else:
-            yield event.plain_result("❌ Matrix sync 当前未运行，无法触发重连")
+            yield self._fail_result(event, "❌ Matrix sync 当前未运行，无法触发重连")
+
+    @staticmethod
+    def _batch_rate_limit_delay(results: list[dict]) -> float | None:
+        """若本批结果中出现 M_LIMIT_EXCEEDED，返回其中最长的建议等待秒数。"""
+        delays = [
+            delay
+            for item in results
+            if item.get("error")
+            and (delay := rate_limit_delay(str(item["error"]))) is not None
+        ]
+        return max(delays) if delays else None
 
     async def cmd_resendpending(
         self,
@@ -197,36 +511,200 @@ class RuntimeCommandsMixin(AdminCommandMixin):
         matrix_platform_id: str = "",
         limit: str = "20",
     ):
-        """重试最近失败或挂起的出站消息。"""
+        """重试最近失败或挂起的出站消息。
+
+        limit 超过单批上限（100）或为 all 时分批排空积压，遇到 M_LIMIT_EXCEEDED
+        按 retry_after_ms 退避后继续。
+
+        适配器的 outbound_tracker 只提供 resend_pending(client, limit)，无法列出或
+        单独重发记录，因此批次按顺序逐个提交：每批内的发送顺序与并发由适配器决定，
+        这里不做按房间公平调度，也不提供并发数参数。
+        """
         platform, error = self._resolve_matrix_platform(event, matrix_platform_id)
         if error:
-            yield event.plain_result(error)
+            yield self._fail_result(event, error)
             return
 
         outbound_tracker = getattr(platform, "outbound_tracker", None)
         client = getattr(platform, "client", None)
         if outbound_tracker is None or client is None:
-            yield event.plain_result("当前 Matrix 适配器未启用待发送队列跟踪")
+            yield self._fail_result(event, "当前 Matrix 适配器未启用待发送队列跟踪")
             return
 
-        try:
-            retry_limit = max(1, min(100, int(limit)))
-        except Exception:
-            retry_limit = 20
+        limit_text = str(limit or "").strip().lower()
+        if limit_text == "all":
+            retry_limit = self._RESEND_DRAIN_CAP
+        else:
+            try:
+                retry_limit = max(1, min(self._RESEND_DRAIN_CAP, int(limit_text)))
+            except Exception:
+                retry_limit = 20
+
+        started = time.monotonic()
+        batches = rate_limited_waits = limited_rounds = 0
+        backoff = 1.0
+        # 同一条记录可能因限流在多批中重复出现，按 txn_id 去重计数
+        attempted_txns: set[str] = set()
+        ok_txns: set[str] = set()
+        failures: dict[str, dict] = {}
+        samples: list[dict] = []
+
+        while len(attempted_txns) < retry_limit:
+            batch_limit = min(
+                self._RESEND_BATCH_SIZE, retry_limit - len(attempted_txns)
+            )
+            try:
+                results = await outbound_tracker.resend_pending(
+                    client, limit=batch_limit
+                )
+            except Exception as e:
+                logger.error(f"重发出站消息失败：{e}")
+                failures["-"] = {"txn_id": "-", "error": str(e)}
+                break
+            if not results:
+                break
+
+            batches += 1
+            new_txns = 0
+            batch_ok = 0
+            for index, item in enumerate(results):
+                txn_id = str(item.get("txn_id") or f"#{batches}-{index}")
+                if txn_id not in attempted_txns:
+                    attempted_txns.add(txn_id)
+                    new_txns += 1
+                if item.get("ok"):
+                    batch_ok += 1
+                    ok_txns.add(txn_id)
+                    failures.pop(txn_id, None)
+                    if len(samples) < 5:
+                        samples.append(item)
+                else:
+                    failures[txn_id] = item
 
-        results = await outbound_tracker.resend_pending(client, limit=retry_limit)
-        ok_count = sum(1 for item in results if item.get("ok"))
-        fail_count = len(results) - ok_count
+            delay = self._batch_rate_limit_delay(results)
+            if delay is not None:
+                rate_limited_waits += 1
+                limited_rounds += 1
+                if limited_rounds > self._RESEND_MAX_LIMITED_ROUNDS:
+                    break
+                await asyncio.sleep(max(delay, backoff))
+                backoff = min(backoff * 2, 60.0)
+            elif batch_ok == 0 or new_txns == 0:
+                # 整批失败且并非限流，或返回的都是已尝试过的记录，继续重试只会重复失败
+                break
+            else:
+                limited_rounds = 0
+                backoff = 1.0
+
+            if len(results) < batch_limit and delay is None:
+                break
+            if batches % self._RESEND_PROGRESS_EVERY == 0:
+                elapsed = max(time.monotonic() - started, 1e-6)
+                yield event.plain_result(
+                    f"重发进度：已尝试 {len(attempted_txns)} 条，"
+                    f"成功 {len(ok_txns)} 条，{len(ok_txns) / elapsed:.1f} 条/秒"
+                )
+
+        attempted = len(attempted_txns)
+        ok_count = len(ok_txns)
+        elapsed = max(time.monotonic() - started, 1e-6)
         lines = [
-            f"已尝试重发 {len(results)} 条出站记录",
+            f"已尝试重发 {attempted} 条出站记录（{batches} 批，用时 {elapsed:.1f}s）",
             f"成功：{ok_count}",
-            f"失败：{fail_count}",
+            f"失败：{attempted - ok_count}",
+            f"吞吐：{ok_count / elapsed:.1f} 条/秒",
         ]
-        for item in results[:5]:
+        if rate_limited_waits:
+            lines.append(f"限流退避：{rate_limited_waits} 次")
+        for item in samples:
             if item.get("ok"):
                 lines.append(
                     f"- ✅ {item.get('txn_id')} -> {item.get('event_id') or '-'}"
                 )
-            else:
-                lines.append(f"- ❌ {item.get('txn_id')} -> {item.get('error') or '-'}")
+        for item in list(failures.values())[-5:]:
+            lines.append(f"- ❌ {item.get('txn_id')} -> {item.get('error') or '-'}")
+        yield event.plain_result("\n".join(lines))
+
+    async def cmd_perf(self, event: AstrMessageEvent, command: str = ""):
+        """查看 admin 命令的耗时、客户端调用次数与输出字节统计
+
+        用法：/admin perf [命令名]
+        """
+        metrics = getattr(self, "command_metrics", None)
+        if metrics is None:
+            yield self._fail_result(event, "命令统计未启用")
+            return
+
+        name = str(command or "").strip().lower()
+        if name.startswith("cmd_"):
+            name = name[4:]
+        lines = metrics.render_perf(name)
+        if not lines:
+            yield event.plain_result(
+                f"暂无命令 {name} 的统计数据" if name else "暂无命令统计数据"
+            )
+            return
+        if not name:
+            lines.insert(0, "命令开销（按平均耗时排序，客户端时间为各调用耗时之和）：")
+            for platform_id, governor in sorted((self._rate_governors or {}).items()):
+                snap = governor.snapshot()
+                lines.append(
+                    f"限速 {platform_id}：{snap['rate']:.1f}/{snap['max_rate']:.1f} 次/秒，"
+                    f"排队 {snap['waiting']}，已放行 {snap['granted']}，"
+                    f"限流 {snap['rate_limited']} 次"
+                    + (
+                        f"，暂停 {snap['paused_for']:.1f}s"
+                        if snap["paused_for"]
+                        else ""
+                    )
+                )
+        yield event.plain_result("\n".join(lines))
+
+    async def cmd_slowcalls(self, event: AstrMessageEvent, arg: str = ""):
+        """查看 Matrix 客户端最慢的调用与各接口耗时分位数
+
+        用法：/admin slowcalls [数量|reset]
+        """
+        tracer = getattr(self, "client_call_tracer", None)
+        if tracer is None:
+            yield self._fail_result(event, "客户端调用追踪未启用")
+            return
+
+        text = str(arg or "").strip().lower()
+        if text == "reset":
+            tracer.reset()
+            yield event.plain_result("已清空客户端调用统计")
+            return
+        try:
+            limit = max(1, min(int(text or 10), tracer.slowest_size))
+        except ValueError:
+            yield self._fail_result(event, "数量必须是整数，或使用 reset 清空统计")
+            return
+
+        rows = tracer.summary()
+        if not rows:
+            yield event.plain_result("暂无客户端调用记录")
+            return
+
+        lines = ["各接口耗时（按 p90 排序）："]
+        for row in rows[:20]:
+            lines.append(
+                f"- {row['method']}：{row['count']} 次"
+                + (f"（失败 {row['errors']}）" if row["errors"] else "")
+                + f"，p50 {row.get('p50', 0) * 1000:.0f} ms"
+                f" / p90 {row.get('p90', 0) * 1000:.0f} ms"
+                f" / p99 {row.get('p99', 0) * 1000:.0f} ms"
+                f"，最长 {row['max'] * 1000:.0f} ms"
+            )
+        slowest = tracer.slowest(limit)
+        if slowest:
+            lines.append(f"最慢的 {len(slowest)} 次调用：")
+            for item in slowest:
+                at = time.strftime("%m-%d %H:%M:%S", time.localtime(item["at"]))
+                origin = f" @ {item['command']}" if item["command"] else ""
+                status = "" if item["ok"] else " ❌"
+                lines.append(
+                    f"- {item['seconds'] * 1000:.0f} ms {item['method']}{origin}"
+                    f"（{at}）{status}"
+                )
         yield event.plain_result("\n".join(lines))
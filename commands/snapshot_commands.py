@@ -0,0 +1,562 @@
+"""
+Matrix Admin Plugin - Snapshot Commands
+房间状态快照导出与比对命令
+"""
+
+import asyncio
+import time
+from pathlib import Path
+
+from astrbot.api import logger
+from astrbot.api.event import AstrMessageEvent
+
+from ..snapshot import (
+    CANONICAL_ALIAS,
+    POWER_LEVELS,
+    RESTORE_TYPES,
+    SPACE_CHILD,
+    SnapshotWriter,
+    can_send_state,
+    diff_summaries,
+    is_valid_snapshot_name,
+    iter_snapshot,
+    list_snapshots,
+    plan_restore,
+    snapshot_path,
+    state_index,
+    summarize_state,
+)
+from ..tool import get_plugin_data_dir
+from .room_commands import RoomCommandsMixin
+
+
+class SnapshotCommandsMixin(RoomCommandsMixin):
+    """房间状态快照命令：snapshot, snapshots, snapdiff, snaprestore"""
+
+    # 超过该房间数的导出 / 比对提交为后台任务
+    _SNAPSHOT_INLINE_ROOMS = 10
+    _SNAPDIFF_MAX_LINES = 60
+    # 新建替换房间时从快照一并带上的非恢复类型
+    _SNAPSHOT_CARRY_TYPES = ("m.room.create", "m.room.name", "m.room.topic")
+    _SNAPSHOT_ENCRYPTION = "m.room.encryption"
+
+    @staticmethod
+    def _snapshot_dir() -> Path:
+        return get_plugin_data_dir() / "state_snapshots"
+
+    def _resolve_snapshot_file(self, name: str) -> tuple[Path | None, str]:
+        name = str(name or "").strip()
+        if not is_valid_snapshot_name(name):
+            return None, f"快照名称无效：{name or '(空)'}（仅允许字母、数字、._-）"
+        path = snapshot_path(self._snapshot_dir(), name)
+        if not path.exists():
+            return None, f"快照不存在：{name}，使用 /admin snapshots 查看"
+        return path, ""
+
+    @staticmethod
+    def _load_snapshot_summaries(path: Path, room_filter: set[str]) -> dict[str, dict]:
+        """逐行读取快照并只保留摘要，避免把完整状态留在内存中。"""
+        summaries: dict[str, dict] = {}
+        for record in iter_snapshot(path):
+            room_id = record.get("room_id")
+            if not room_id or (room_filter and room_id not in room_filter):
+                continue
+            summaries[room_id] = summarize_state(record.get("state") or [])
+        return summaries
+
+    @staticmethod
+    def _load_snapshot_states(
+        path: Path, room_filter: set[str], keep_types: set[str]
+    ) -> dict[str, list]:
+        """逐行读取快照，只保留选中房间中指定类型的状态。"""
+        states: dict[str, list] = {}
+        for record in iter_snapshot(path):
+            room_id = record.get("room_id")
+            if not room_id or (room_filter and room_id not in room_filter):
+                continue
+            states[room_id] = [
+                item for item in record.get("state") or [] if item[0] in keep_types
+            ]
+        return states
+
+    @staticmethod
+    def _parse_restore_types(types: str) -> tuple[set[str], str]:
+        names = [
+            item.strip().lower()
+            for item in str(types or "").replace(",", " ").split()
+            if item.strip()
+        ]
+        if not names or "all" in names:
+            return set(RESTORE_TYPES.values()), ""
+        unknown = [name for name in names if name not in RESTORE_TYPES]
+        if unknown:
+            return set(), (
+                f"未知的状态类型：{', '.join(unknown)}"
+                f"（可选：{', '.join(RESTORE_TYPES)}, all）"
+            )
+        return {RESTORE_TYPES[name] for name in names}, ""
+
+    async def _restore_alias_directory(
+        self,
+        client,
+        target_room: str,
+        source_room: str,
+        canonical: dict,
+    ) -> tuple[dict, list[str]]:
+        """让快照中的别名重新指向目标房间，返回可写入的 canonical alias 内容。
+
+        指向原房间（新建替换房间时）的别名会被迁移；指向其他房间的别名不做修改，
+        并从 canonical alias 中剔除，避免写入时被服务器拒绝。
+        """
+        warnings: list[str] = []
+        aliases = [canonical.get("alias")] + list(canonical.get("alt_aliases") or [])
+        unavailable: set[str] = set()
+        for alias in aliases:
+            if not isinstance(alias, str) or not alias:
+                continue
+            try:
+                resolved = await client.get_room_alias(alias)
+                current = str((resolved or {}).get("room_id") or "")
+            except Exception as e:
+                if not self._is_not_found_error(e):
+                    warnings.append(f"别名 {alias} 查询失败：{e}")
+                    unavailable.add(alias)
+                    continue
+                current = ""
+            if current == target_room:
+                continue
+            try:
+                if current and current == source_room:
+                    await client.delete_room_alias(alias)
+                elif current:
+                    warnings.append(f"别名 {alias} 已指向 {current}，未修改")
+                    unavailable.add(alias)
+                    continue
+                await client.create_room_alias(alias, target_room)
+            except Exception as e:
+                warnings.append(f"别名 {alias} 恢复失败：{e}")
+                unavailable.add(alias)
+
+        content = dict(canonical)
+        if content.get("alias") in unavailable:
+            content.pop("alias", None)
+        if isinstance(content.get("alt_aliases"), list):
+            content["alt_aliases"] = [
+                alias for alias in content["alt_aliases"] if alias not in unavailable
+            ]
+        return content, warnings
+
+    async def cmd_snapshot(
+        self,
+        event: AstrMessageEvent,
+        rooms: str = "",
+        name: str = "",
+        concurrency: str = "",
+    ):
+        """导出房间完整状态快照（gzip JSON Lines，逐房间写盘）
+
+        用法：/admin snapshot [all|space_id|room_id,...] [名称] [并发数]
+        """
+        client = self._get_matrix_client(event)
+        if not client:
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
+            return
+
+        name = str(name or "").strip() or time.strftime("%Y%m%d-%H%M%S")
+        if not is_valid_snapshot_name(name):
+            yield self._fail_result(
+                event, "快照名称仅允许字母、数字、._-，最长 64 个字符"
+            )
+            return
+
+        room_ids, error = await self._resolve_room_set(client, event, rooms)
+        if error:
+            yield self._fail_result(event, error)
+            return
+
+        limit = self._normalize_concurrency(concurrency)
+        path = snapshot_path(self._snapshot_dir(), name)
+
+        async def _export(job) -> str:
+            writer = await asyncio.to_thread(SnapshotWriter, path)
+            write_lock = asyncio.Lock()
+            done = 0
+
+            async def _snapshot_room(room_id: str) -> None:
+                nonlocal done
+                events = await client.get_room_state(room_id)
+                if not isinstance(events, list):
+                    raise ValueError("返回格式无效")
+                async with write_lock:
+                    await asyncio.to_thread(writer.write_room, room_id, events)
+                    done += 1
+                    job.progress(done, len(room_ids))
+
+            try:
+                results = await self._run_bounded(room_ids, _snapshot_room, limit)
+                failures = [
+                    (room_id, item)
+                    for room_id, item in zip(room_ids, results)
+                    if isinstance(item, Exception)
+                ]
+                if not writer.rooms:
+                    await asyncio.to_thread(writer.abort)
+                    return f"快照导出失败：{len(failures)} 个房间均无法读取状态"
+                await asyncio.to_thread(writer.commit)
+            except BaseException:
+                await asyncio.to_thread(writer.abort)
+                raise
+
+            size = path.stat().st_size
+            lines = [
+                f"快照 {name} 已保存：房间 {writer.rooms} 个，失败 {len(failures)} 个，"
+                f"大小 {size / 1024:.1f} KiB"
+            ]
+            for room_id, item in failures[:20]:
+                logger.debug(f"导出房间 {room_id} 状态失败：{item}")
+                lines.append(f"- ❌ {room_id}：{item}")
+            return "\n".join(lines)
+
+        yield event.plain_result(
+            await self._start_job(
+                event,
+                "snapshot",
+                f"导出 {len(room_ids)} 个房间的状态快照 {name}",
+                _export,
+                background=len(room_ids) > self._SNAPSHOT_INLINE_ROOMS,
+            )
+        )
+
+    async def cmd_snapshots(self, event: AstrMessageEvent):
+        """列出已保存的房间状态快照
+
+        用法：/admin snapshots
+        """
+        items = await asyncio.to_thread(list_snapshots, self._snapshot_dir())
+        if not items:
+            yield event.plain_result("暂无快照，使用 /admin snapshot 导出")
+            return
+        lines = [f"已保存快照（共 {len(items)} 个）："]
+        for name, size, mtime in items[:30]:
+            at = time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime))
+            lines.append(f"- {name}（{size / 1024:.1f} KiB，{at}）")
+        yield event.plain_result("\n".join(lines))
+
+    async def cmd_snapshot_diff(
+        self,
+        event: AstrMessageEvent,
+        base: str,
+        other: str = "live",
+        rooms: str = "",
+    ):
+        """比对快照与另一快照或当前线上状态
+
+        用法：/admin snapdiff <快照> [快照|live] [room_id,...]
+        """
+        base_path, error = self._resolve_snapshot_file(base)
+        if error:
+            yield self._fail_result(event, error)
+            return
+
+        other = str(other or "").strip() or "live"
+        live = other.lower() == "live"
+        other_path = None
+        client = None
+        if live:
+            client = self._get_matrix_client(event)
+            if not client:
+                yield self._fail_result(event, "与线上状态比对仅在 Matrix 平台可用")
+                return
+        else:
+            other_path, error = self._resolve_snapshot_file(other)
+            if error:
+                yield self._fail_result(event, error)
+                return
+
+        room_filter = {
+            item.strip() for item in str(rooms or "").replace(",", " ").split() if item
+        }
+        try:
+            base_summaries = await asyncio.to_thread(
+                self._load_snapshot_summaries, base_path, room_filter
+            )
+        except Exception as e:
+            yield self._fail_result(event, f"读取快照失败：{e}")
+            return
+        if not base_summaries:
+            yield event.plain_result("快照中没有匹配的房间")
+            return
+
+        room_ids = sorted(base_summaries)
+        limit = self._normalize_concurrency()
+
+        async def _diff(job) -> str:
+            unreadable: list[str] = []
+            if live:
+
+                async def _live_summary(room_id: str) -> dict:
+                    events = await client.get_room_state(room_id)
+                    job.progress(job.done + 1, len(room_ids))
+                    return summarize_state(events if isinstance(events, list) else [])
+
+                results = await self._run_bounded(room_ids, _live_summary, limit)
+                other_summaries = {}
+                for room_id, item in zip(room_ids, results):
+                    if isinstance(item, Exception):
+                        unreadable.append(f"{room_id}：{item}")
+                    else:
+                        other_summaries[room_id] = item
+            else:
+                other_summaries = await asyncio.to_thread(
+                    self._load_snapshot_summaries, other_path, set(room_ids)
+                )
+
+            changed = 0
+            lines: list[str] = []
+            for room_id in room_ids:
+                if room_id not in other_summaries:
+                    continue
+                changes = diff_summaries(
+                    base_summaries[room_id], other_summaries[room_id]
+                )
+                if not changes:
+                    continue
+                changed += 1
+                lines.append(f"房间 `{room_id}`：")
+                lines.extend(f"  - {line}" for line in changes)
+
+            missing = [r for r in room_ids if r not in other_summaries and not live]
+            header = [
+                f"比对 {base} -> {other}：房间 {len(room_ids)} 个，有变化 {changed} 个"
+            ]
+            if missing:
+                header.append(f"对方快照中缺少 {len(missing)} 个房间")
+            if unreadable:
+                header.append(f"无法读取线上状态 {len(unreadable)} 个房间")
+                header.extend(f"- ❌ {item}" for item in unreadable[:10])
+            if len(lines) > self._SNAPDIFF_MAX_LINES:
+                lines = lines[: self._SNAPDIFF_MAX_LINES]
+                lines.append("- ...（变化较多，可指定房间缩小范围）")
+            return "\n".join(header + lines)
+
+        yield event.plain_result(
+            await self._start_job(
+                event,
+                "snapshot",
+                f"比对快照 {base} 与 {other}（{len(room_ids)} 个房间）",
+                _diff,
+                background=live and len(room_ids) > self._SNAPSHOT_INLINE_ROOMS,
+            )
+        )
+
+    async def cmd_snapshot_restore(
+        self,
+        event: AstrMessageEvent,
+        name: str,
+        rooms: str = "",
+        types: str = "",
+        target: str = "live",
+        concurrency: str = "",
+    ):
+        """从快照恢复房间的部分状态
+
+        用法：/admin snaprestore <快照> [房间|all|room_id,...] [类型,...|all] [live|new] [并发数]
+
+        - 类型：power（权限）、join（加入规则）、history（历史可见性）、
+          space（Space 子房间链接）、alias（别名），默认全部
+        - live：只把与快照不同的状态写回原房间；new：按快照新建替换房间并迁移别名
+        """
+        client = self._get_matrix_client(event)
+        if not client:
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
+            return
+
+        path, error = self._resolve_snapshot_file(name)
+        if error:
+            yield self._fail_result(event, error)
+            return
+
+        event_types, error = self._parse_restore_types(types)
+        if error:
+            yield self._fail_result(event, error)
+            return
+
+        target = str(target or "").strip().lower() or "live"
+        if target not in ("live", "new"):
+            yield self._fail_result(event, "恢复目标无效，请使用 live 或 new")
+            return
+
+        spec = str(rooms or "").strip()
+        room_filter: set[str] = set()
+        if spec.lower() != "all":
+            room_filter = {
+                item.strip() for item in spec.replace(",", " ").split() if item
+            }
+            if not room_filter:
+                current_room = self._resolve_event_room_id(event)
+                if not current_room:
+                    yield self._fail_result(
+                        event, "请指定房间 ID，或使用 all 恢复快照中的全部房间"
+                    )
+                    return
+                room_filter = {current_room}
+
+        keep_types = set(event_types)
+        if target == "new":
+            keep_types.update(self._SNAPSHOT_CARRY_TYPES)
+            keep_types.add(self._SNAPSHOT_ENCRYPTION)
+        try:
+            saved_states = await asyncio.to_thread(
+                self._load_snapshot_states, path, room_filter, keep_types
+            )
+        except Exception as e:
+            yield self._fail_result(event, f"读取快照失败：{e}")
+            return
+        if not saved_states:
+            yield event.plain_result("快照中没有匹配的房间")
+            return
+
+        room_ids = sorted(saved_states)
+        limit = self._normalize_concurrency(concurrency)
+        bot_user_id = self._get_command_context(event).bot_user_id
+
+        async def _restore_live(room_id: str, saved: list) -> tuple[str, str]:
+            live_state = await client.get_room_state(room_id)
+            if not isinstance(live_state, list):
+                raise ValueError("返回格式无效")
+            writes = plan_restore(saved, live_state, event_types)
+            if not writes:
+                return "unchanged", f"{room_id} 与快照一致"
+
+            power_levels = state_index(live_state).get((POWER_LEVELS, ""), {})
+            warnings: list[str] = []
+            written = 0
+            for event_type, state_key, content in writes:
+                if not can_send_state(power_levels, bot_user_id, event_type):
+                    warnings.append(f"无权限写入 {event_type}")
+                    continue
+                if event_type == CANONICAL_ALIAS:
+                    content, alias_warnings = await self._restore_alias_directory(
+                        client, room_id, room_id, content
+                    )
+                    warnings += alias_warnings
+                try:
+                    await client.set_room_state_event(
+                        room_id=room_id,
+                        event_type=event_type,
+                        content=content,
+                        state_key=state_key,
+                    )
+                    written += 1
+                except Exception as e:
+                    warnings.append(f"{event_type} {state_key} 写入失败：{e}".strip())
+
+            line = f"{room_id} 写入 {written}/{len(writes)} 个状态事件"
+            if warnings:
+                line += "（" + "；".join(warnings) + "）"
+            return ("restored" if written else "failed"), line
+
+        async def _restore_new(room_id: str, saved: list) -> tuple[str, str]:
+            index = state_index(saved)
+            initial_state = [
+                {"type": event_type, "state_key": state_key, "content": content}
+                for (event_type, state_key), content in index.items()
+                if event_type in event_types - {POWER_LEVELS, CANONICAL_ALIAS}
+                and (event_type != SPACE_CHILD or content.get("via"))
+            ]
+            encryption = index.get((self._SNAPSHOT_ENCRYPTION, ""))
+            if encryption:
+                initial_state.append(
+                    {
+                        "type": self._SNAPSHOT_ENCRYPTION,
+                        "state_key": "",
+                        "content": encryption,
+                    }
+                )
+            kwargs: dict = {
+                "name": str(index.get(("m.room.name", ""), {}).get("name") or "")
+                or None,
+                "topic": str(index.get(("m.room.topic", ""), {}).get("topic") or "")
+                or None,
+                "is_public": False,
+                "initial_state": initial_state,
+            }
+            room_type = index.get(("m.room.create", ""), {}).get("type")
+            if room_type:
+                kwargs["creation_content"] = {"type": room_type}
+            power_levels = index.get((POWER_LEVELS, ""))
+            if POWER_LEVELS in event_types and power_levels:
+                override = dict(power_levels)
+                users = dict(override.get("users") or {})
+                # 新房间由机器人创建，保证机器人仍是最高权限，后续才能继续管理
+                top_level = max(
+                    [100, *(v for v in users.values() if isinstance(v, int))]
+                )
+                users[bot_user_id] = top_level
+                override["users"] = users
+                kwargs["power_level_content_override"] = override
+
+            result = await client.create_room(**kwargs)
+            new_room_id = str((result or {}).get("room_id", "") or "")
+            if not new_room_id:
+                raise ValueError("未返回 room_id")
+
+            warnings: list[str] = []
+            canonical = index.get((CANONICAL_ALIAS, ""))
+            if CANONICAL_ALIAS in event_types and canonical:
+                content, warnings = await self._restore_alias_directory(
+                    client, new_room_id, room_id, canonical
+                )
+                try:
+                    await client.set_room_state_event(
+                        room_id=new_room_id,
+                        event_type=CANONICAL_ALIAS,
+                        content=content,
+                        state_key="",
+                    )
+                except Exception as e:
+                    warnings.append(f"canonical alias 写入失败：{e}")
+
+            notes = [f"初始状态 {len(initial_state)} 个", *warnings]
+            return "restored", f"{room_id} -> {new_room_id}（" + "；".join(notes) + "）"
+
+        restore_one = _restore_new if target == "new" else _restore_live
+
+        async def _restore(job) -> str:
+            job.progress(0, len(room_ids))
+
+            async def _worker(room_id: str) -> tuple[str, str]:
+                try:
+                    return await restore_one(room_id, saved_states[room_id])
+                finally:
+                    job.progress(job.done + 1, len(room_ids))
+
+            results = await self._run_bounded(room_ids, _worker, limit)
+            counts = {"restored": 0, "unchanged": 0, "failed": 0}
+            lines: list[str] = []
+            for room_id, item in zip(room_ids, results):
+                if isinstance(item, Exception):
+                    logger.error(f"从快照恢复房间 {room_id} 失败：{item}")
+                    counts["failed"] += 1
+                    lines.append(f"- ❌ {room_id}：{item}")
+                    continue
+                status, message = item
+                counts[status] += 1
+                prefix = {"restored": "✅", "unchanged": "⏭️", "failed": "❌"}[status]
+                lines.append(f"- {prefix} {message}")
+            header = (
+                f"快照 {name} 恢复完成（{'新建房间' if target == 'new' else '原房间'}）："
+                f"恢复 {counts['restored']} 个，无变化 {counts['unchanged']} 个，"
+                f"失败 {counts['failed']} 个"
+            )
+            return "\n".join([header, *lines[:50]])
+
+        yield event.plain_result(
+            await self._start_job(
+                event,
+                "snaprestore",
+                f"从快照 {name} 恢复 {len(room_ids)} 个房间（{target}）",
+                _restore,
+                background=len(room_ids) > self._SNAPSHOT_INLINE_ROOMS,
+            )
+        )
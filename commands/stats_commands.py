@@ -0,0 +1,478 @@
+"""
+Matrix Admin Plugin - Stats Commands
+房间活跃度统计命令
+"""
+
+import re
+import secrets
+import time
+
+from astrbot.api import logger
+from astrbot.api.event import AstrMessageEvent
+
+from ..activity import ActivityStats
+from .room_commands import RoomCommandsMixin
+
+
+class StatsCommandsMixin(RoomCommandsMixin):
+    """活跃度统计命令：roomstats, inactive"""
+
+    _ROOMSTATS_WINDOW_RE = re.compile(r"^(\d+(?:\.\d+)?)([hd])$")
+    _ROOMSTATS_UNITS = {"h": 3600, "d": 86400}
+    _ROOMSTATS_MAX_WINDOW = 30 * 86400
+    # 单个房间最多扫描的事件数，避免个别超大房间拖住整个任务
+    _ROOMSTATS_MAX_EVENTS = 50000
+    _ROOMSTATS_INLINE_ROOMS = 5
+    _ROOMSTATS_TOP = 10
+    _INACTIVE_DEFAULT_DAYS = 90
+    _INACTIVE_MAX_LINES = 40
+    _INACTIVE_ADMIN_LEVEL = 100
+    # 列表给出的确认码有效期
+    _INACTIVE_PLAN_TTL = 600.0
+    _inactive_plans: dict | None = None
+
+    @classmethod
+    def _parse_stats_window(cls, text: str) -> float | None:
+        """解析 24h / 7d 形式的统计窗口，返回秒数。"""
+        match = cls._ROOMSTATS_WINDOW_RE.match(str(text or "").strip().lower())
+        if not match:
+            return None
+        seconds = float(match.group(1)) * cls._ROOMSTATS_UNITS[match.group(2)]
+        if seconds <= 0 or seconds > cls._ROOMSTATS_MAX_WINDOW:
+            return None
+        return seconds
+
+    async def _room_member_count(
+        self, client, room_id: str, use_cache: bool = True
+    ) -> tuple[int, bool]:
+        """返回 (已加入成员数, 是否来自缓存)；优先读取适配器成员缓存，缺失时才请求服务器。"""
+        record = self._load_room_member_record(room_id) if use_cache else None
+        if record:
+            count = record.get("member_count")
+            if isinstance(count, int) and count >= 0:
+                return count, True
+            members = record.get("members")
+            if isinstance(members, dict):
+                return len(members), True
+
+        members_resp = await client.get_room_members(room_id)
+        chunk = members_resp.get("chunk", []) if isinstance(members_resp, dict) else []
+        joined = {
+            evt.get("state_key")
+            for evt in chunk or []
+            if isinstance(evt, dict)
+            and evt.get("type") == "m.room.member"
+            and (evt.get("content") or {}).get("membership") == "join"
+        }
+        joined.discard(None)
+        return len(joined), False
+
+    async def _latest_event_ts(self, client, room_id: str) -> float | None:
+        """最新一个事件的 origin_server_ts（毫秒），只取一条事件。"""
+        async for msg in self._scan_room_history(client, room_id, limit=1):
+            ts = msg.get("origin_server_ts")
+            return float(ts) if isinstance(ts, (int, float)) else None
+        return None
+
+    async def cmd_roomstats(
+        self,
+        event: AstrMessageEvent,
+        rooms: str = "",
+        window: str = "24h",
+        concurrency: str = "",
+    ):
+        """统计房间在时间窗口内的消息活跃度
+
+        用法：/admin roomstats [all|space_id|room_id,...] [时间窗口] [并发数]
+
+        示例：
+            /admin roomstats
+            /admin roomstats all 7d 8
+        """
+        client = self._get_matrix_client(event)
+        if not client:
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
+            return
+
+        window_text = str(window or "").strip() or "24h"
+        seconds = self._parse_stats_window(window_text)
+        if seconds is None:
+            yield self._fail_result(
+                event, f"时间窗口无效：{window_text}（示例：6h、24h、7d，最长 30d）"
+            )
+            return
+
+        room_ids, error = await self._resolve_room_set(client, event, rooms)
+        if error:
+            yield self._fail_result(event, error)
+            return
+
+        limit = self._normalize_concurrency(concurrency)
+        since_ts = (time.time() - seconds) * 1000
+
+        async def _collect(job) -> str:
+            total = ActivityStats()
+            job.progress(0, len(room_ids))
+
+            async def _scan(room_id: str) -> tuple[int, int, bool]:
+                stats = ActivityStats()
+                try:
+                    async for msg in self._scan_room_history(
+                        client,
+                        room_id,
+                        limit=self._ROOMSTATS_MAX_EVENTS,
+                        since_ts=since_ts,
+                    ):
+                        stats.add(msg)
+                finally:
+                    job.progress(job.done + 1, len(room_ids))
+                total.merge(stats)
+                return (
+                    stats.events,
+                    len(stats.senders),
+                    stats.events >= self._ROOMSTATS_MAX_EVENTS,
+                )
+
+            results = await self._run_bounded(room_ids, _scan, limit)
+
+            ranked = []
+            failed: list[str] = []
+            for room_id, item in zip(room_ids, results):
+                if isinstance(item, Exception):
+                    logger.debug(f"统计房间 {room_id} 活跃度失败：{item}")
+                    failed.append(f"{room_id}：{item}")
+                    continue
+                ranked.append((room_id, *item))
+            ranked.sort(key=lambda row: row[1], reverse=True)
+
+            lines = [
+                f"最近 {window_text} 活跃度：房间 {len(room_ids)} 个，"
+                f"事件 {total.events} 条，发送者 {len(total.senders)} 人"
+            ]
+            if failed:
+                lines.append(f"读取失败 {len(failed)} 个房间")
+                lines.extend(f"- ❌ {item}" for item in failed[:5])
+            if len(ranked) > 1:
+                lines.append("房间排行：")
+                for room_id, events, senders, truncated in ranked[
+                    : self._ROOMSTATS_TOP
+                ]:
+                    mark = "+" if truncated else ""
+                    lines.append(f"- {room_id}：{events}{mark} 条，{senders} 人")
+            if total.events:
+                lines.append("发送者排行：")
+                lines.extend(
+                    f"- {sender}：{count}"
+                    for sender, count in total.senders.most_common(self._ROOMSTATS_TOP)
+                )
+                lines.append("事件类型：")
+                lines.extend(
+                    f"- {event_type}：{count}"
+                    for event_type, count in total.types.most_common(
+                        self._ROOMSTATS_TOP
+                    )
+                )
+                lines.append("按小时分布：")
+                lines.extend(total.render_hours())
+            if any(row[3] for row in ranked):
+                lines.append(
+                    f"标记 + 的房间达到单房间扫描上限 {self._ROOMSTATS_MAX_EVENTS} 条，"
+                    "实际数量更多"
+                )
+            return "\n".join(lines)
+
+        yield event.plain_result(
+            await self._start_job(
+                event,
+                "roomstats",
+                f"统计 {len(room_ids)} 个房间最近 {window_text} 的活跃度",
+                _collect,
+                background=len(room_ids) > self._ROOMSTATS_INLINE_ROOMS,
+            )
+        )
+
+    async def _room_leave_guard(self, client, room_id: str) -> str:
+        """返回不应离开该房间的原因（Space / 机器人是唯一管理员），可以离开时返回空串。"""
+        try:
+            create = await client.get_room_state_event(room_id, "m.room.create")
+        except Exception as e:
+            if not self._is_not_found_error(e):
+                raise
+            create = {}
+        if isinstance(create, dict) and isinstance(create.get("content"), dict):
+            create = create["content"]
+        if isinstance(create, dict) and create.get("type") == "m.space":
+            return "Space"
+
+        power_levels = await client.get_power_levels(room_id)
+        if not isinstance(power_levels, dict):
+            return ""
+        users = power_levels.get("users", {})
+        if not isinstance(users, dict):
+            users = {}
+        bot_user_id = str(getattr(client, "user_id", "") or "")
+
+        def _level(value) -> int:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return 0
+
+        bot_level = _level(users.get(bot_user_id, power_levels.get("users_default", 0)))
+        if bot_level < self._INACTIVE_ADMIN_LEVEL:
+            return ""
+        other_admins = [
+            user_id
+            for user_id, level in users.items()
+            if user_id != bot_user_id and _level(level) >= self._INACTIVE_ADMIN_LEVEL
+        ]
+        return "" if other_admins else "机器人是唯一管理员"
+
+    def _inactive_plan_store(self) -> dict:
+        if self._inactive_plans is None:
+            self._inactive_plans = {}
+        now = time.monotonic()
+        for token in [
+            t for t, plan in self._inactive_plans.items() if plan["expires_at"] < now
+        ]:
+            self._inactive_plans.pop(token, None)
+        return self._inactive_plans
+
+    async def cmd_inactive(
+        self,
+        event: AstrMessageEvent,
+        days: str = "",
+        target: str = "",
+        concurrency: str = "",
+    ):
+        """找出不活跃房间与只剩机器人的孤儿房间，确认后批量离开并忘记
+
+        用法：
+            /admin inactive [天数] [并发数]
+            /admin inactive leave <确认码|room_id,...> [并发数]
+
+        示例：
+            /admin inactive 180
+            /admin inactive leave 3fa9c1
+        """
+        client = self._get_matrix_client(event)
+        if not client:
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
+            return
+
+        if str(days or "").strip().lower() == "leave":
+            async for result in self._leave_inactive_rooms(
+                event, client, target, concurrency
+            ):
+                yield result
+            return
+
+        try:
+            idle_days = float(str(days or "").strip() or self._INACTIVE_DEFAULT_DAYS)
+        except ValueError:
+            yield self._fail_result(
+                event, "天数必须是数字，离开房间请使用 /admin inactive leave <确认码>"
+            )
+            return
+        if idle_days <= 0:
+            yield self._fail_result(event, "天数必须大于 0")
+            return
+
+        try:
+            room_ids = await self._list_joined_rooms(client)
+        except Exception as e:
+            yield self._fail_result(event, f"获取已加入房间失败：{e}")
+            return
+
+        # 当前会话所在房间与管理通知房间不参与清理
+        context = self._get_command_context(event)
+        protected = {context.room_id} if context.room_id else set()
+        get_admin_rooms = getattr(self, "_get_admin_notify_rooms", None)
+        if callable(get_admin_rooms):
+            protected.update(get_admin_rooms(context.platform_id) or [])
+        room_ids = [room_id for room_id in room_ids if room_id not in protected]
+
+        limit = self._normalize_concurrency(target)
+        cutoff_ms = (time.time() - idle_days * 86400) * 1000
+        now_ms = time.time() * 1000
+
+        async def _inspect(room_id: str) -> tuple[int, bool, float | None, str]:
+            members, cached = await self._room_member_count(client, room_id)
+            # 孤儿房间无需再查最新事件
+            last_ts = (
+                None if members <= 1 else await self._latest_event_ts(client, room_id)
+            )
+            guard = ""
+            if members <= 1 or (last_ts is not None and last_ts < cutoff_ms):
+                guard = await self._room_leave_guard(client, room_id)
+            return members, cached, last_ts, guard
+
+        async def _analyze(job) -> str:
+            job.progress(0, len(room_ids))
+
+            async def _worker(room_id: str):
+                try:
+                    return await _inspect(room_id)
+                finally:
+                    job.progress(job.done + 1, len(room_ids))
+
+            results = await self._run_bounded(room_ids, _worker, limit)
+
+            candidates: list[tuple[str, int, float | None]] = []
+            guarded: list[tuple[str, str]] = []
+            unknown = 0
+            failed = 0
+            cached_rooms = 0
+            for room_id, item in zip(room_ids, results):
+                if isinstance(item, Exception):
+                    logger.debug(f"分析房间 {room_id} 失败：{item}")
+                    failed += 1
+                    continue
+                members, cached, last_ts, guard = item
+                cached_rooms += cached
+                if members > 1 and last_ts is None:
+                    # 读不到时间线事件时无法判断活跃度，不作为候选
+                    unknown += 1
+                    continue
+                if members > 1 and last_ts >= cutoff_ms:
+                    continue
+                if guard:
+                    guarded.append((room_id, guard))
+                    continue
+                candidates.append((room_id, members, last_ts))
+            # 孤儿房间优先，其次按最后活动时间从旧到新
+            candidates.sort(key=lambda row: (row[1] > 1, row[2] or 0))
+            shown = candidates[: self._INACTIVE_MAX_LINES]
+
+            lines = [
+                f"已加入 {len(room_ids)} 个房间（成员数来自缓存 {cached_rooms} 个），"
+                f"孤儿或超过 {idle_days:g} 天无活动的房间 {len(candidates)} 个"
+            ]
+            if failed:
+                lines.append(f"分析失败 {failed} 个房间")
+            if unknown:
+                lines.append(f"无法读取最后活动时间 {unknown} 个房间（未列入）")
+            for room_id, members, last_ts in shown:
+                if members <= 1:
+                    reason = "仅剩机器人"
+                else:
+                    idle = (now_ms - last_ts) / 86400000
+                    reason = f"{members} 人，{idle:.0f} 天无活动"
+                lines.append(f"- {room_id}：{reason}")
+            if len(candidates) > len(shown):
+                lines.append(
+                    f"- ...（另有 {len(candidates) - len(shown)} 个，处理完以上房间后重新执行查看）"
+                )
+            if guarded:
+                lines.append(f"以下 {len(guarded)} 个房间不会离开：")
+                lines.extend(
+                    f"- ⚠️ {room_id}：{reason}"
+                    for room_id, reason in guarded[: self._INACTIVE_MAX_LINES]
+                )
+
+            if shown:
+                token = secrets.token_hex(3)
+                self._inactive_plan_store()[token] = {
+                    "rooms": [row[0] for row in shown],
+                    "cutoff_ms": cutoff_ms,
+                    "platform_id": context.platform_id,
+                    "expires_at": time.monotonic() + self._INACTIVE_PLAN_TTL,
+                }
+                lines.append(
+                    f"确认离开并忘记以上列出的 {len(shown)} 个房间："
+                    f"/admin inactive leave {token}"
+                    f"（{int(self._INACTIVE_PLAN_TTL // 60)} 分钟内有效）"
+                )
+            return "\n".join(lines)
+
+        yield event.plain_result(
+            await self._start_job(
+                event,
+                "inactive",
+                f"分析 {len(room_ids)} 个已加入房间的活跃度",
+                _analyze,
+                background=len(room_ids) > self._ROOMSTATS_INLINE_ROOMS,
+            )
+        )
+
+    async def _leave_inactive_rooms(
+        self, event: AstrMessageEvent, client, target: str, concurrency: str
+    ):
+        """离开并忘记确认码对应（或显式列出）的房间；离开前逐个重新校验。"""
+        target = str(target or "").strip()
+        context = self._get_command_context(event)
+        plans = self._inactive_plan_store()
+        plan = plans.get(target) if target else None
+        if plan is not None and plan["platform_id"] == context.platform_id:
+            plans.pop(target, None)
+            targets = plan["rooms"]
+            cutoff_ms = plan["cutoff_ms"]
+        else:
+            targets = [
+                item.strip() for item in re.split(r"[,\s]+", target) if item.strip()
+            ]
+            cutoff_ms = None
+            if not targets or not all(self._is_valid_room_id(r) for r in targets):
+                yield self._fail_result(
+                    event,
+                    "请提供 /admin inactive 列表给出的确认码（可能已过期），或逗号分隔的 room_id",
+                )
+                return
+
+        protected = {context.room_id} if context.room_id else set()
+        get_admin_rooms = getattr(self, "_get_admin_notify_rooms", None)
+        if callable(get_admin_rooms):
+            protected.update(get_admin_rooms(context.platform_id) or [])
+        limit = self._normalize_concurrency(concurrency)
+
+        async def _leave(room_id: str) -> str:
+            if room_id in protected:
+                return "当前会话或通知房间"
+            guard = await self._room_leave_guard(client, room_id)
+            if guard:
+                return guard
+            members, _ = await self._room_member_count(client, room_id, use_cache=False)
+            if cutoff_ms is not None and members > 1:
+                # 列出之后房间可能重新活跃或有人加入
+                last_ts = await self._latest_event_ts(client, room_id)
+                if last_ts is None or last_ts >= cutoff_ms:
+                    return "已有新活动"
+            await client.leave_room(room_id)
+            await client.forget_room(room_id)
+            return ""
+
+        async def _run(job) -> str:
+            job.progress(0, len(targets))
+
+            async def _worker(room_id: str) -> str:
+                try:
+                    return await _leave(room_id)
+                finally:
+                    job.progress(job.done + 1, len(targets))
+
+            results = await self._run_bounded(targets, _worker, limit)
+            left = 0
+            lines: list[str] = []
+            for room_id, item in zip(targets, results):
+                if isinstance(item, Exception):
+                    logger.error(f"离开房间 {room_id} 失败：{item}")
+                    lines.append(f"- ❌ 离开 {room_id} 失败：{item}")
+                elif item:
+                    lines.append(f"- ⏭️ {room_id}：{item}，已跳过")
+                else:
+                    left += 1
+            lines.insert(
+                0,
+                f"已离开并忘记 {left} 个房间，跳过或失败 {len(targets) - left} 个",
+            )
+            return "\n".join(lines[:51])
+
+        yield event.plain_result(
+            await self._start_job(
+                event,
+                "inactive",
+                f"离开并忘记 {len(targets)} 个不活跃房间",
+                _run,
+                background=len(targets) > self._ROOMSTATS_INLINE_ROOMS,
+            )
+        )
@@ -0,0 +1,348 @@
+"""
+Matrix Admin Plugin - Upgrade Commands
+批量房间升级相关命令
+"""
+
+import asyncio
+import hashlib
+import time
+
+from astrbot.api import logger
+from astrbot.api.event import AstrMessageEvent
+
+from ..tool import get_plugin_data_dir, load_json_file, write_json_file_atomic
+from .room_commands import RoomCommandsMixin
+
+
+class UpgradeCommandsMixin(RoomCommandsMixin):
+    """批量升级命令：upgradebulk"""
+
+    @staticmethod
+    def _upgrade_checkpoint_path(new_version: str, spec: str):
+        digest = hashlib.sha1(f"{new_version}|{spec}".encode()).hexdigest()[:12]
+        return get_plugin_data_dir() / "upgrade_checkpoints" / f"{digest}.json"
+
+    @staticmethod
+    def _summarize_room_state(state_events) -> dict:
+        """从房间 state 中提取升级需要迁移的信息。"""
+        summary = {
+            "room_version": "1",
+            "tombstoned": False,
+            "replacement_room": "",
+            "tombstone_sender": "",
+            "parents": {},
+            "aliases": [],
+            "canonical_alias": {},
+            "members": [],
+        }
+        if not isinstance(state_events, list):
+            return summary
+
+        for evt in state_events:
+            if not isinstance(evt, dict):
+                continue
+            evt_type = evt.get("type")
+            state_key = str(evt.get("state_key", "") or "")
+            content = evt.get("content", {})
+            if not isinstance(content, dict):
+                continue
+            if evt_type == "m.room.create":
+                summary["room_version"] = str(content.get("room_version") or "1")
+            elif evt_type == "m.room.tombstone" and content.get("replacement_room"):
+                summary["tombstoned"] = True
+                summary["replacement_room"] = str(content["replacement_room"])
+                summary["tombstone_sender"] = str(evt.get("sender") or "")
+            elif evt_type == "m.space.parent" and state_key and content:
+                summary["parents"][state_key] = content
+            elif evt_type == "m.room.canonical_alias":
+                summary["canonical_alias"] = content
+                aliases = [content.get("alias")] + list(
+                    content.get("alt_aliases") or []
+                )
+                summary["aliases"] = [a for a in aliases if isinstance(a, str) and a]
+            elif evt_type == "m.room.member" and state_key:
+                if content.get("membership") == "join":
+                    summary["members"].append(state_key)
+        return summary
+
+    async def _relink_upgraded_room(
+        self,
+        client,
+        old_room_id: str,
+        new_room_id: str,
+        parents: dict,
+    ) -> list[str]:
+        """把新房间挂回原 Space，并移除旧房间的 child 链接。"""
+        warnings: list[str] = []
+        for space_id, parent_content in parents.items():
+            try:
+                child_content = await client.get_room_state_event(
+                    room_id=space_id,
+                    event_type="m.space.child",
+                    state_key=old_room_id,
+                )
+            except Exception:
+                child_content = None
+            if not isinstance(child_content, dict) or not child_content:
+                child_content = {"via": parent_content.get("via", [])}
+            try:
+                await client.set_room_state_event(
+                    room_id=space_id,
+                    event_type="m.space.child",
+                    content=child_content,
+                    state_key=new_room_id,
+                )
+                await client.set_room_state_event(
+                    room_id=space_id,
+                    event_type="m.space.child",
+                    content={},
+                    state_key=old_room_id,
+                )
+                await client.set_room_state_event(
+                    room_id=new_room_id,
+                    event_type="m.space.parent",
+                    content=parent_content,
+                    state_key=space_id,
+                )
+            except Exception as e:
+                warnings.append(f"Space {space_id} 重新挂载失败：{e}")
+        return warnings
+
+    async def _migrate_room_aliases(
+        self,
+        client,
+        old_room_id: str,
+        new_room_id: str,
+        aliases: list[str],
+        canonical_alias: dict,
+    ) -> list[str]:
+        """把仍指向旧房间的别名改指新房间，并补齐新房间的 canonical alias。"""
+        warnings: list[str] = []
+        for alias in aliases:
+            try:
+                resolved = await client.get_room_alias(alias)
+                if resolved.get("room_id") != old_room_id:
+                    continue
+                await client.delete_room_alias(alias)
+            except Exception as e:
+                if not self._is_not_found_error(e):
+                    warnings.append(f"别名 {alias} 迁移失败：{e}")
+                continue
+            try:
+                await client.create_room_alias(alias, new_room_id)
+            except Exception as e:
+                # 别名已被删除但无法指向新房间，改回旧房间，避免别名丢失
+                try:
+                    await client.create_room_alias(alias, old_room_id)
+                except Exception as restore_error:
+                    warnings.append(
+                        f"别名 {alias} 迁移失败：{e}，且恢复指向旧房间失败：{restore_error}"
+                    )
+                else:
+                    warnings.append(f"别名 {alias} 迁移失败，已恢复指向旧房间：{e}")
+
+        if not canonical_alias:
+            return warnings
+        try:
+            current = await client.get_room_state_event(
+                new_room_id, "m.room.canonical_alias"
+            )
+        except Exception:
+            current = None
+        if current != canonical_alias:
+            try:
+                await client.set_room_state_event(
+                    room_id=new_room_id,
+                    event_type="m.room.canonical_alias",
+                    content=canonical_alias,
+                    state_key="",
+                )
+            except Exception as e:
+                warnings.append(f"canonical alias 设置失败：{e}")
+        return warnings
+
+    async def _reinvite_room_members(
+        self,
+        client,
+        new_room_id: str,
+        members: list[str],
+    ) -> tuple[int, int]:
+        """逐个邀请原成员；房间级已经并发，这里不再嵌套并发。"""
+        bot_user_id = str(getattr(client, "user_id", "") or "")
+        invited = 0
+        failed = 0
+        for user_id in members:
+            if user_id == bot_user_id:
+                continue
+            try:
+                await client.invite_user(new_room_id, user_id)
+                invited += 1
+            except Exception:
+                failed += 1
+        return invited, failed
+
+    async def cmd_upgrade_bulk(
+        self,
+        event: AstrMessageEvent,
+        new_version: str,
+        rooms: str = "all",
+        concurrency: str = "",
+        reinvite: str = "no",
+    ):
+        """批量升级房间版本
+
+        用法：/admin upgradebulk <new_version> [all|space_id|room_id,...] [并发数] [是否重新邀请]
+
+        - all：所有机器人有权限升级的已加入房间
+        - space_id：该 Space 下的全部子房间
+        - 进度会写入检查点，相同参数重复执行时跳过已完成的房间
+
+        示例：
+            /admin upgradebulk 10
+            /admin upgradebulk 10 !space:example.org 8 yes
+        """
+        client = self._get_matrix_client(event)
+        if not client:
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
+            return
+
+        new_version = str(new_version or "").strip()
+        if not new_version:
+            yield self._fail_result(event, "请提供目标房间版本")
+            return
+
+        spec = str(rooms or "").strip() or "all"
+        room_ids, error = await self._resolve_room_set(client, event, spec)
+        if error:
+            yield self._fail_result(event, error)
+            return
+
+        limit = self._normalize_concurrency(concurrency)
+        do_reinvite = str(reinvite or "").strip().lower() in ("yes", "true", "1", "on")
+
+        checkpoint_path = self._upgrade_checkpoint_path(new_version, spec)
+        checkpoint = load_json_file(checkpoint_path, {}) or {}
+        done_rooms: dict = checkpoint.get("rooms", {})
+        checkpoint.update(
+            {"new_version": new_version, "spec": spec, "rooms": done_rooms}
+        )
+        checkpoint_lock = asyncio.Lock()
+
+        async def _save_checkpoint(room_id: str, record: dict):
+            async with checkpoint_lock:
+                done_rooms[room_id] = record
+                checkpoint["updated_at"] = int(time.time())
+                await asyncio.to_thread(
+                    write_json_file_atomic, checkpoint_path, checkpoint
+                )
+
+        # upgrading 表示 upgrade_room 已成功但后续迁移未完成，需要继续处理
+        pending = [
+            rid
+            for rid in room_ids
+            if done_rooms.get(rid, {}).get("status") in (None, "upgrading")
+        ]
+        yield event.plain_result(
+            f"开始批量升级到版本 {new_version}：共 {len(room_ids)} 个房间，"
+            f"待处理 {len(pending)} 个（检查点已完成 {len(room_ids) - len(pending)} 个），"
+            f"并发 {limit}"
+        )
+
+        async def _upgrade_one(room_id: str) -> tuple[str, str]:
+            try:
+                state_events = await client.get_room_state(room_id)
+            except Exception as e:
+                return "failed", f"{room_id} 读取房间状态失败：{e}"
+
+            summary = self._summarize_room_state(state_events)
+            previous = done_rooms.get(room_id) or {}
+            bot_user_id = str(getattr(client, "user_id", "") or "")
+            replacement = ""
+            if summary["tombstoned"]:
+                # 检查点记录为 upgrading，或墓碑由机器人发出但没有完成记录：
+                # 说明上次在 upgrade_room 之后中断，继续完成后续迁移
+                resumable = previous.get("status") == "upgrading" or (
+                    bot_user_id and summary["tombstone_sender"] == bot_user_id
+                )
+                if not resumable:
+                    await _save_checkpoint(room_id, {"status": "skipped"})
+                    return "skipped", f"{room_id} 已被替换，跳过"
+                replacement = (
+                    str(previous.get("replacement_room") or "")
+                    or summary["replacement_room"]
+                )
+            elif summary["room_version"] == new_version:
+                await _save_checkpoint(room_id, {"status": "skipped"})
+                return "skipped", f"{room_id} 已是版本 {new_version}，跳过"
+
+            if not replacement:
+                ok, permission_message = await self._ensure_state_event_permission(
+                    client, room_id, "m.room.tombstone"
+                )
+                if not ok:
+                    return "skipped", permission_message
+
+                try:
+                    result = await client.upgrade_room(room_id, new_version)
+                except Exception as e:
+                    logger.error(f"升级房间 {room_id} 失败：{e}")
+                    return "failed", f"{room_id} 升级失败：{e}"
+
+                replacement = str(result.get("replacement_room", "") or "")
+                if not replacement:
+                    await _save_checkpoint(
+                        room_id, {"status": "upgraded", "replacement_room": ""}
+                    )
+                    return "upgraded", f"{room_id} 已升级，但未返回新房间 ID"
+                # 先落盘，避免后续步骤中断后重跑时把已升级房间当作跳过
+                await _save_checkpoint(
+                    room_id, {"status": "upgrading", "replacement_room": replacement}
+                )
+            record = {"status": "upgraded", "replacement_room": replacement}
+
+            warnings = await self._relink_upgraded_room(
+                client, room_id, replacement, summary["parents"]
+            )
+            warnings += await self._migrate_room_aliases(
+                client,
+                room_id,
+                replacement,
+                summary["aliases"],
+                summary["canonical_alias"],
+            )
+            if do_reinvite:
+                invited, invite_failed = await self._reinvite_room_members(
+                    client, replacement, summary["members"]
+                )
+                record["reinvited"] = invited
+                if invite_failed:
+                    warnings.append(f"重新邀请失败 {invite_failed} 人")
+            record["warnings"] = warnings
+            await _save_checkpoint(room_id, record)
+
+            line = f"{room_id} -> {replacement}"
+            if warnings:
+                line += "（" + "；".join(warnings) + "）"
+            return "upgraded", line
+
+        results = await self._run_bounded(pending, _upgrade_one, limit, bulk=True)
+
+        counts = {"upgraded": 0, "skipped": 0, "failed": 0}
+        lines: list[str] = []
+        for room_id, item in zip(pending, results):
+            if isinstance(item, Exception):
+                counts["failed"] += 1
+                lines.append(f"- ❌ {room_id} 升级异常：{item}")
+                continue
+            status, message = item
+            counts[status] += 1
+            prefix = {"upgraded": "✅", "skipped": "⏭️", "failed": "❌"}[status]
+            lines.append(f"- {prefix} {message}")
+
+        header = (
+            f"批量升级完成：升级 {counts['upgraded']} 个，跳过 {counts['skipped']} 个，"
+            f"失败 {counts['failed']} 个"
+        )
+        if counts["failed"]:
+            header += "\n重新执行相同命令将从检查点继续"
+        yield event.plain_result("\n".join([header, *lines[:50]]))
@@ -30,7 +30,7 @@ class UserCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         reason_text = str(reason or "").strip()
@@ -45,12 +45,12 @@ class UserCommandsMixin(AdminCommandMixin):
             reason_text = ""
 
         if not target_room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
         user_id = self._parse_user_id(user, event, target_room_id)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         try:
@@ -62,7 +62,7 @@ class UserCommandsMixin(AdminCommandMixin):
             yield event.plain_result(msg)
         except Exception as e:
             logger.error(f"踢出用户失败：{e}")
-            yield event.plain_result(f"踢出用户失败：{e}")
+            yield self._fail_result(event, f"踢出用户失败：{e}")
 
     async def cmd_ban(
         self,
@@ -82,7 +82,7 @@ class UserCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         reason_text = str(reason or "").strip()
@@ -97,12 +97,12 @@ class UserCommandsMixin(AdminCommandMixin):
             reason_text = ""
 
         if not target_room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
         user_id = self._parse_user_id(user, event, target_room_id)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         try:
@@ -114,7 +114,7 @@ class UserCommandsMixin(AdminCommandMixin):
             yield event.plain_result(msg)
         except Exception as e:
             logger.error(f"封禁用户失败：{e}")
-            yield event.plain_result(f"封禁用户失败：{e}")
+            yield self._fail_result(event, f"封禁用户失败：{e}")
 
     async def cmd_unban(self, event: AstrMessageEvent, user: str, room_id: str = ""):
         """解除封禁
@@ -127,17 +127,17 @@ class UserCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target_room_id = self._resolve_target_room_id(event, room_id)
         if not target_room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
         user_id = self._parse_user_id(user, event, target_room_id)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         try:
@@ -145,7 +145,7 @@ class UserCommandsMixin(AdminCommandMixin):
             yield event.plain_result(f"已解除 {user_id} 的封禁\n房间：{target_room_id}")
         except Exception as e:
             logger.error(f"解除封禁失败：{e}")
-            yield event.plain_result(f"解除封禁失败：{e}")
+            yield self._fail_result(event, f"解除封禁失败：{e}")
 
     async def cmd_invite(self, event: AstrMessageEvent, user: str, room_id: str = ""):
         """邀请用户加入房间
@@ -158,17 +158,17 @@ class UserCommandsMixin(AdminCommandMixin):
         """
         client = self._get_matrix_client(event)
         if not client:
-            yield event.plain_result("此命令仅在 Matrix 平台可用")
+            yield self._fail_result(event, "此命令仅在 Matrix 平台可用")
             return
 
         target_room_id = self._resolve_target_room_id(event, room_id)
         if not target_room_id:
-            yield event.plain_result("无法获取房间 ID")
+            yield self._fail_result(event, "无法获取房间 ID")
             return
 
         user_id = self._parse_user_id(user, event, target_room_id)
         if not user_id:
-            yield event.plain_result("无效的用户 ID")
+            yield self._fail_result(event, "无效的用户 ID")
             return
 
         try:
@@ -178,4 +178,4 @@ class UserCommandsMixin(AdminCommandMixin):
             )
         except Exception as e:
             logger.error(f"邀请用户失败：{e}")
-            yield event.plain_result(f"邀请用户失败：{e}")
+            yield self._fail_result(event, f"邀请用户失败：{e}")
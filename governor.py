@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import re
+import time
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+_RETRY_AFTER_RE = re.compile(r"retry_after_ms\W{0,4}(\d+)")
+_RATE_LIMITED_RE = re.compile(r"M_LIMIT_EXCEEDED|\b429\b")
+
+_current_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "matrix_admin_request_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+def set_priority(priority: int) -> None:
+    """设置当前上下文（及其后创建的子任务）的请求优先级。"""
+    _current_priority.set(priority)
+
+
+def rate_limit_delay(exc: BaseException | str) -> float | None:
+    """若异常（或错误文本）是 M_LIMIT_EXCEEDED / 429，返回服务器建议的等待秒数，否则返回 None。"""
+    retry_after_ms = getattr(exc, "retry_after_ms", None)
+    text = str(exc or "")
+    if retry_after_ms is None:
+        if not _RATE_LIMITED_RE.search(text):
+            return None
+        match = _RETRY_AFTER_RE.search(text)
+        retry_after_ms = int(match.group(1)) if match else 0
+    try:
+        return max(0.0, float(retry_after_ms) / 1000)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RateGovernor:
+    """单个 homeserver 的令牌桶限速器。
+
+    - 等待中的请求按优先级出队，交互命令（PRIORITY_INTERACTIVE）先于批量任务；
+    - 收到限流响应时暂停到 retry_after 之后并将速率减半，之后每次成功请求缓慢回升
+      （AIMD），使速率收敛到服务器实际允许的水平。
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 20,
+        min_rate: float = 0.5,
+        recover_step: float = 0.05,
+        max_retries: int = 3,
+    ):
+        self.max_rate = max(min_rate, float(rate))
+        self.rate = self.max_rate
+        self.burst = max(1, int(burst))
+        self.min_rate = max(0.01, float(min_rate))
+        self.recover_step = max(0.0, float(recover_step))
+        self.max_retries = max(0, int(max_retries))
+        self.rate_limited = 0
+        self.granted = 0
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = 0
+        self._dispatcher: asyncio.Task | None = None
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def _refill(self, now: float) -> None:
+        # 暂停期间不累积令牌，避免恢复后瞬间放出整桶请求
+        elapsed = max(0.0, now - max(self._updated_at, self._paused_until))
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def _try_take(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        if now < self._paused_until or self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        self.granted += 1
+        return True
+
+    def _next_ready_in(self) -> float:
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        return max(0.0, (1.0 - self._tokens) / self.rate)
+
+    async def acquire(self, priority: int | None = None) -> None:
+        if priority is None:
+            priority = current_priority()
+        if not self._waiters and self._try_take():
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiters, (priority, self._seq, future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            _, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._try_take():
+                heapq.heappop(self._waiters)
+                future.set_result(None)
+                continue
+            await asyncio.sleep(self._next_ready_in())
+
+    def on_rate_limited(self, retry_after: float) -> None:
+        self.rate_limited += 1
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + max(retry_after, 0.0))
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = 0.0
+        self._updated_at = now
+
+    def on_success(self) -> None:
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.recover_step)
+
+    def snapshot(self) -> dict:
+        return {
+            "rate": self.rate,
+            "max_rate": self.max_rate,
+            "waiting": self.waiting,
+            "granted": self.granted,
+            "rate_limited": self.rate_limited,
+            "paused_for": max(0.0, self._paused_until - time.monotonic()),
+        }
+
+    def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for _, _, future in self._waiters:
+            if not future.done():
+                future.cancel()
+        self._waiters.clear()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from astrbot.api import logger
+
+from .governor import PRIORITY_BULK, set_priority
+from .metrics import CommandTrace, set_current_trace
+
+JOB_STATUS_LABELS = {
+    "queued": "排队中",
+    "running": "运行中",
+    "done": "已完成",
+    "failed": "失败",
+    "cancelled": "已取消",
+}
+
+
+class Job:
+    """一个后台任务的状态与进度；runner 通过 progress() 更新进度。"""
+
+    def __init__(self, job_id: str, kind: str, description: str, origin: str = ""):
+        self.id = job_id
+        self.kind = kind
+        self.description = description
+        self.origin = origin
+        self.status = "queued"
+        self.done = 0
+        self.total: int | None = None
+        self.note = ""
+        self.result = ""
+        self.error = ""
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+        # 任务自身的 trace：记录运行期间的客户端调用，结束时用于审计与指标
+        self.trace: CommandTrace | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def progress(self, done: int, total: int | None = None, note: str = "") -> None:
+        self.done = done
+        if total is not None:
+            self.total = total
+        if note:
+            self.note = note
+
+    def progress_text(self) -> str:
+        if self.total:
+            return f"{self.done}/{self.total}"
+        return str(self.done) if self.done else "-"
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def summary(self) -> str:
+        label = JOB_STATUS_LABELS.get(self.status, self.status)
+        return (
+            f"#{self.id} [{self.kind}] {label} 进度 {self.progress_text()}"
+            f" 用时 {self.elapsed():.0f}s：{self.description}"
+        )
+
+
+class JobManager:
+    """后台任务管理：分配 ID、按类型限制并发、支持取消，结束后回调通知。
+
+    observe(job) 在任务结束（含失败、取消与插件关闭时的取消）后同步调用一次，
+    用于记录最终结果；notify(job) 只在插件未关闭时调用。
+    """
+
+    def __init__(
+        self,
+        notify: Callable[[Job], Awaitable[None]] | None = None,
+        observe: Callable[[Job], None] | None = None,
+        default_limit: int = 1,
+        limits: dict[str, int] | None = None,
+        history_size: int = 50,
+    ):
+        self.notify = notify
+        self.observe = observe
+        self.default_limit = max(1, int(default_limit))
+        self.limits = dict(limits or {})
+        self.history_size = max(1, int(history_size))
+        self.jobs: dict[str, Job] = {}
+        self._next_id = 1
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._closing = False
+
+    def _semaphore(self, kind: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(kind)
+        if semaphore is None:
+            limit = max(1, int(self.limits.get(kind, self.default_limit)))
+            semaphore = self._semaphores[kind] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def submit(
+        self,
+        kind: str,
+        description: str,
+        runner: Callable[[Job], Awaitable[str]],
+        origin: str = "",
+        trace: CommandTrace | None = None,
+    ) -> Job:
+        job = Job(str(self._next_id), kind, description, origin)
+        job.trace = trace
+        self._next_id += 1
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, runner))
+        self._prune()
+        return job
+
+    async def _run(self, job: Job, runner: Callable[[Job], Awaitable[str]]) -> None:
+        set_current_trace(job.trace)
+        set_priority(PRIORITY_BULK)
+        try:
+            async with self._semaphore(job.kind):
+                job.status = "running"
+                job.started_at = time.time()
+                job.result = str(await runner(job) or "")
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as exc:
+            job.status = "failed"
+            job.error = str(exc)
+            logger.error(f"[MatrixAdmin] 后台任务 #{job.id} 失败：{exc}")
+        finally:
+            job.finished_at = time.time()
+            if job.started_at is None:
+                job.started_at = job.finished_at
+
+        if self.observe is not None:
+            try:
+                self.observe(job)
+            except Exception as exc:
+                logger.warning(f"[MatrixAdmin] 记录后台任务 #{job.id} 结果失败：{exc}")
+
+        if self.notify is not None and not self._closing:
+            try:
+                await self.notify(job)
+            except Exception as exc:
+                logger.warning(f"[MatrixAdmin] 后台任务 #{job.id} 结果通知失败：{exc}")
+
+    def _prune(self) -> None:
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in finished[: max(0, len(finished) - self.history_size)]:
+            self.jobs.pop(job.id, None)
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(str(job_id or "").strip().lstrip("#"))
+
+    def list(self) -> list[Job]:
+        return sorted(self.jobs.values(), key=lambda job: int(job.id), reverse=True)
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self.get(job_id)
+        if job is None or job.finished or job.task is None:
+            return job
+        job.task.cancel()
+        return job
+
+    async def close(self) -> None:
+        self._closing = True
+        tasks = [
+            job.task for job in self.jobs.values() if job.task and not job.finished
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -5,22 +5,46 @@ Matrix Admin Plugin - 提供 Matrix 房间管理命令
 提供用户管理、权限控制、房间管理及适配器运维命令。
 """
 
-from astrbot.api.event import AstrMessageEvent, filter
+import asyncio
+
+from astrbot.api import logger
+from astrbot.api.event import AstrMessageEvent, MessageChain, filter
 from astrbot.api.star import Context, Star, register
 from astrbot.core.star.filter.command import GreedyStr
 from astrbot.core.star.filter.permission import PermissionType
 
+from .audit import AuditLog
 from .commands import (
+    AliasCommandsMixin,
+    AuditCommandsMixin,
     BotCommandsMixin,
     IgnoreCommandsMixin,
+    JobCommandsMixin,
+    KnockCommandsMixin,
     PowerCommandsMixin,
+    ProvisionCommandsMixin,
     QueryCommandsMixin,
     RoomCommandsMixin,
     RuntimeCommandsMixin,
+    SnapshotCommandsMixin,
+    StatsCommandsMixin,
+    UpgradeCommandsMixin,
     UserCommandsMixin,
 )
+from .jobs import JOB_STATUS_LABELS, JobManager
+from .metrics import (
+    ClientCallTracer,
+    CommandMetrics,
+    MetricsExporter,
+    instrument_commands,
+    render_adapter_metrics,
+)
+from .notifier import AdminNotifier
+from .sync_watchdog import SyncWatchdog
 from .tool import (
+    admin_room_config_version,
     apply_admin_room_config,
+    get_plugin_data_dir,
     normalize_verify_room_templates,
     split_reason_and_room_id,
 )
@@ -38,32 +62,237 @@ class Matrix_Admin_Plugin(
     PowerCommandsMixin,
     QueryCommandsMixin,
     IgnoreCommandsMixin,
+    UpgradeCommandsMixin,
+    ProvisionCommandsMixin,
+    AliasCommandsMixin,
+    KnockCommandsMixin,
+    SnapshotCommandsMixin,
+    StatsCommandsMixin,
     RoomCommandsMixin,
     BotCommandsMixin,
     RuntimeCommandsMixin,
+    JobCommandsMixin,
+    AuditCommandsMixin,
 ):
     def __init__(self, context: Context, config: dict | None = None) -> None:
         super().__init__(context, config)
         self.context = context
         self.config = config or {}
-        self.verify_room_id = str(
-            self.config.get("matrix_admin_verify_room_id", "") or ""
-        ).strip()
-        self.verify_room_templates = normalize_verify_room_templates(
-            self.config.get("matrix_admin_verify_temple_list")
-            or self.config.get("matrix_admin_verify_template_list")
+        self.verify_room_id = ""
+        self.verify_room_templates: dict[str, list[str]] = {}
+        self._admin_room_config_version = ""
+        self._admin_room_config_applied: dict[str, tuple[str, int]] = {}
+        self._reload_admin_room_config()
+        self.bulk_concurrency = self._normalize_concurrency(
+            self.config.get("matrix_admin_bulk_concurrency", 4)
+        )
+        self.command_metrics = CommandMetrics()
+        self.audit_log = None
+        if self.config.get("matrix_admin_audit_enabled", True):
+            self.audit_log = AuditLog(
+                get_plugin_data_dir() / "audit.db",
+                retention_days=self.config.get(
+                    "matrix_admin_audit_retention_days", 180
+                ),
+            )
+        self.client_call_tracer = ClientCallTracer(
+            slowest_size=self.config.get("matrix_admin_slowcalls_size", 20) or 20
         )
+        instrument_commands(self, self._observe_command)
+        self.metrics_exporter = MetricsExporter(
+            self._collect_metrics_lines,
+            interval=self.config.get("matrix_admin_metrics_interval", 15) or 15,
+            host=str(self.config.get("matrix_admin_metrics_host") or "127.0.0.1"),
+            port=self.config.get("matrix_admin_metrics_port", 0) or 0,
+            file_path=str(self.config.get("matrix_admin_metrics_file") or "").strip(),
+        )
+        self.admin_notifier = AdminNotifier(
+            self._get_admin_notify_rooms,
+            self._send_admin_room_message,
+            coalesce_window=self.config.get(
+                "matrix_admin_notify_coalesce_seconds", 1.5
+            ),
+            room_timeout=self.config.get("matrix_admin_notify_timeout", 10) or 10,
+        )
+        rate_limit = float(self.config.get("matrix_admin_rate_limit", 0) or 0)
+        if rate_limit > 0:
+            self.rate_governor_options = {
+                "rate": rate_limit,
+                "burst": self.config.get("matrix_admin_rate_burst", 20) or 20,
+            }
+        self.job_manager = JobManager(
+            notify=self._notify_job_finished,
+            observe=self._observe_job,
+            default_limit=self.config.get("matrix_admin_job_concurrency", 1) or 1,
+        )
+        self._background_start_task: asyncio.Task | None = None
+        self.sync_watchdog = None
+        if self.config.get("matrix_admin_watchdog_enabled", True):
+            watchdog_options = {
+                key: self.config.get(f"matrix_admin_watchdog_{key}") or default
+                for key, default in (
+                    ("interval", 30),
+                    ("stall_seconds", 180),
+                    ("failure_threshold", 5),
+                )
+            }
+            self.sync_watchdog = SyncWatchdog(
+                self._collect_adapter_summaries,
+                self._request_platform_reconnect,
+                self._notify_admin_rooms,
+                **watchdog_options,
+            )
 
-    def _maybe_apply_admin_room_config(self):
-        apply_admin_room_config(self)
+    # 只读的自省命令不写入审计日志
+    _AUDIT_SKIP_COMMANDS = frozenset({"audit", "perf", "slowcalls", "jobs", "job"})
+
+    def _observe_command(self, command: str, seconds: float, ok: bool, trace) -> None:
+        self._ensure_background_services()
+        self.command_metrics.observe(command, seconds, ok, trace)
+        if self.audit_log is not None and command not in self._AUDIT_SKIP_COMMANDS:
+            self.audit_log.record_command(command, seconds, ok, trace)
+
+    # 后台任务最终状态 -> 审计 / 指标中的结果
+    _JOB_OUTCOMES = {"done": "ok", "failed": "error", "cancelled": "cancelled"}
+
+    def _observe_job(self, job) -> None:
+        """后台任务结束时以 job:<kind> 单独记录一次指标与审计，结果取任务最终状态。"""
+        trace = job.trace
+        if trace is None:
+            return
+        trace.outcome = self._JOB_OUTCOMES.get(job.status, "error")
+        trace.last_output = job.error or job.result
+        self._observe_command(
+            trace.command, job.elapsed(), trace.outcome == "ok", trace
+        )
+
+    def _request_platform_reconnect(self, platform_id: str) -> bool:
+        platform = self._find_matrix_platform_by_selector(platform_id)
+        request_reconnect = getattr(platform, "request_reconnect", None)
+        if not callable(request_reconnect):
+            return False
+        return bool(request_reconnect())
+
+    def _get_admin_notify_rooms(self, platform_id: str) -> list[str]:
+        rooms = list(self.verify_room_templates.get(platform_id, []))
+        if not rooms and self.verify_room_id:
+            rooms.append(self.verify_room_id)
+        return rooms
+
+    async def _send_admin_room_message(
+        self, platform_id: str, room_id: str, text: str
+    ) -> None:
+        await self.context.send_message(
+            f"{platform_id}:GroupMessage:{room_id}", MessageChain().message(text)
+        )
+
+    async def _notify_admin_rooms(self, platform_id: str, message: str) -> None:
+        self.admin_notifier.notify(platform_id, f"[Matrix 看门狗] {message}")
+
+    async def _notify_job_finished(self, job) -> None:
+        if not job.origin:
+            return
+        label = JOB_STATUS_LABELS.get(job.status, job.status)
+        lines = [
+            f"[后台任务 #{job.id}] {label}（用时 {job.elapsed():.0f}s）：{job.description}"
+        ]
+        if job.error:
+            lines.append(f"错误：{job.error}")
+        if job.result:
+            lines.append(job.result)
+        await self.context.send_message(
+            job.origin, MessageChain().message("\n".join(lines))
+        )
+
+    async def _collect_metrics_lines(self) -> list[str]:
+        summaries = await self._collect_adapter_summaries()
+        return (
+            render_adapter_metrics(summaries)
+            + self.command_metrics.render()
+            + self.client_call_tracer.render()
+        )
+
+    def _reload_admin_room_config(self) -> bool:
+        """配置被热更新时重新解析验证通知房间，返回配置是否发生变化。"""
+        raw_room_id = self.config.get("matrix_admin_verify_room_id", "")
+        raw_templates = self.config.get(
+            "matrix_admin_verify_temple_list"
+        ) or self.config.get("matrix_admin_verify_template_list")
+        version = admin_room_config_version(raw_room_id, raw_templates)
+        if version == self._admin_room_config_version:
+            return False
+        self._admin_room_config_version = version
+        self.verify_room_id = str(raw_room_id or "").strip()
+        self.verify_room_templates = normalize_verify_room_templates(raw_templates)
+        return True
+
+    def _maybe_apply_admin_room_config(self, platform_id: str | None = None):
+        """仅在配置、adapter 集合或验证模块变化时下发；指定 platform_id 时只检查该 adapter。"""
+        if self._reload_admin_room_config():
+            platform_id = None
+        apply_admin_room_config(
+            self, adapter_ids=[platform_id] if platform_id else None
+        )
+
+    def _ensure_background_services(self) -> asyncio.Task | None:
+        """启动审计写入、指标导出与 sync 看门狗，只执行一次。
+
+        插件热重载后 on_astrbot_loaded 不会再次触发，因此平台加载与首次命令时也会调用；
+        启动前记录的审计行留在队列中，写入任务启动后一并落盘。
+        """
+        if self._background_start_task is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return None
+            self._background_start_task = loop.create_task(
+                self._start_background_services()
+            )
+        return self._background_start_task
+
+    async def _start_background_services(self) -> None:
+        if self.audit_log is not None:
+            try:
+                await self.audit_log.start()
+            except Exception as e:
+                logger.error(f"[MatrixAdmin] 打开审计日志失败：{e}")
+        try:
+            await self.metrics_exporter.start()
+        except Exception as e:
+            logger.error(f"[MatrixAdmin] 启动指标导出失败：{e}")
+        if self.sync_watchdog is not None:
+            self.sync_watchdog.start()
 
     @filter.on_astrbot_loaded()
     async def on_astrbot_loaded(self):
+        self._refresh_matrix_platform_index()
         self._maybe_apply_admin_room_config()
+        start_task = self._ensure_background_services()
+        if start_task is not None:
+            await start_task
 
     @filter.on_platform_loaded()
     async def on_platform_loaded(self):
+        self._refresh_matrix_platform_index()
         self._maybe_apply_admin_room_config()
+        start_task = self._ensure_background_services()
+        if start_task is not None:
+            await start_task
+
+    async def terminate(self):
+        start_task = self._background_start_task
+        if start_task is not None and not start_task.done():
+            start_task.cancel()
+            await asyncio.gather(start_task, return_exceptions=True)
+        await self.metrics_exporter.stop()
+        await self.admin_notifier.close()
+        await self.job_manager.close()
+        if self.audit_log is not None:
+            await self.audit_log.close()
+        for governor in (self._rate_governors or {}).values():
+            governor.close()
+        if self.sync_watchdog is not None:
+            await self.sync_watchdog.stop()
 
     # ========== Command Bindings ==========
     # 装饰器必须定义在 main.py 中，否则 handler 的 __module__ 不匹配
@@ -197,7 +426,7 @@ class Matrix_Admin_Plugin(
     @admin_group.command("dm")
     @filter.permission_type(PermissionType.ADMIN)
     async def admin_dm(self, event: AstrMessageEvent, user: str):
-        """创建与用户的私聊房间"""
+        """获取或创建与用户的私聊房间"""
         async for result in self.cmd_dm(event, user):
             yield result
 
@@ -224,6 +453,19 @@ class Matrix_Admin_Plugin(
         async for result in self.cmd_alias_get(event, alias):
             yield result
 
+    @admin_group.command("aliasaudit")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_alias_audit(
+        self,
+        event: AstrMessageEvent,
+        rooms: str = "all",
+        repair: str = "no",
+        concurrency: str = "",
+    ):
+        """巡检房间别名是否悬空或指向旧房间"""
+        async for result in self.cmd_alias_audit(event, rooms, repair, concurrency):
+            yield result
+
     @admin_group.command("publicrooms")
     @filter.permission_type(PermissionType.ADMIN)
     async def admin_publicrooms(
@@ -249,6 +491,26 @@ class Matrix_Admin_Plugin(
         async for result in self.cmd_upgrade(event, new_version, room_id):
             yield result
 
+    @admin_group.command("upgradebulk")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_upgradebulk(
+        self,
+        event: AstrMessageEvent,
+        new_version: str,
+        rooms: str = "all",
+        concurrency: str = "",
+        reinvite: str = "no",
+    ):
+        """批量升级房间版本"""
+        async for result in self.cmd_upgrade_bulk(
+            event,
+            new_version,
+            rooms,
+            concurrency,
+            reinvite,
+        ):
+            yield result
+
     @admin_group.command("hierarchy")
     @filter.permission_type(PermissionType.ADMIN)
     async def admin_hierarchy(
@@ -271,6 +533,13 @@ class Matrix_Admin_Plugin(
         async for result in self.cmd_space_create(event, name, is_public, topic):
             yield result
 
+    @admin_group.command("provision")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_provision(self, event: AstrMessageEvent, template: GreedyStr):
+        """按模板批量创建 Space 及子房间"""
+        async for result in self.cmd_provision(event, template):
+            yield result
+
     @admin_group.command("spacelink")
     @filter.permission_type(PermissionType.ADMIN)
     async def admin_spacelink(
@@ -322,6 +591,32 @@ class Matrix_Admin_Plugin(
         async for result in self.cmd_knock(event, room_id_or_alias, reason):
             yield result
 
+    @admin_group.command("knocks")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_knocks(self, event: AstrMessageEvent, refresh: str = ""):
+        """列出待处理的敲门请求"""
+        async for result in self.cmd_knocks(event, refresh):
+            yield result
+
+    @admin_group.command("knockapprove")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_knockapprove(self, event: AstrMessageEvent, selector: str):
+        """批量批准敲门请求"""
+        async for result in self.cmd_knock_approve(event, selector):
+            yield result
+
+    @admin_group.command("knockdeny")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_knockdeny(
+        self,
+        event: AstrMessageEvent,
+        selector: str,
+        reason: GreedyStr = "",
+    ):
+        """批量拒绝敲门请求"""
+        async for result in self.cmd_knock_deny(event, selector, reason):
+            yield result
+
     @admin_group.command("roomrefresh")
     @filter.permission_type(PermissionType.ADMIN)
     async def admin_roomrefresh(self, event: AstrMessageEvent, room_id: str = ""):
@@ -395,7 +690,7 @@ class Matrix_Admin_Plugin(
         event: AstrMessageEvent,
         matrix_platform_id: str = "",
     ):
-        """查看 Matrix 适配器运行状态。"""
+        """查看 Matrix 适配器运行状态（all 汇总全部适配器）。"""
         async for result in self.cmd_matrixstatus(event, matrix_platform_id):
             yield result
 
@@ -405,9 +700,16 @@ class Matrix_Admin_Plugin(
         self,
         event: AstrMessageEvent,
         matrix_platform_id: str = "",
+        stagger: str = "",
+        gate: str = "",
     ):
-        """主动中断当前 /sync 长轮询并立即重连。"""
-        async for result in self.cmd_reconnect(event, matrix_platform_id):
+        """主动中断当前 /sync 长轮询并立即重连（all 错峰重连全部适配器）。"""
+        async for result in self.cmd_reconnect(
+            event,
+            matrix_platform_id,
+            stagger,
+            gate,
+        ):
             yield result
 
     @admin_group.command("resendpending")
@@ -418,10 +720,128 @@ class Matrix_Admin_Plugin(
         matrix_platform_id: str = "",
         limit: str = "20",
     ):
-        """重试最近失败或挂起的出站消息记录。"""
+        """重试失败或挂起的出站消息记录（limit=all 时顺序分批排空，顺序由适配器决定）。"""
         async for result in self.cmd_resendpending(event, matrix_platform_id, limit):
             yield result
 
+    @admin_group.command("perf")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_perf(self, event: AstrMessageEvent, command: str = ""):
+        """查看命令耗时与客户端调用统计"""
+        async for result in self.cmd_perf(event, command):
+            yield result
+
+    @admin_group.command("slowcalls")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_slowcalls(self, event: AstrMessageEvent, arg: str = ""):
+        """查看最慢的 Matrix 客户端调用与接口耗时分位数"""
+        async for result in self.cmd_slowcalls(event, arg):
+            yield result
+
+    @admin_group.command("jobs")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_jobs(self, event: AstrMessageEvent):
+        """列出后台任务"""
+        async for result in self.cmd_jobs(event):
+            yield result
+
+    @admin_group.command("job")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_job(self, event: AstrMessageEvent, job_id: str):
+        """查看后台任务详情"""
+        async for result in self.cmd_job(event, job_id):
+            yield result
+
+    @admin_group.command("cancel")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_cancel(self, event: AstrMessageEvent, job_id: str):
+        """取消后台任务"""
+        async for result in self.cmd_cancel(event, job_id):
+            yield result
+
+    @admin_group.command("snapshot")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_snapshot(
+        self,
+        event: AstrMessageEvent,
+        rooms: str = "",
+        name: str = "",
+        concurrency: str = "",
+    ):
+        """导出房间状态快照"""
+        async for result in self.cmd_snapshot(event, rooms, name, concurrency):
+            yield result
+
+    @admin_group.command("snapshots")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_snapshots(self, event: AstrMessageEvent):
+        """列出房间状态快照"""
+        async for result in self.cmd_snapshots(event):
+            yield result
+
+    @admin_group.command("snapdiff")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_snapdiff(
+        self,
+        event: AstrMessageEvent,
+        base: str,
+        other: str = "live",
+        rooms: str = "",
+    ):
+        """比对房间状态快照"""
+        async for result in self.cmd_snapshot_diff(event, base, other, rooms):
+            yield result
+
+    @admin_group.command("snaprestore")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_snaprestore(
+        self,
+        event: AstrMessageEvent,
+        name: str,
+        rooms: str = "",
+        types: str = "",
+        target: str = "live",
+        concurrency: str = "",
+    ):
+        """从快照恢复房间状态"""
+        async for result in self.cmd_snapshot_restore(
+            event, name, rooms, types, target, concurrency
+        ):
+            yield result
+
+    @admin_group.command("roomstats")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_roomstats(
+        self,
+        event: AstrMessageEvent,
+        rooms: str = "",
+        window: str = "24h",
+        concurrency: str = "",
+    ):
+        """统计房间消息活跃度"""
+        async for result in self.cmd_roomstats(event, rooms, window, concurrency):
+            yield result
+
+    @admin_group.command("inactive")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_inactive(
+        self,
+        event: AstrMessageEvent,
+        days: str = "",
+        target: str = "",
+        concurrency: str = "",
+    ):
+        """查找并清理不活跃房间"""
+        async for result in self.cmd_inactive(event, days, target, concurrency):
+            yield result
+
+    @admin_group.command("audit")
+    @filter.permission_type(PermissionType.ADMIN)
+    async def admin_audit(self, event: AstrMessageEvent, query: GreedyStr = ""):
+        """查询管理操作审计记录"""
+        async for result in self.cmd_audit(event, query):
+            yield result
+
     @admin_group.command("verify")
     @filter.permission_type(PermissionType.ADMIN)
     async def admin_verify(self, event: AstrMessageEvent, device_id: str):
@@ -430,13 +850,13 @@ class Matrix_Admin_Plugin(
             yield event.plain_result("此命令仅在 Matrix 平台可用")
             return
 
-        self._maybe_apply_admin_room_config()
-
         matrix_utils_cls = self._get_matrix_utils_cls()
         if matrix_utils_cls is None:
             yield event.plain_result("未检测到 Matrix 适配器插件")
             return
 
+        self._maybe_apply_admin_room_config(str(event.get_platform_id() or ""))
+
         e2ee_manager = None
         try:
             target_platform_id = str(event.get_platform_id() or "")
@@ -0,0 +1,672 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import inspect
+import json
+import os
+import time
+from collections import Counter, deque
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from astrbot.api import logger
+
+from .governor import RateGovernor, rate_limit_delay
+
+COMMAND_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{escape_label_value(v)}"' for key, v in labels.items())
+    return "{" + inner + "}"
+
+
+class CommandTrace:
+    """单次命令调用的记录：调用参数、客户端调用次数 / 等待时间与输出。"""
+
+    __slots__ = (
+        "command",
+        "event",
+        "params",
+        "rpc_counts",
+        "rpc_seconds",
+        "output_bytes",
+        "last_output",
+        "target_user",
+        "outcome",
+    )
+
+    def __init__(self, command: str, event=None, params: dict | None = None):
+        self.command = command
+        self.event = event
+        self.params = params or {}
+        self.rpc_counts: Counter[str] = Counter()
+        self.rpc_seconds = 0.0
+        self.output_bytes = 0
+        self.last_output = ""
+        self.target_user = ""
+        # ok / failed（命令回复了失败说明）/ error（抛出异常）/ cancelled（被取消）
+        self.outcome = "ok"
+
+    def record_call(self, method: str, seconds: float) -> None:
+        self.rpc_counts[method] += 1
+        self.rpc_seconds += seconds
+
+
+_current_trace: contextvars.ContextVar[CommandTrace | None] = contextvars.ContextVar(
+    "matrix_admin_command_trace", default=None
+)
+
+
+def current_trace() -> CommandTrace | None:
+    return _current_trace.get()
+
+
+def set_current_trace(trace: CommandTrace | None) -> None:
+    """在当前上下文中切换命令 trace（后台任务使用自己的 trace，不计入提交它的命令）。"""
+    _current_trace.set(trace)
+
+
+def note_target_user(user_id: str) -> None:
+    """记录当前命令解析出的目标用户（只保留第一个）。"""
+    trace = _current_trace.get()
+    if trace is not None and user_id and not trace.target_user:
+        trace.target_user = user_id
+
+
+def note_command_failed() -> None:
+    """把当前命令的结果记为 failed（命令自行捕获错误并回复失败说明时调用）。"""
+    trace = _current_trace.get()
+    if trace is not None and trace.outcome == "ok":
+        trace.outcome = "failed"
+
+
+class TracedClient:
+    """Matrix 客户端代理：计时每个协程方法调用，并记入当前命令的 CommandTrace。
+
+    其余属性原样透传。on_call(method, seconds, ok) 可额外接收每次调用的耗时；
+    提供 governor 时每次调用先经其限速，遇到 M_LIMIT_EXCEEDED 按 retry_after 重试。
+    """
+
+    def __init__(
+        self,
+        client,
+        on_call: Callable[[str, float, bool], None] | None = None,
+        governor: RateGovernor | None = None,
+    ):
+        object.__setattr__(self, "_client", client)
+        object.__setattr__(self, "_on_call", on_call)
+        object.__setattr__(self, "_governor", governor)
+        object.__setattr__(self, "_wrapped", {})
+
+    @property
+    def wrapped_client(self):
+        return self._client
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+        wrapped = self._wrapped.get(name)
+        if wrapped is None or wrapped.__wrapped__ != attr:
+            wrapped = self._wrap_call(name, attr)
+            self._wrapped[name] = wrapped
+        return wrapped
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self._client, name, value)
+
+    def _wrap_call(self, method: str, func):
+        on_call = self._on_call
+        governor = self._governor
+
+        def _record(elapsed: float, ok: bool) -> None:
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.record_call(method, elapsed)
+            if on_call is not None:
+                on_call(method, elapsed, ok)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            attempt = 0
+            while True:
+                if governor is not None:
+                    await governor.acquire()
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as exc:
+                    _record(time.perf_counter() - started, False)
+                    delay = (
+                        rate_limit_delay(exc)
+                        if governor is not None and isinstance(exc, Exception)
+                        else None
+                    )
+                    if delay is None:
+                        raise
+                    governor.on_rate_limited(delay)
+                    if attempt >= governor.max_retries:
+                        raise
+                    attempt += 1
+                    continue
+                _record(time.perf_counter() - started, True)
+                if governor is not None:
+                    governor.on_success()
+                return result
+
+        return wrapper
+
+
+def result_text(result) -> str:
+    """提取一条命令结果的文本（消息链中各组件的 text）。"""
+    if isinstance(result, str):
+        return result
+    chain = getattr(result, "chain", None) or []
+    return "".join(
+        text
+        for text in (getattr(component, "text", None) for component in chain)
+        if isinstance(text, str)
+    )
+
+
+class ClientCallTracer:
+    """记录 Matrix 客户端各接口的调用耗时。
+
+    每个接口保留最近 sample_size 次耗时用于计算分位数，全局保留 window_seconds
+    内耗时最长的 slowest_size 次调用。
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(
+        self,
+        slowest_size: int = 20,
+        sample_size: int = 512,
+        window_seconds: float = 3600.0,
+    ):
+        self.slowest_size = max(1, int(slowest_size))
+        self.sample_size = max(16, int(sample_size))
+        self.window_seconds = max(60.0, float(window_seconds))
+        self.endpoints: dict[str, dict] = {}
+        self._slowest: list[tuple[float, float, str, str, bool]] = []
+
+    def record(self, method: str, seconds: float, ok: bool) -> None:
+        stats = self.endpoints.get(method)
+        if stats is None:
+            stats = self.endpoints[method] = {
+                "count": 0,
+                "errors": 0,
+                "sum": 0.0,
+                "max": 0.0,
+                "samples": deque(maxlen=self.sample_size),
+            }
+        stats["count"] += 1
+        stats["sum"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+        stats["samples"].append(seconds)
+        if not ok:
+            stats["errors"] += 1
+
+        now = time.time()
+        cutoff = now - self.window_seconds
+        if any(item[1] < cutoff for item in self._slowest):
+            self._slowest = [item for item in self._slowest if item[1] >= cutoff]
+            heapq.heapify(self._slowest)
+        trace = _current_trace.get()
+        entry = (seconds, now, method, trace.command if trace else "", ok)
+        if len(self._slowest) < self.slowest_size:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def reset(self) -> None:
+        self.endpoints.clear()
+        self._slowest.clear()
+
+    def slowest(self, limit: int | None = None) -> list[dict]:
+        cutoff = time.time() - self.window_seconds
+        entries = sorted(
+            (item for item in self._slowest if item[1] >= cutoff), reverse=True
+        )
+        return [
+            {
+                "seconds": seconds,
+                "at": at,
+                "method": method,
+                "command": command,
+                "ok": ok,
+            }
+            for seconds, at, method, command, ok in entries[:limit]
+        ]
+
+    def quantiles(self, method: str) -> dict[float, float]:
+        samples = sorted(self.endpoints[method]["samples"])
+        if not samples:
+            return {}
+        return {
+            q: samples[min(len(samples) - 1, int(q * len(samples)))]
+            for q in self.QUANTILES
+        }
+
+    def summary(self) -> list[dict]:
+        """按 p90 降序返回各接口统计。"""
+        rows = []
+        for method, stats in self.endpoints.items():
+            quantiles = self.quantiles(method)
+            rows.append(
+                {
+                    "method": method,
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "avg": stats["sum"] / stats["count"],
+                    "max": stats["max"],
+                    **{f"p{int(q * 100)}": v for q, v in quantiles.items()},
+                }
+            )
+        rows.sort(key=lambda row: row.get("p90", 0.0), reverse=True)
+        return rows
+
+    def render(self) -> list[str]:
+        lines = [
+            "# HELP matrix_admin_client_call_seconds Matrix client call latency.",
+            "# TYPE matrix_admin_client_call_seconds summary",
+        ]
+        for method, stats in sorted(self.endpoints.items()):
+            for q, value in sorted(self.quantiles(method).items()):
+                labels = format_labels({"method": method, "quantile": q})
+                lines.append(f"matrix_admin_client_call_seconds{labels} {value:.6f}")
+            labels = format_labels({"method": method})
+            lines.append(
+                f"matrix_admin_client_call_seconds_sum{labels} {stats['sum']:.6f}"
+            )
+            lines.append(
+                f"matrix_admin_client_call_seconds_count{labels} {stats['count']}"
+            )
+        return lines
+
+
+class CommandMetrics:
+    """记录 admin 命令调用次数、耗时直方图与客户端调用开销（进程内，纯内存）。"""
+
+    def __init__(
+        self,
+        buckets: tuple[float, ...] = COMMAND_DURATION_BUCKETS,
+        slow_log_seconds: float = 1.0,
+    ):
+        self.buckets = buckets
+        self.slow_log_seconds = slow_log_seconds
+        self.counts: dict[tuple[str, str], int] = {}
+        self.histograms: dict[str, dict] = {}
+        self.perf: dict[str, dict] = {}
+
+    def observe(
+        self,
+        command: str,
+        seconds: float,
+        ok: bool,
+        trace: CommandTrace | None = None,
+    ) -> None:
+        if trace is not None:
+            self._observe_trace(command, seconds, ok, trace)
+        outcome = trace.outcome if trace is not None else ("ok" if ok else "error")
+        self.counts[(command, outcome)] = self.counts.get((command, outcome), 0) + 1
+        hist = self.histograms.setdefault(
+            command, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        )
+        for index, upper in enumerate(self.buckets):
+            if seconds <= upper:
+                hist["buckets"][index] += 1
+        hist["sum"] += seconds
+        hist["count"] += 1
+
+    def _observe_trace(
+        self, command: str, seconds: float, ok: bool, trace: CommandTrace
+    ) -> None:
+        stats = self.perf.setdefault(
+            command,
+            {
+                "calls": 0,
+                "wall_seconds": 0.0,
+                "max_wall_seconds": 0.0,
+                "rpc_seconds": 0.0,
+                "rpc_counts": Counter(),
+                "output_bytes": 0,
+            },
+        )
+        stats["calls"] += 1
+        stats["wall_seconds"] += seconds
+        stats["max_wall_seconds"] = max(stats["max_wall_seconds"], seconds)
+        stats["rpc_seconds"] += trace.rpc_seconds
+        stats["rpc_counts"].update(trace.rpc_counts)
+        stats["output_bytes"] += trace.output_bytes
+
+        record = {
+            "command": command,
+            "ok": ok,
+            "wall_ms": round(seconds * 1000, 1),
+            "rpc_ms": round(trace.rpc_seconds * 1000, 1),
+            "rpc_total": sum(trace.rpc_counts.values()),
+            "rpc": dict(trace.rpc_counts),
+            "output_bytes": trace.output_bytes,
+        }
+        text = f"[MatrixAdmin] command_perf {json.dumps(record, ensure_ascii=False)}"
+        if seconds >= self.slow_log_seconds:
+            logger.info(text)
+        else:
+            logger.debug(text)
+
+    def render_perf(self, command: str = "") -> list[str]:
+        """按平均耗时降序输出各命令开销，command 非空时只输出该命令的明细。"""
+        if command:
+            stats = self.perf.get(command)
+            if not stats:
+                return []
+            calls = stats["calls"]
+            lines = [
+                f"命令 {command}：调用 {calls} 次",
+                f"平均耗时 {stats['wall_seconds'] / calls * 1000:.1f} ms，"
+                f"最长 {stats['max_wall_seconds'] * 1000:.1f} ms",
+                f"平均等待客户端 {stats['rpc_seconds'] / calls * 1000:.1f} ms，"
+                f"平均输出 {stats['output_bytes'] / calls:.0f} 字节",
+            ]
+            for method, count in stats["rpc_counts"].most_common():
+                lines.append(f"  - {method}：{count} 次（平均 {count / calls:.1f}/次）")
+            return lines
+
+        lines = []
+        ranked = sorted(
+            self.perf.items(),
+            key=lambda item: item[1]["wall_seconds"] / item[1]["calls"],
+            reverse=True,
+        )
+        for name, stats in ranked:
+            calls = stats["calls"]
+            wall_ms = stats["wall_seconds"] / calls * 1000
+            rpc_ms = stats["rpc_seconds"] / calls * 1000
+            rpc_total = sum(stats["rpc_counts"].values())
+            lines.append(
+                f"- {name}：{calls} 次，平均 {wall_ms:.1f} ms"
+                f"（客户端 {rpc_ms:.1f} ms，{rpc_total / calls:.1f} 次调用），"
+                f"输出 {stats['output_bytes'] / calls:.0f} B"
+            )
+        return lines
+
+    def render(self) -> list[str]:
+        lines = [
+            "# HELP matrix_admin_command_total Admin command invocations.",
+            "# TYPE matrix_admin_command_total counter",
+        ]
+        for (command, outcome), count in sorted(self.counts.items()):
+            labels = format_labels({"command": command, "outcome": outcome})
+            lines.append(f"matrix_admin_command_total{labels} {count}")
+
+        lines += [
+            "# HELP matrix_admin_command_duration_seconds Admin command wall time.",
+            "# TYPE matrix_admin_command_duration_seconds histogram",
+        ]
+        for command, hist in sorted(self.histograms.items()):
+            for upper, count in zip(self.buckets, hist["buckets"]):
+                labels = format_labels({"command": command, "le": upper})
+                lines.append(
+                    f"matrix_admin_command_duration_seconds_bucket{labels} {count}"
+                )
+            labels = format_labels({"command": command, "le": "+Inf"})
+            lines.append(
+                f"matrix_admin_command_duration_seconds_bucket{labels} {hist['count']}"
+            )
+            labels = format_labels({"command": command})
+            lines.append(
+                f"matrix_admin_command_duration_seconds_sum{labels} {hist['sum']:.6f}"
+            )
+            lines.append(
+                f"matrix_admin_command_duration_seconds_count{labels} {hist['count']}"
+            )
+
+        lines += [
+            "# HELP matrix_admin_command_rpc_total Client calls made by admin commands.",
+            "# TYPE matrix_admin_command_rpc_total counter",
+        ]
+        for command, stats in sorted(self.perf.items()):
+            for method, count in sorted(stats["rpc_counts"].items()):
+                labels = format_labels({"command": command, "method": method})
+                lines.append(f"matrix_admin_command_rpc_total{labels} {count}")
+        lines += [
+            "# HELP matrix_admin_command_rpc_seconds_total Time admin commands spent awaiting client calls.",
+            "# TYPE matrix_admin_command_rpc_seconds_total counter",
+        ]
+        for command, stats in sorted(self.perf.items()):
+            labels = format_labels({"command": command})
+            lines.append(
+                f"matrix_admin_command_rpc_seconds_total{labels} {stats['rpc_seconds']:.6f}"
+            )
+        lines += [
+            "# HELP matrix_admin_command_output_bytes_total Reply bytes produced by admin commands.",
+            "# TYPE matrix_admin_command_output_bytes_total counter",
+        ]
+        for command, stats in sorted(self.perf.items()):
+            labels = format_labels({"command": command})
+            lines.append(
+                f"matrix_admin_command_output_bytes_total{labels} {stats['output_bytes']}"
+            )
+        return lines
+
+
+def instrument_commands(
+    target, observe: Callable[[str, float, bool, CommandTrace], None]
+) -> None:
+    """把 target 上所有 cmd_* 异步生成器方法替换为计时包装（实例级别）。
+
+    包装期间当前 CommandTrace 通过 contextvar 暴露给 TracedClient，
+    并发子任务（gather / create_task）会继承同一个 trace。
+    """
+    for name in dir(type(target)):
+        if not name.startswith("cmd_"):
+            continue
+        method = getattr(target, name, None)
+        if not inspect.isasyncgenfunction(method):
+            continue
+        setattr(target, name, _wrap_command(name[4:], method, observe))
+
+
+def _wrap_command(command: str, method, observe):
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        try:
+            params = dict(signature.bind_partial(*args, **kwargs).arguments)
+        except TypeError:
+            params = {}
+        trace = CommandTrace(command, params.pop("event", None), params)
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            async for item in method(*args, **kwargs):
+                text = result_text(item)
+                trace.output_bytes += len(text.encode("utf-8"))
+                if text:
+                    trace.last_output = text
+                yield item
+        except asyncio.CancelledError:
+            trace.outcome = "cancelled"
+            raise
+        except Exception:
+            trace.outcome = "error"
+            raise
+        finally:
+            try:
+                _current_trace.reset(token)
+            except ValueError:
+                # 生成器在其他上下文中被关闭（如事件循环回收），无需还原
+                pass
+            observe(
+                command,
+                time.perf_counter() - started,
+                trace.outcome == "ok",
+                trace,
+            )
+
+    return wrapper
+
+
+ADAPTER_GAUGES = (
+    (
+        "sync_success",
+        "matrix_adapter_sync_success_total",
+        "counter",
+        "Successful /sync requests.",
+    ),
+    (
+        "sync_failure",
+        "matrix_adapter_sync_failure_total",
+        "counter",
+        "Failed /sync requests.",
+    ),
+    (
+        "consecutive_failures",
+        "matrix_adapter_sync_consecutive_failures",
+        "gauge",
+        "Consecutive /sync failures.",
+    ),
+    (
+        "outbound_pending",
+        "matrix_adapter_outbound_pending",
+        "gauge",
+        "Pending outbound messages.",
+    ),
+    (
+        "outbound_failed",
+        "matrix_adapter_outbound_failed_total",
+        "counter",
+        "Failed outbound messages.",
+    ),
+    (
+        "outbound_sent",
+        "matrix_adapter_outbound_sent_total",
+        "counter",
+        "Sent outbound messages.",
+    ),
+    (
+        "recent_errors",
+        "matrix_adapter_recent_errors",
+        "gauge",
+        "Recently recorded adapter errors.",
+    ),
+    ("healthy", "matrix_adapter_healthy", "gauge", "1 when the adapter looks healthy."),
+)
+
+
+def render_adapter_metrics(snapshots: list[tuple[str, dict]]) -> list[str]:
+    """snapshots 为 (adapter_id, summary) 列表，summary 由运行状态归纳而来。"""
+    lines: list[str] = []
+    for key, metric, metric_type, help_text in ADAPTER_GAUGES:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for adapter_id, summary in snapshots:
+            if key not in summary:
+                continue
+            labels = format_labels({"adapter": adapter_id})
+            lines.append(f"{metric}{labels} {int(summary[key])}")
+    return lines
+
+
+class MetricsExporter:
+    """定期采样并缓存指标文本；HTTP 端点与文件输出都只读取缓存，不阻塞事件循环。"""
+
+    def __init__(
+        self,
+        collect: Callable[[], Awaitable[list[str]]],
+        interval: float = 15.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        file_path: str = "",
+    ):
+        self.collect = collect
+        self.interval = max(1.0, float(interval))
+        self.host = host
+        self.port = int(port or 0)
+        self.file_path = Path(file_path).expanduser() if file_path else None
+        self.cached_text = ""
+        self._task: asyncio.Task | None = None
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.port or self.file_path)
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        await self.refresh()
+        if self.port:
+            self._server = await asyncio.start_server(
+                self._handle_http, self.host, self.port
+            )
+            logger.info(
+                f"[MatrixAdmin] 指标端点已启动：http://{self.host}:{self.port}/metrics"
+            )
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def refresh(self) -> None:
+        try:
+            lines = await self.collect()
+        except Exception as exc:
+            logger.warning(f"[MatrixAdmin] 采集指标失败：{exc}")
+            return
+        self.cached_text = "\n".join(lines) + "\n"
+        if self.file_path:
+            await asyncio.to_thread(self._write_file, self.cached_text)
+
+    def _write_file(self, text: str) -> None:
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.file_path.with_name(f"{self.file_path.name}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, self.file_path)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.refresh()
+
+    async def _handle_http(self, reader, writer) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?", 1)[0] if len(parts) >= 2 else ""
+            if path == "/metrics":
+                status, body = "200 OK", self.cached_text.encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                (
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode()
+                + body
+            )
+            await writer.drain()
+        except Exception as exc:
+            logger.debug(f"[MatrixAdmin] 指标请求处理失败：{exc}")
+        finally:
+            writer.close()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from astrbot.api import logger
+
+
+class AdminNotifier:
+    """管理房间通知的并发扇出。
+
+    同一适配器在 coalesce_window 内的通知会合并为一条消息；尚未发出的相同
+    通知只保留一份。每个房间独立超时，慢房间不会拖慢其他房间。
+    """
+
+    def __init__(
+        self,
+        resolve_rooms: Callable[[str], list[str]],
+        send: Callable[[str, str, str], Awaitable[None]],
+        coalesce_window: float = 1.5,
+        room_timeout: float = 10.0,
+        max_batch: int = 20,
+    ):
+        self.resolve_rooms = resolve_rooms
+        self.send = send
+        self.coalesce_window = max(0.0, float(coalesce_window))
+        self.room_timeout = max(1.0, float(room_timeout))
+        self.max_batch = max(1, int(max_batch))
+        self._pending: dict[str, list[str]] = {}
+        self._flush_tasks: dict[str, asyncio.Task] = {}
+
+    def notify(self, adapter_id: str, message: str) -> bool:
+        """登记一条通知，返回 False 表示与待发送通知重复而被丢弃。"""
+        text = str(message or "").strip()
+        if not text:
+            return False
+        pending = self._pending.setdefault(adapter_id, [])
+        if text in pending:
+            return False
+        pending.append(text)
+        if adapter_id not in self._flush_tasks:
+            self._flush_tasks[adapter_id] = asyncio.create_task(
+                self._flush_later(adapter_id)
+            )
+        return True
+
+    async def _flush_later(self, adapter_id: str) -> None:
+        try:
+            await asyncio.sleep(self.coalesce_window)
+        finally:
+            self._flush_tasks.pop(adapter_id, None)
+        messages = self._pending.pop(adapter_id, [])
+        if messages:
+            await self.flush(adapter_id, messages)
+
+    async def flush(self, adapter_id: str, messages: list[str]) -> None:
+        rooms = self.resolve_rooms(adapter_id)
+        if not rooms:
+            return
+        shown = messages[: self.max_batch]
+        if len(messages) == 1:
+            text = messages[0]
+        else:
+            text = "\n".join(
+                [f"共 {len(messages)} 条通知：", *(f"- {m}" for m in shown)]
+            )
+            if len(messages) > len(shown):
+                text += f"\n- ...（其余 {len(messages) - len(shown)} 条已省略）"
+
+        async def _send(room_id: str) -> None:
+            await asyncio.wait_for(
+                self.send(adapter_id, room_id, text), timeout=self.room_timeout
+            )
+
+        results = await asyncio.gather(
+            *(_send(room_id) for room_id in rooms), return_exceptions=True
+        )
+        for room_id, result in zip(rooms, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning(f"[MatrixAdmin] 通知房间 {room_id} 超时")
+            elif isinstance(result, Exception):
+                logger.warning(f"[MatrixAdmin] 通知房间 {room_id} 失败：{result}")
+
+    async def close(self) -> None:
+        tasks = list(self._flush_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending.clear()
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import gzip
+import json
+import re
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+SNAPSHOT_SUFFIX = ".jsonl.gz"
+_SNAPSHOT_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# 摘要 / diff / 恢复关注的状态类型
+POWER_LEVELS = "m.room.power_levels"
+JOIN_RULES = "m.room.join_rules"
+HISTORY_VISIBILITY = "m.room.history_visibility"
+CANONICAL_ALIAS = "m.room.canonical_alias"
+SPACE_CHILD = "m.space.child"
+MEMBER = "m.room.member"
+
+# 可恢复的状态类型：命令参数名 -> 事件类型
+RESTORE_TYPES = {
+    "power": POWER_LEVELS,
+    "join": JOIN_RULES,
+    "history": HISTORY_VISIBILITY,
+    "space": SPACE_CHILD,
+    "alias": CANONICAL_ALIAS,
+}
+
+
+def is_valid_snapshot_name(name: str) -> bool:
+    return bool(_SNAPSHOT_NAME_RE.match(name or "")) and name not in (".", "..")
+
+
+def snapshot_path(directory: Path, name: str) -> Path:
+    return directory / f"{name}{SNAPSHOT_SUFFIX}"
+
+
+def list_snapshots(directory: Path) -> list[tuple[str, int, float]]:
+    """返回 (名称, 字节数, 修改时间)，按时间倒序。"""
+    if not directory.exists():
+        return []
+    items = []
+    for path in directory.glob(f"*{SNAPSHOT_SUFFIX}"):
+        stat = path.stat()
+        items.append((path.name[: -len(SNAPSHOT_SUFFIX)], stat.st_size, stat.st_mtime))
+    return sorted(items, key=lambda item: item[2], reverse=True)
+
+
+def compact_state(events: list) -> list[list]:
+    """把 get_room_state 返回的事件压缩为 [type, state_key, content]。"""
+    compact = []
+    for evt in events or []:
+        if not isinstance(evt, dict) or not evt.get("type"):
+            continue
+        content = evt.get("content")
+        compact.append(
+            [
+                evt["type"],
+                str(evt.get("state_key") or ""),
+                content if isinstance(content, dict) else {},
+            ]
+        )
+    return compact
+
+
+class SnapshotWriter:
+    """逐房间写入 gzip 压缩的 JSON Lines 快照；先写临时文件，完成后原子替换。
+
+    方法均为同步阻塞调用，由调用方放到线程中执行。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp_path = path.with_name(f"{path.name}.tmp")
+        self.rooms = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fp = gzip.open(self.tmp_path, "wt", encoding="utf-8")
+
+    def write_room(self, room_id: str, events: list) -> None:
+        record = {
+            "room_id": room_id,
+            "taken_at": time.time(),
+            "state": compact_state(events),
+        }
+        self._fp.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self._fp.write("\n")
+        self.rooms += 1
+
+    def commit(self) -> None:
+        self._fp.close()
+        self.tmp_path.replace(self.path)
+
+    def abort(self) -> None:
+        self._fp.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def iter_snapshot(path: Path) -> Iterator[dict]:
+    """逐行读取快照，每次产出一个房间记录，不把整个文件读入内存。"""
+    with gzip.open(path, "rt", encoding="utf-8") as fp:
+        for line in fp:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def state_index(state: list) -> dict[tuple[str, str], dict]:
+    """(type, state_key) -> content；同时接受压缩格式与完整事件。"""
+    index: dict[tuple[str, str], dict] = {}
+    for item in state or []:
+        if isinstance(item, dict):
+            item = compact_state([item])
+            if not item:
+                continue
+            item = item[0]
+        event_type, state_key, content = item
+        index[(event_type, state_key)] = content
+    return index
+
+
+def summarize_state(state: list) -> dict:
+    """提取用于比对的摘要：权限、加入规则、历史可见性、别名、Space 子房间与成员。"""
+    index = state_index(state)
+    canonical = index.get((CANONICAL_ALIAS, ""), {})
+    aliases = [canonical.get("alias")]
+    if isinstance(canonical.get("alt_aliases"), list):
+        aliases.extend(canonical["alt_aliases"])
+    return {
+        "power_levels": index.get((POWER_LEVELS, ""), {}),
+        "join_rule": str(index.get((JOIN_RULES, ""), {}).get("join_rule") or ""),
+        "history_visibility": str(
+            index.get((HISTORY_VISIBILITY, ""), {}).get("history_visibility") or ""
+        ),
+        "aliases": sorted({a for a in aliases if isinstance(a, str) and a}),
+        "space_children": sorted(
+            key
+            for (event_type, key), content in index.items()
+            if event_type == SPACE_CHILD and content.get("via")
+        ),
+        "members": {
+            key: str(content.get("membership") or "")
+            for (event_type, key), content in index.items()
+            if event_type == MEMBER and key
+        },
+    }
+
+
+def _diff_mapping(label: str, old: dict, new: dict) -> list[str]:
+    lines = []
+    for key in sorted(set(old) | set(new), key=str):
+        if old.get(key) != new.get(key):
+            lines.append(f"{label} {key}：{old.get(key, '-')} -> {new.get(key, '-')}")
+    return lines
+
+
+def diff_summaries(old: dict, new: dict, member_samples: int = 5) -> list[str]:
+    """比较两个 summarize_state 结果，返回变化说明（空列表表示一致）。"""
+    lines: list[str] = []
+    old_pl = old.get("power_levels") or {}
+    new_pl = new.get("power_levels") or {}
+    lines += _diff_mapping("权限", old_pl.get("users") or {}, new_pl.get("users") or {})
+    lines += _diff_mapping(
+        "权限事件", old_pl.get("events") or {}, new_pl.get("events") or {}
+    )
+    scalar_keys = {k for k in set(old_pl) | set(new_pl) if k not in ("users", "events")}
+    lines += _diff_mapping(
+        "权限项",
+        {k: old_pl.get(k) for k in scalar_keys if k in old_pl},
+        {k: new_pl.get(k) for k in scalar_keys if k in new_pl},
+    )
+    for key, label in (("join_rule", "加入规则"), ("history_visibility", "历史可见性")):
+        if old.get(key) != new.get(key):
+            lines.append(f"{label}：{old.get(key) or '-'} -> {new.get(key) or '-'}")
+    for key, label in (("aliases", "别名"), ("space_children", "Space 子房间")):
+        removed = sorted(set(old.get(key) or []) - set(new.get(key) or []))
+        added = sorted(set(new.get(key) or []) - set(old.get(key) or []))
+        if removed:
+            lines.append(f"{label}移除：{', '.join(removed)}")
+        if added:
+            lines.append(f"{label}新增：{', '.join(added)}")
+
+    member_changes = _diff_mapping(
+        "成员", old.get("members") or {}, new.get("members") or {}
+    )
+    if member_changes:
+        lines += member_changes[:member_samples]
+        if len(member_changes) > member_samples:
+            lines.append(
+                f"成员变化共 {len(member_changes)} 项（仅显示前 {member_samples} 项）"
+            )
+    return lines
+
+
+def plan_restore(
+    saved_state: list, live_state: list, event_types: set[str]
+) -> list[tuple[str, str, dict]]:
+    """计算把线上状态恢复为快照所需的最少写入 (type, state_key, content)。
+
+    只写入与线上不同的事件；快照中不存在、线上新增的 Space 子房间链接写入空内容移除。
+    power_levels 排在最后，避免先降低机器人权限导致后续写入失败。
+    """
+    saved = state_index(saved_state)
+    live = state_index(live_state)
+    writes: list[tuple[str, str, dict]] = []
+    for (event_type, state_key), content in saved.items():
+        if event_type not in event_types:
+            continue
+        current = live.get((event_type, state_key))
+        if current == content:
+            continue
+        if event_type == SPACE_CHILD and not content.get("via"):
+            # 快照中已移除的链接：线上也不存在时无需写入
+            if not (current or {}).get("via"):
+                continue
+        writes.append((event_type, state_key, content))
+    if SPACE_CHILD in event_types:
+        for (event_type, state_key), content in live.items():
+            if (
+                event_type == SPACE_CHILD
+                and content.get("via")
+                and (event_type, state_key) not in saved
+            ):
+                writes.append((event_type, state_key, {}))
+    writes.sort(key=lambda item: (item[0] == POWER_LEVELS, item[0], item[1]))
+    return writes
+
+
+def can_send_state(power_levels: dict, user_id: str, event_type: str) -> bool:
+    """按 power_levels 内容判断用户能否发送指定 state event（无内容时视为可以）。"""
+    if not power_levels:
+        return True
+    users = power_levels.get("users") or {}
+    events = power_levels.get("events") or {}
+    try:
+        level = int(users.get(user_id, power_levels.get("users_default", 0)))
+        required = int(events.get(event_type, power_levels.get("state_default", 50)))
+    except (TypeError, ValueError):
+        return True
+    return level >= required
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from astrbot.api import logger
+
+
+class SyncWatchdog:
+    """周期采样各适配器的 sync 统计，发现停滞时自动重连并通知管理房间。
+
+    判定停滞：sync 成功计数在 stall_seconds 内没有增长，或连续失败次数达到
+    failure_threshold。同一适配器的自动重连按指数退避，恢复后重置。
+    """
+
+    def __init__(
+        self,
+        collect: Callable[[], Awaitable[list[tuple[str, dict]]]],
+        reconnect: Callable[[str], bool],
+        notify: Callable[[str, str], Awaitable[None]],
+        interval: float = 30.0,
+        stall_seconds: float = 180.0,
+        failure_threshold: int = 5,
+        max_backoff: float = 900.0,
+    ):
+        self.collect = collect
+        self.reconnect = reconnect
+        self.notify = notify
+        self.interval = max(5.0, float(interval))
+        self.stall_seconds = max(self.interval, float(stall_seconds))
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.max_backoff = max_backoff
+        self.adapters: dict[str, dict] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as exc:
+                logger.warning(f"[MatrixAdmin] sync 看门狗检查失败：{exc}")
+
+    def _detect_stall(self, state: dict, summary: dict, now: float) -> str:
+        if summary["sync_success"] != state["last_success"]:
+            state["last_success"] = summary["sync_success"]
+            state["last_advance_at"] = now
+            return ""
+        if summary["consecutive_failures"] >= self.failure_threshold:
+            return f"sync 连续失败 {summary['consecutive_failures']} 次"
+        stalled_for = now - state["last_advance_at"]
+        if stalled_for >= self.stall_seconds:
+            return f"sync 已 {int(stalled_for)}s 未成功"
+        return ""
+
+    async def check(self) -> None:
+        now = time.monotonic()
+        for adapter_id, summary in await self.collect():
+            if "error" in summary:
+                continue
+            state = self.adapters.get(adapter_id)
+            if state is None:
+                self.adapters[adapter_id] = {
+                    "last_success": summary["sync_success"],
+                    "last_advance_at": now,
+                    "attempts": 0,
+                    "next_attempt_at": 0.0,
+                }
+                continue
+
+            reason = self._detect_stall(state, summary, now)
+            if not reason:
+                if state["attempts"]:
+                    state["attempts"] = 0
+                    state["next_attempt_at"] = 0.0
+                    await self._safe_notify(adapter_id, "✅ sync 已恢复")
+                continue
+            if now < state["next_attempt_at"]:
+                continue
+
+            state["attempts"] += 1
+            backoff = min(self.interval * 2 ** state["attempts"], self.max_backoff)
+            state["next_attempt_at"] = now + backoff
+            try:
+                ok = self.reconnect(adapter_id)
+            except Exception as exc:
+                logger.error(f"[MatrixAdmin] 自动重连 {adapter_id} 失败：{exc}")
+                ok = False
+            logger.warning(
+                f"[MatrixAdmin] {adapter_id} {reason}，自动重连"
+                f"{'已触发' if ok else '未能触发'}（第 {state['attempts']} 次）"
+            )
+            await self._safe_notify(
+                adapter_id,
+                f"⚠️ {reason}，"
+                f"{'已自动请求重连' if ok else '自动重连未能触发（sync 未运行）'}"
+                f"（第 {state['attempts']} 次，下次最早 {int(backoff)}s 后）",
+            )
+
+    async def _safe_notify(self, adapter_id: str, message: str) -> None:
+        try:
+            await self.notify(adapter_id, message)
+        except Exception as exc:
+            logger.warning(f"[MatrixAdmin] 看门狗通知失败：{exc}")
@@ -0,0 +1,49 @@
+import importlib.util
+import logging
+import sys
+import types
+from pathlib import Path
+
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+
+# 纯函数模块按顶层模块导入（snapshot、governor 等）
+if str(PLUGIN_ROOT) not in sys.path:
+    sys.path.insert(0, str(PLUGIN_ROOT))
+
+# 命令 mixin 使用包内相对导入，以固定的包名 matrix_admin 挂载插件目录
+if "matrix_admin" not in sys.modules:
+    package = types.ModuleType("matrix_admin")
+    package.__path__ = [str(PLUGIN_ROOT)]
+    sys.modules["matrix_admin"] = package
+
+
+def _install_astrbot_placeholders() -> None:
+    """未安装 AstrBot 时，只提供被测模块在导入时引用的名字。"""
+
+    def _module(name: str, **attrs) -> types.ModuleType:
+        module = types.ModuleType(name)
+        module.__path__ = []
+        module.__dict__.update(attrs)
+        sys.modules.setdefault(name, module)
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, sys.modules[name])
+        return sys.modules[name]
+
+    _module("astrbot")
+    _module("astrbot.api", logger=logging.getLogger("astrbot"))
+    _module("astrbot.api.event", AstrMessageEvent=object)
+    _module("astrbot.core")
+    _module("astrbot.core.message")
+    _module(
+        "astrbot.core.message.components",
+        Image=type("Image", (), {}),
+        Reply=type("Reply", (), {}),
+    )
+    _module("astrbot.core.star")
+    _module("astrbot.core.star.filter")
+    _module("astrbot.core.star.filter.command", GreedyStr=str)
+
+
+if importlib.util.find_spec("astrbot") is None:
+    _install_astrbot_placeholders()
@@ -0,0 +1,76 @@
+"""测试用的事件替身与插件组装工具。"""
+
+import asyncio
+
+from matrix_admin.commands.base import MatrixCommandContext
+
+
+class FakeEvent:
+    """最小化的消息事件替身，只提供命令用到的方法。"""
+
+    def __init__(
+        self,
+        room_id: str = "!admin:hs",
+        sender_id: str = "@admin:hs",
+        platform_id: str = "matrix",
+    ):
+        self.room_id = room_id
+        self.sender_id = sender_id
+        self.platform_id = platform_id
+        self.unified_msg_origin = f"{platform_id}:GroupMessage:{room_id}"
+        self.message_str = ""
+        self._extras: dict = {}
+
+    def get_platform_name(self) -> str:
+        return "matrix"
+
+    def get_platform_id(self) -> str:
+        return self.platform_id
+
+    def get_session_id(self) -> str:
+        return self.room_id
+
+    def get_sender_id(self) -> str:
+        return self.sender_id
+
+    def get_extra(self, key: str, default=None):
+        return self._extras.get(key, default)
+
+    def set_extra(self, key: str, value) -> None:
+        self._extras[key] = value
+
+    def plain_result(self, text: str) -> str:
+        return text
+
+
+def build_plugin(client, *mixins, **attrs):
+    """用命令 mixin 组装不依赖 Star 运行时的插件实例，所有命令共用 client。"""
+
+    class TestPlugin(*mixins):
+        def _build_command_context(self, event):
+            room_id = event.get_session_id()
+            bot_user_id = str(getattr(client, "user_id", "") or "")
+            return MatrixCommandContext(
+                client=client,
+                platform_id=event.get_platform_id(),
+                room_id=room_id,
+                room_server_name=room_id.split(":", 1)[1],
+                bot_user_id=bot_user_id,
+                server_name=bot_user_id.split(":", 1)[1],
+            )
+
+    plugin = TestPlugin()
+    plugin.context = None
+    plugin.config = {}
+    for key, value in attrs.items():
+        setattr(plugin, key, value)
+    return plugin
+
+
+def run_command(agen) -> list[str]:
+    """执行命令异步生成器，返回全部回复。"""
+
+    async def _collect():
+        return [item async for item in agen]
+
+    return asyncio.run(_collect())
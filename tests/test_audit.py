@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from audit import AuditLog
+
+
+def _row(ts, command, actor="@admin:hs", target_user="", target_room="!r:hs"):
+    return (
+        ts,
+        actor,
+        "matrix",
+        command,
+        target_user,
+        target_room,
+        "{}",
+        "ok",
+        1.0,
+        "",
+    )
+
+
+@pytest.fixture
+def audit(tmp_path):
+    audit = AuditLog(tmp_path / "audit.db", retention_days=0)
+    audit._insert_sync(
+        [
+            _row(100.0, "kick", target_user="@spam:hs"),
+            _row(200.0, "ban", target_user="@spam:hs", target_room="!other:hs"),
+            _row(300.0, "whois", actor="@mod:hs", target_user="@admin:hs"),
+            _row(400.0, "kick", actor="@mod:hs", target_user="@bob:hs"),
+        ]
+    )
+    yield audit
+    audit._conn.close()
+
+
+def test_query_orders_newest_first_and_limits(audit):
+    rows = audit._query_sync(limit=2)
+    assert [row["ts"] for row in rows] == [400.0, 300.0]
+    assert set(rows[0]) >= {"actor", "command", "target_user", "outcome"}
+
+
+def test_query_user_matches_actor_or_target(audit):
+    rows = audit._query_sync(user="@admin:hs")
+    assert [row["ts"] for row in rows] == [300.0, 200.0, 100.0]
+    rows = audit._query_sync(user="@spam:hs")
+    assert [row["command"] for row in rows] == ["ban", "kick"]
+
+
+def test_query_combines_filters(audit):
+    assert [row["ts"] for row in audit._query_sync(command="kick")] == [400.0, 100.0]
+    assert [row["ts"] for row in audit._query_sync(actor="@mod:hs")] == [400.0, 300.0]
+    assert [row["ts"] for row in audit._query_sync(room="!other:hs")] == [200.0]
+    rows = audit._query_sync(command="kick", since=150.0)
+    assert [row["ts"] for row in rows] == [400.0]
+    rows = audit._query_sync(since=150.0, until=350.0)
+    assert [row["ts"] for row in rows] == [300.0, 200.0]
+
+
+def test_query_without_matches(audit):
+    assert audit._query_sync(user="@nobody:hs") == []
+    assert len(audit._query_sync(limit=0)) == 1
+
+
+class _Event:
+    def get_sender_id(self):
+        return "@admin:hs"
+
+    def get_platform_id(self):
+        return "matrix"
+
+    def get_session_id(self):
+        return "!here:hs"
+
+
+class _Trace:
+    def __init__(self, params, target_user="", outcome="ok", last_output=""):
+        self.event = _Event()
+        self.params = params
+        self.target_user = target_user
+        self.outcome = outcome
+        self.last_output = last_output
+
+
+def test_rows_recorded_before_start_are_written_once_started(tmp_path):
+    async def run():
+        log = AuditLog(tmp_path / "audit.db", retention_days=0)
+        log.record_command(
+            "kick",
+            0.2,
+            False,
+            _Trace(
+                {"user": "alice", "reason": "spam"},
+                target_user="@alice:hs",
+                outcome="failed",
+                last_output="踢出用户失败：M_FORBIDDEN\n详情",
+            ),
+        )
+        log.record_command("ban", 0.1, True, _Trace({"user": "@bob:hs !r:hs"}))
+        await log.start()
+        await log.close()
+        return log._query_sync()
+
+    rows = asyncio.run(run())
+    assert len(rows) == 2
+    by_command = {row["command"]: row for row in rows}
+    kick = by_command["kick"]
+    assert (kick["target_user"], kick["outcome"]) == ("@alice:hs", "failed")
+    assert kick["target_room"] == "!here:hs"
+    assert kick["detail"] == "踢出用户失败：M_FORBIDDEN"
+    ban = by_command["ban"]
+    assert (ban["target_user"], ban["target_room"], ban["outcome"]) == (
+        "@bob:hs",
+        "!r:hs",
+        "ok",
+    )
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from matrix_admin.commands.base import AdminCommandMixin
+from matrix_admin.governor import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    RateGovernor,
+    current_priority,
+    rate_limit_delay,
+)
+
+
+class _LimitError(Exception):
+    def __init__(self, message, retry_after_ms=None):
+        super().__init__(message)
+        if retry_after_ms is not None:
+            self.retry_after_ms = retry_after_ms
+
+
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    [
+        (_LimitError("boom", retry_after_ms=1500), 1.5),
+        (_LimitError('M_LIMIT_EXCEEDED {"retry_after_ms": 2000}'), 2.0),
+        ("HTTP 429 Too Many Requests", 0.0),
+        ("M_FORBIDDEN", None),
+        (_LimitError("timeout"), None),
+    ],
+)
+def test_rate_limit_delay(error, expected):
+    assert rate_limit_delay(error) == expected
+
+
+def test_rate_limited_halves_rate_and_pauses():
+    governor = RateGovernor(rate=8.0, burst=4, min_rate=1.0)
+    governor.on_rate_limited(30.0)
+    assert governor.rate == 4.0
+    assert governor.rate_limited == 1
+    assert not governor._try_take()
+    assert governor.snapshot()["paused_for"] > 29.0
+
+    for _ in range(5):
+        governor.on_rate_limited(0.0)
+    assert governor.rate == 1.0
+
+
+def test_success_recovers_rate_up_to_max():
+    governor = RateGovernor(rate=2.0, recover_step=0.5)
+    governor.on_rate_limited(0.0)
+    assert governor.rate == 1.0
+    governor.on_success()
+    assert governor.rate == 1.5
+    for _ in range(5):
+        governor.on_success()
+    assert governor.rate == governor.max_rate == 2.0
+
+
+def test_burst_is_granted_immediately():
+    async def run():
+        governor = RateGovernor(rate=0.01, burst=3, min_rate=0.01)
+        for _ in range(3):
+            await asyncio.wait_for(governor.acquire(), timeout=0.1)
+        assert governor.granted == 3
+        assert not governor._try_take()
+        governor.close()
+
+    asyncio.run(run())
+
+
+def test_interactive_waiters_go_before_bulk():
+    async def run():
+        governor = RateGovernor(rate=50.0, burst=1)
+        await governor.acquire()
+        order = []
+
+        async def take(priority, name):
+            await governor.acquire(priority)
+            order.append(name)
+
+        bulk = asyncio.create_task(take(PRIORITY_BULK, "bulk"))
+        interactive = asyncio.create_task(take(PRIORITY_INTERACTIVE, "interactive"))
+        await asyncio.wait_for(asyncio.gather(bulk, interactive), timeout=1.0)
+        governor.close()
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "bulk"]
+
+
+def test_close_cancels_waiters():
+    async def run():
+        governor = RateGovernor(rate=0.01, burst=1, min_rate=0.01)
+        await governor.acquire()
+        waiter = asyncio.create_task(governor.acquire())
+        await asyncio.sleep(0)
+        assert governor.waiting == 1
+        governor.close()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    ("bulk", "expected"), [(False, PRIORITY_INTERACTIVE), (True, PRIORITY_BULK)]
+)
+def test_run_bounded_only_demotes_bulk_callers(bulk, expected):
+    async def worker(_item):
+        return current_priority()
+
+    async def run():
+        results = await AdminCommandMixin._run_bounded([1, 2], worker, 2, bulk=bulk)
+        return results, current_priority()
+
+    results, caller_priority = asyncio.run(run())
+    assert results == [expected, expected]
+    assert caller_priority == PRIORITY_INTERACTIVE
@@ -0,0 +1,188 @@
+import asyncio
+
+from helpers import FakeEvent, build_plugin
+from matrix_admin.commands.base import AdminCommandMixin
+from matrix_admin.jobs import JobManager
+from matrix_admin.metrics import (
+    CommandTrace,
+    current_trace,
+    note_target_user,
+    set_current_trace,
+)
+
+
+def _manager(**kwargs):
+    observed = []
+    notified = []
+
+    async def notify(job):
+        notified.append((job.id, job.status))
+
+    manager = JobManager(
+        notify=notify,
+        observe=lambda job: observed.append((job.id, job.status)),
+        **kwargs,
+    )
+    return manager, observed, notified
+
+
+async def _wait(manager):
+    await asyncio.gather(*(job.task for job in manager.jobs.values()))
+
+
+def test_job_final_status_is_observed_and_notified():
+    async def run():
+        manager, observed, notified = _manager()
+
+        async def ok(job):
+            job.progress(2, 2)
+            return "done text"
+
+        async def boom(job):
+            raise RuntimeError("boom")
+
+        done = manager.submit("a", "ok job", ok)
+        failed = manager.submit("b", "bad job", boom)
+        await _wait(manager)
+        return done, failed, observed, notified
+
+    done, failed, observed, notified = asyncio.run(run())
+    assert (done.status, done.result, done.progress_text()) == (
+        "done",
+        "done text",
+        "2/2",
+    )
+    assert (failed.status, failed.error) == ("failed", "boom")
+    assert sorted(observed) == [("1", "done"), ("2", "failed")]
+    assert sorted(notified) == sorted(observed)
+
+
+def test_cancelled_job_is_observed():
+    async def run():
+        manager, observed, _ = _manager()
+        started = asyncio.Event()
+
+        async def slow(job):
+            started.set()
+            await asyncio.sleep(10)
+
+        job = manager.submit("a", "slow", slow)
+        await started.wait()
+        assert manager.cancel(job.id) is job
+        await _wait(manager)
+        return job, observed
+
+    job, observed = asyncio.run(run())
+    assert job.status == "cancelled"
+    assert observed == [("1", "cancelled")]
+
+
+def test_close_cancels_running_jobs_and_still_observes_them():
+    async def run():
+        manager, observed, notified = _manager()
+        started = asyncio.Event()
+
+        async def slow(job):
+            started.set()
+            await asyncio.sleep(10)
+
+        manager.submit("a", "slow", slow)
+        await started.wait()
+        await manager.close()
+        return observed, notified
+
+    observed, notified = asyncio.run(run())
+    assert observed == [("1", "cancelled")]
+    assert notified == []
+
+
+def test_jobs_of_one_kind_respect_the_concurrency_limit():
+    async def run():
+        manager, _, _ = _manager(default_limit=1, limits={"wide": 2})
+        running = {"narrow": 0, "wide": 0}
+        peak = {"narrow": 0, "wide": 0}
+
+        def runner(kind):
+            async def _run(job):
+                running[kind] += 1
+                peak[kind] = max(peak[kind], running[kind])
+                await asyncio.sleep(0.01)
+                running[kind] -= 1
+                return ""
+
+            return _run
+
+        for _ in range(3):
+            manager.submit("narrow", "n", runner("narrow"))
+            manager.submit("wide", "w", runner("wide"))
+        await _wait(manager)
+        return peak
+
+    assert asyncio.run(run()) == {"narrow": 1, "wide": 2}
+
+
+def test_job_runs_under_its_own_trace():
+    async def run():
+        manager, _, _ = _manager()
+        outer = CommandTrace("upgradebulk")
+        job_trace = CommandTrace("job:upgradebulk")
+        seen = []
+
+        async def runner(job):
+            seen.append(current_trace())
+            note_target_user("@target:hs")
+            return ""
+
+        set_current_trace(outer)
+        manager.submit("upgradebulk", "u", runner, trace=job_trace)
+        await _wait(manager)
+        return outer, job_trace, seen
+
+    outer, job_trace, seen = asyncio.run(run())
+    assert seen == [job_trace]
+    assert job_trace.target_user == "@target:hs"
+    assert outer.target_user == ""
+
+
+def test_finished_jobs_are_pruned_to_history_size():
+    async def run():
+        manager, _, _ = _manager(history_size=2)
+
+        async def quick(job):
+            return ""
+
+        for _ in range(4):
+            manager.submit("a", "q", quick)
+            await _wait(manager)
+        return manager
+
+    manager = asyncio.run(run())
+    assert [job.id for job in manager.list()] == ["4", "3", "2"]
+    assert manager.get("#4").status == "done"
+    assert manager.get("1") is None
+
+
+def test_start_job_gives_the_job_a_trace_derived_from_the_command():
+
+    async def run():
+        manager, observed, _ = _manager()
+        plugin = build_plugin(None, AdminCommandMixin, job_manager=manager)
+        event = FakeEvent()
+        origin = CommandTrace("purgebot", event, {"limit": "500"})
+        origin.target_user = "@spam:hs"
+        set_current_trace(origin)
+
+        async def runner(job):
+            return "removed 3"
+
+        reply = await plugin._start_job(event, "purgebot", "purge", runner)
+        await _wait(manager)
+        return reply, manager.get("1"), observed
+
+    reply, job, observed = asyncio.run(run())
+    assert reply.startswith("已提交后台任务 #1：purge")
+    assert job.trace.command == "job:purgebot"
+    assert job.trace.params == {"limit": "500", "job_id": "1"}
+    assert job.trace.target_user == "@spam:hs"
+    assert job.trace.event is not None
+    assert observed == [("1", "done")]
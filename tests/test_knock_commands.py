@@ -0,0 +1,91 @@
+from helpers import FakeEvent, build_plugin, run_command
+from matrix_admin.commands.knock_commands import KnockCommandsMixin
+
+
+class KnockClient:
+    user_id = "@bot:hs"
+
+    def __init__(self, rooms, bot_power=100):
+        # rooms: room_id -> {user_id: membership}
+        self.rooms = rooms
+        self.bot_power = bot_power
+        self.invited = []
+        self.kicked = []
+
+    async def get_joined_rooms(self):
+        return list(self.rooms)
+
+    async def get_room_state_event(self, room_id, event_type):
+        return {"join_rule": "knock"}
+
+    async def get_room_members(self, room_id):
+        return {
+            "chunk": [
+                {
+                    "type": "m.room.member",
+                    "state_key": user_id,
+                    "content": {"membership": membership},
+                }
+                for user_id, membership in self.rooms[room_id].items()
+            ]
+        }
+
+    async def get_power_levels(self, room_id):
+        return {"users": {self.user_id: self.bot_power}, "kick": 50, "invite": 0}
+
+    async def get_room_member(self, room_id, user_id):
+        return {"membership": self.rooms[room_id].get(user_id, "leave")}
+
+    async def invite_user(self, room_id, user_id):
+        self.invited.append((room_id, user_id))
+
+    async def kick_user(self, room_id, user_id, reason=None):
+        self.kicked.append((room_id, user_id, reason))
+
+
+def _plugin(client):
+    return build_plugin(client, KnockCommandsMixin)
+
+
+def test_deny_requires_selector():
+    client = KnockClient({"!r:hs": {"@k:hs": "knock"}})
+    replies = run_command(_plugin(client).cmd_knock_deny(FakeEvent()))
+    assert "请指定要处理的敲门请求" in replies[0]
+    assert client.kicked == []
+
+
+def test_deny_all_skips_requests_handled_since_indexing():
+    client = KnockClient(
+        {"!r:hs": {"@a:hs": "knock", "@b:hs": "knock", "@m:hs": "join"}}
+    )
+    plugin = _plugin(client)
+    event = FakeEvent()
+    run_command(plugin.cmd_knocks(event, "refresh"))
+    # 索引建立后 @b 已被其他管理员批准入房
+    client.rooms["!r:hs"]["@b:hs"] = "join"
+
+    (reply,) = run_command(plugin.cmd_knock_deny(event, "all", "spam"))
+    assert client.kicked == [("!r:hs", "@a:hs", "spam")]
+    assert reply.startswith("已拒绝敲门请求：成功 1 条，失败 0 条，已不在敲门状态 1 条")
+    assert "@b:hs @ !r:hs：当前状态为 join" in reply
+
+
+def test_approve_by_user_selector_invites_only_that_user():
+    client = KnockClient({"!r:hs": {"@a:hs": "knock", "@b:hs": "knock"}})
+    run_command(_plugin(client).cmd_knock_approve(FakeEvent(), "@b:hs"))
+    assert client.invited == [("!r:hs", "@b:hs")]
+
+
+def test_rooms_without_kick_power_are_skipped():
+    client = KnockClient({"!r:hs": {"@a:hs": "knock"}}, bot_power=10)
+    (reply,) = run_command(_plugin(client).cmd_knock_deny(FakeEvent(), "all"))
+    assert client.kicked == []
+    assert "1 个房间权限不足" in reply
+    assert "kick 需要 >= 50" in reply
+
+
+def test_listing_flags_rooms_the_bot_cannot_handle():
+    client = KnockClient({"!r:hs": {"@a:hs": "knock"}}, bot_power=-1)
+    (reply,) = run_command(_plugin(client).cmd_knocks(FakeEvent()))
+    assert "⚠️ 无法处理" in reply
+    assert "@a:hs" in reply
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from matrix_admin.metrics import (
+    CommandMetrics,
+    instrument_commands,
+    note_command_failed,
+    note_target_user,
+    render_adapter_metrics,
+)
+
+
+class Commands:
+    async def cmd_ok(self, event, user=""):
+        note_target_user("@target:hs")
+        yield "踢出用户失败：这只是回复文本"
+
+    async def cmd_failed(self, event):
+        note_command_failed()
+        yield "无法获取房间 ID"
+
+    async def cmd_error(self, event):
+        yield "开始处理"
+        raise RuntimeError("boom")
+
+    async def cmd_slow(self, event):
+        await asyncio.sleep(10)
+        yield "done"
+
+
+def _instrumented():
+    observed = []
+    commands = Commands()
+    instrument_commands(
+        commands, lambda *args: observed.append((args[0], args[2], args[3]))
+    )
+    return commands, observed
+
+
+async def _drain(agen):
+    return [item async for item in agen]
+
+
+def test_outcome_ok_ignores_reply_wording_and_keeps_target_user():
+    commands, observed = _instrumented()
+    assert asyncio.run(_drain(commands.cmd_ok(None, user="target"))) == [
+        "踢出用户失败：这只是回复文本"
+    ]
+    ((command, ok, trace),) = observed
+    assert (command, ok, trace.outcome) == ("ok", True, "ok")
+    assert trace.target_user == "@target:hs"
+    assert trace.params == {"user": "target"}
+
+
+def test_outcome_failed_when_command_marks_failure():
+    commands, observed = _instrumented()
+    asyncio.run(_drain(commands.cmd_failed(None)))
+    ((_, ok, trace),) = observed
+    assert (ok, trace.outcome) == (False, "failed")
+    assert trace.last_output == "无法获取房间 ID"
+
+
+def test_outcome_error_when_command_raises():
+    commands, observed = _instrumented()
+    with pytest.raises(RuntimeError):
+        asyncio.run(_drain(commands.cmd_error(None)))
+    ((_, ok, trace),) = observed
+    assert (ok, trace.outcome) == (False, "error")
+
+
+def test_outcome_cancelled_when_command_is_cancelled():
+    commands, observed = _instrumented()
+
+    async def run():
+        task = asyncio.create_task(_drain(commands.cmd_slow(None)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    ((_, ok, trace),) = observed
+    assert (ok, trace.outcome) == (False, "cancelled")
+
+
+def test_command_counter_uses_trace_outcome():
+    metrics = CommandMetrics()
+    commands = Commands()
+    instrument_commands(commands, metrics.observe)
+    asyncio.run(_drain(commands.cmd_ok(None)))
+    asyncio.run(_drain(commands.cmd_failed(None)))
+    rendered = "\n".join(metrics.render())
+    assert 'matrix_admin_command_total{command="ok",outcome="ok"} 1' in rendered
+    assert 'matrix_admin_command_total{command="failed",outcome="failed"} 1' in rendered
+
+
+def test_note_command_failed_outside_a_command_is_a_no_op():
+    note_command_failed()
+
+
+def test_cumulative_adapter_counts_are_exported_as_counters():
+    lines = render_adapter_metrics(
+        [("m1", {"outbound_failed": 3, "outbound_pending": 2, "healthy": True})]
+    )
+    assert "# TYPE matrix_adapter_outbound_failed_total counter" in lines
+    assert 'matrix_adapter_outbound_failed_total{adapter="m1"} 3' in lines
+    assert "# TYPE matrix_adapter_outbound_pending gauge" in lines
+    assert 'matrix_adapter_healthy{adapter="m1"} 1' in lines
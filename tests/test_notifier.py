@@ -0,0 +1,109 @@
+import asyncio
+
+from notifier import AdminNotifier
+
+
+class _Recorder:
+    def __init__(self, slow_rooms=(), failing_rooms=()):
+        self.sent = []
+        self.slow_rooms = set(slow_rooms)
+        self.failing_rooms = set(failing_rooms)
+
+    async def send(self, adapter_id, room_id, text):
+        if room_id in self.slow_rooms:
+            await asyncio.sleep(10)
+        if room_id in self.failing_rooms:
+            raise RuntimeError("M_FORBIDDEN")
+        self.sent.append((adapter_id, room_id, text))
+
+
+def _notifier(recorder, rooms=("!a:hs", "!b:hs"), **kwargs):
+    return AdminNotifier(lambda adapter_id: list(rooms), recorder.send, **kwargs)
+
+
+def test_notifications_within_window_are_coalesced_and_deduplicated():
+    async def run():
+        recorder = _Recorder()
+        notifier = _notifier(recorder, rooms=("!a:hs",), coalesce_window=0.05)
+        assert notifier.notify("m1", "sync 停滞")
+        assert not notifier.notify("m1", "sync 停滞")
+        assert notifier.notify("m1", "sync 已恢复")
+        assert not notifier.notify("m1", "   ")
+        await asyncio.sleep(0.2)
+        return recorder.sent
+
+    sent = asyncio.run(run())
+    assert sent == [("m1", "!a:hs", "共 2 条通知：\n- sync 停滞\n- sync 已恢复")]
+
+
+def test_single_notification_is_sent_verbatim_to_every_room():
+    async def run():
+        recorder = _Recorder()
+        notifier = _notifier(recorder, coalesce_window=0)
+        notifier.notify("m1", "hello")
+        await asyncio.sleep(0.05)
+        return recorder.sent
+
+    assert sorted(asyncio.run(run())) == [
+        ("m1", "!a:hs", "hello"),
+        ("m1", "!b:hs", "hello"),
+    ]
+
+
+def test_adapters_are_coalesced_independently():
+    async def run():
+        recorder = _Recorder()
+        notifier = _notifier(recorder, rooms=("!a:hs",), coalesce_window=0.02)
+        notifier.notify("m1", "one")
+        notifier.notify("m2", "two")
+        await asyncio.sleep(0.1)
+        return recorder.sent
+
+    assert sorted(asyncio.run(run())) == [
+        ("m1", "!a:hs", "one"),
+        ("m2", "!a:hs", "two"),
+    ]
+
+
+def test_batch_is_truncated_to_max_batch():
+    async def run():
+        recorder = _Recorder()
+        notifier = _notifier(recorder, rooms=("!a:hs",), max_batch=2)
+        await notifier.flush("m1", ["a", "b", "c", "d"])
+        return recorder.sent
+
+    ((_, _, text),) = asyncio.run(run())
+    assert text.splitlines() == [
+        "共 4 条通知：",
+        "- a",
+        "- b",
+        "- ...（其余 2 条已省略）",
+    ]
+
+
+def test_slow_and_failing_rooms_do_not_block_others():
+    async def run():
+        recorder = _Recorder(slow_rooms={"!slow:hs"}, failing_rooms={"!bad:hs"})
+        notifier = _notifier(
+            recorder, rooms=("!slow:hs", "!bad:hs", "!ok:hs"), room_timeout=1.0
+        )
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await notifier.flush("m1", ["hello"])
+        return recorder.sent, loop.time() - started
+
+    sent, elapsed = asyncio.run(run())
+    assert sent == [("m1", "!ok:hs", "hello")]
+    assert elapsed < 2.0
+
+
+def test_close_drops_pending_notifications():
+    async def run():
+        recorder = _Recorder()
+        notifier = _notifier(recorder, coalesce_window=10)
+        notifier.notify("m1", "pending")
+        await notifier.close()
+        await asyncio.sleep(0)
+        return recorder.sent
+
+    assert asyncio.run(run()) == []
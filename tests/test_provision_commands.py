@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from helpers import FakeEvent, build_plugin, run_command
+from matrix_admin.commands.provision_commands import ProvisionCommandsMixin
+
+
+class ProvisionClient:
+    user_id = "@bot:hs"
+
+    def __init__(self):
+        self.created = []
+        self.state = []
+
+    async def create_room(self, **kwargs):
+        self.created.append(kwargs)
+        return {"room_id": f"!room{len(self.created)}:hs"}
+
+    async def set_room_state_event(self, **kwargs):
+        self.state.append(kwargs)
+
+
+def _provision(template: dict):
+    client = ProvisionClient()
+    plugin = build_plugin(client, ProvisionCommandsMixin)
+    replies = run_command(plugin.cmd_provision(FakeEvent(), json.dumps(template)))
+    return client, replies
+
+
+@pytest.mark.parametrize(
+    ("template", "message"),
+    [
+        (
+            {"space": {"name": "S", "initial_state": 5}},
+            "initial_state 必须是列表",
+        ),
+        (
+            {"space": {"name": "S"}, "rooms": [{"name": "a", "initial_state": "x"}]},
+            "initial_state 必须是列表",
+        ),
+        (
+            {"space": {"name": "S"}, "defaults": {"power_levels": 50}, "rooms": [{}]},
+            "defaults.power_levels 必须是对象",
+        ),
+        (
+            {"space": {"name": "S"}, "rooms": [{"name": "a", "power_levels": [1]}]},
+            "power_levels 必须是对象",
+        ),
+        (
+            {"space": {"name": "S"}, "rooms": [{"join_rule": "open"}]},
+            "join_rule 无效：open",
+        ),
+        ({"space": {"name": "S"}, "rooms": ["a"]}, "rooms 必须是对象列表"),
+        ({"space": {}}, "缺少 space.name"),
+    ],
+)
+def test_invalid_templates_are_rejected_before_creating_rooms(template, message):
+    client, replies = _provision(template)
+    assert client.created == []
+    assert replies[0].startswith("模板格式无效")
+    assert message in replies[0]
+
+
+def test_valid_template_creates_space_and_linked_children():
+    client, replies = _provision(
+        {
+            "space": {"name": "活动"},
+            "defaults": {
+                "join_rule": "restricted",
+                "power_levels": {"users": {"@a:hs": 50}},
+            },
+            "rooms": [
+                {"name": "公告", "power_levels": {"users": {"@b:hs": 50}}},
+                {"name": "闲聊", "alias": "#chat:hs"},
+            ],
+        }
+    )
+    space, *children = client.created
+    assert space["creation_content"] == {"type": "m.space"}
+    assert len(children) == 2
+    news = next(kwargs for kwargs in children if kwargs["name"] == "公告")
+    assert news["power_level_content_override"]["users"] == {
+        "@a:hs": 50,
+        "@b:hs": 50,
+    }
+    join_rules = next(
+        item for item in news["initial_state"] if item["type"] == "m.room.join_rules"
+    )
+    assert join_rules["content"]["allow"] == [
+        {"type": "m.room_membership", "room_id": "!room1:hs"}
+    ]
+    chat = next(kwargs for kwargs in children if kwargs["name"] == "闲聊")
+    assert chat["room_alias_name"] == "chat"
+    assert {item["room_id"] for item in client.state} == {"!room1:hs"}
+    assert "子房间：成功 2 个，失败 0 个" in replies[0]
+
+
+@pytest.mark.parametrize("name", ["/etc/passwd", "../secret", "a/../../b", "~/t"])
+def test_template_paths_outside_template_dir_are_rejected(tmp_path, name):
+    plugin = build_plugin(None, ProvisionCommandsMixin)
+    plugin._provision_template_dir = lambda: tmp_path
+    with pytest.raises(ValueError, match="相对路径"):
+        plugin._resolve_template_path(name)
+
+
+def test_template_name_resolves_known_suffixes(tmp_path):
+    (tmp_path / "event.json").write_text("{}", encoding="utf-8")
+    plugin = build_plugin(None, ProvisionCommandsMixin)
+    plugin._provision_template_dir = lambda: tmp_path
+    assert plugin._resolve_template_path("event") == (tmp_path / "event.json").resolve()
+    with pytest.raises(ValueError, match="模板文件不存在"):
+        plugin._resolve_template_path("missing")
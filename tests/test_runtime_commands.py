@@ -0,0 +1,74 @@
+import asyncio
+
+from helpers import FakeEvent, build_plugin, run_command
+from matrix_admin.commands.runtime_commands import RuntimeCommandsMixin
+from matrix_admin.jobs import JobManager
+
+
+class _Meta:
+    def __init__(self, platform_id):
+        self.id = platform_id
+        self.name = "matrix"
+
+
+class FakePlatform:
+    def __init__(self, platform_id, running=True):
+        self.platform_id = platform_id
+        self.running = running
+        self.reconnects = 0
+        self.sync_success = 0
+
+    def meta(self):
+        return _Meta(self.platform_id)
+
+    def request_reconnect(self):
+        if not self.running:
+            return False
+        self.reconnects += 1
+        self.sync_success += 1
+        return True
+
+    def get_runtime_status(self):
+        return {"sync": {"sync_success_count": self.sync_success}}
+
+
+def _plugin(platforms, **attrs):
+    plugin = build_plugin(None, RuntimeCommandsMixin, **attrs)
+    plugin._matrix_platform_index = {p.platform_id: p for p in platforms}
+    plugin._RECONNECT_GATE_POLL = 0.01
+    return plugin
+
+
+def test_reconnect_all_runs_as_a_background_job():
+    platforms = [FakePlatform("m1"), FakePlatform("m2", running=False)]
+
+    async def run():
+        manager = JobManager()
+        plugin = _plugin(platforms, job_manager=manager)
+        replies = [
+            item async for item in plugin.cmd_reconnect(FakeEvent(), "all", "0", "gate")
+        ]
+        job = manager.get("1")
+        await job.task
+        return replies, job
+
+    replies, job = asyncio.run(run())
+    assert replies[0].startswith("已提交后台任务 #1：错峰重连 2 个适配器")
+    assert job.status == "done"
+    assert job.progress_text() == "2/2"
+    assert job.result.splitlines() == [
+        "错峰重连完成：",
+        "- ✅ m1：已重连，sync 已恢复",
+        "- ❌ m2：sync 当前未运行",
+    ]
+    assert platforms[0].reconnects == 1
+
+
+def test_reconnect_all_with_one_adapter_runs_inline():
+    platform = FakePlatform("m1")
+    replies = run_command(
+        _plugin([platform], job_manager=JobManager()).cmd_reconnect(
+            FakeEvent(), "all", "0"
+        )
+    )
+    assert replies == ["错峰重连完成：\n- ✅ m1：已请求重连"]
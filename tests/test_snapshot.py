@@ -0,0 +1,102 @@
+from snapshot import (
+    JOIN_RULES,
+    MEMBER,
+    POWER_LEVELS,
+    SPACE_CHILD,
+    diff_summaries,
+    plan_restore,
+    summarize_state,
+)
+
+ALL_TYPES = {POWER_LEVELS, JOIN_RULES, SPACE_CHILD}
+
+
+def _state(*items):
+    return [list(item) for item in items]
+
+
+def test_plan_restore_writes_only_changed_events():
+    saved = _state(
+        (JOIN_RULES, "", {"join_rule": "invite"}),
+        (POWER_LEVELS, "", {"users": {"@bot:hs": 100}}),
+    )
+    live = _state(
+        (JOIN_RULES, "", {"join_rule": "invite"}),
+        (POWER_LEVELS, "", {"users": {"@bot:hs": 100}}),
+    )
+    assert plan_restore(saved, live, ALL_TYPES) == []
+
+    live[0][2] = {"join_rule": "public"}
+    assert plan_restore(saved, live, ALL_TYPES) == [
+        (JOIN_RULES, "", {"join_rule": "invite"})
+    ]
+
+
+def test_plan_restore_ignores_unselected_types():
+    saved = _state((JOIN_RULES, "", {"join_rule": "invite"}))
+    live = _state((JOIN_RULES, "", {"join_rule": "public"}))
+    assert plan_restore(saved, live, {POWER_LEVELS}) == []
+
+
+def test_plan_restore_removes_live_only_space_children():
+    saved = _state((SPACE_CHILD, "!kept:hs", {"via": ["hs"]}))
+    live = _state(
+        (SPACE_CHILD, "!kept:hs", {"via": ["hs"]}),
+        (SPACE_CHILD, "!extra:hs", {"via": ["hs"]}),
+        (SPACE_CHILD, "!gone:hs", {}),
+    )
+    assert plan_restore(saved, live, ALL_TYPES) == [(SPACE_CHILD, "!extra:hs", {})]
+
+
+def test_plan_restore_skips_removed_link_missing_live():
+    saved = _state((SPACE_CHILD, "!old:hs", {}))
+    assert plan_restore(saved, [], ALL_TYPES) == []
+    live = _state((SPACE_CHILD, "!old:hs", {"via": ["hs"]}))
+    assert plan_restore(saved, live, ALL_TYPES) == [(SPACE_CHILD, "!old:hs", {})]
+
+
+def test_plan_restore_writes_power_levels_last():
+    saved = _state(
+        (POWER_LEVELS, "", {"users": {"@bot:hs": 50}}),
+        (SPACE_CHILD, "!a:hs", {"via": ["hs"]}),
+        (JOIN_RULES, "", {"join_rule": "invite"}),
+    )
+    writes = plan_restore(saved, [], ALL_TYPES)
+    assert [item[0] for item in writes] == [JOIN_RULES, SPACE_CHILD, POWER_LEVELS]
+
+
+def test_plan_restore_accepts_full_events():
+    saved = [{"type": JOIN_RULES, "state_key": "", "content": {"join_rule": "invite"}}]
+    live = _state((JOIN_RULES, "", {"join_rule": "invite"}))
+    assert plan_restore(saved, live, ALL_TYPES) == []
+
+
+def _members(count, membership):
+    return _state(
+        *((MEMBER, f"@u{i}:hs", {"membership": membership}) for i in range(count))
+    )
+
+
+def test_diff_summaries_truncates_member_changes():
+    old = summarize_state(_members(8, "join"))
+    new = summarize_state(_members(8, "leave"))
+    lines = diff_summaries(old, new, member_samples=3)
+    assert len(lines) == 4
+    assert lines[0] == "成员 @u0:hs：join -> leave"
+    assert lines[-1] == "成员变化共 8 项（仅显示前 3 项）"
+
+
+def test_diff_summaries_no_truncation_note_within_limit():
+    old = summarize_state(_members(2, "join"))
+    new = summarize_state(_members(2, "ban"))
+    lines = diff_summaries(old, new, member_samples=5)
+    assert len(lines) == 2
+    assert all(line.startswith("成员 ") for line in lines)
+
+
+def test_diff_summaries_identical_states():
+    state = _state(
+        (JOIN_RULES, "", {"join_rule": "invite"}),
+        (SPACE_CHILD, "!a:hs", {"via": ["hs"]}),
+    )
+    assert diff_summaries(summarize_state(state), summarize_state(state)) == []
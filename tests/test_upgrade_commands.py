@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+from helpers import FakeEvent, build_plugin, run_command
+from matrix_admin.commands import upgrade_commands
+from matrix_admin.commands.upgrade_commands import UpgradeCommandsMixin
+from matrix_admin.tool import load_json_file
+
+
+def _state(version, alias=None, tombstone_sender=None, replacement=None):
+    events = [
+        {"type": "m.room.create", "state_key": "", "content": {"room_version": version}}
+    ]
+    if alias:
+        events.append(
+            {
+                "type": "m.room.canonical_alias",
+                "state_key": "",
+                "content": {"alias": alias},
+            }
+        )
+    if tombstone_sender:
+        events.append(
+            {
+                "type": "m.room.tombstone",
+                "state_key": "",
+                "sender": tombstone_sender,
+                "content": {"replacement_room": replacement},
+            }
+        )
+    return events
+
+
+class UpgradeClient:
+    user_id = "@bot:hs"
+
+    def __init__(self, rooms, aliases=None, fail_alias_to=()):
+        self.rooms = rooms
+        self.aliases = dict(aliases or {})
+        self.fail_alias_to = set(fail_alias_to)
+        self.upgraded = []
+
+    async def get_joined_rooms(self):
+        return list(self.rooms)
+
+    async def get_room_state(self, room_id):
+        return self.rooms[room_id]
+
+    async def get_power_levels(self, room_id):
+        return {"users": {self.user_id: 100}}
+
+    async def upgrade_room(self, room_id, new_version):
+        self.upgraded.append(room_id)
+        return {"replacement_room": f"{room_id}-v{new_version}"}
+
+    async def get_room_alias(self, alias):
+        if alias not in self.aliases:
+            raise RuntimeError("M_NOT_FOUND")
+        return {"room_id": self.aliases[alias]}
+
+    async def delete_room_alias(self, alias):
+        self.aliases.pop(alias)
+
+    async def create_room_alias(self, alias, room_id):
+        if room_id in self.fail_alias_to:
+            raise RuntimeError("M_FORBIDDEN")
+        self.aliases[alias] = room_id
+
+    async def get_room_state_event(self, room_id, event_type, state_key=""):
+        return {}
+
+    async def set_room_state_event(self, room_id, event_type, content, state_key=""):
+        return {}
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(upgrade_commands, "get_plugin_data_dir", lambda: tmp_path)
+    return tmp_path
+
+
+def test_alias_is_restored_to_old_room_when_repointing_fails():
+    client = UpgradeClient({}, {"#a:hs": "!old:hs"}, fail_alias_to={"!new:hs"})
+    plugin = build_plugin(client, UpgradeCommandsMixin)
+
+    warnings = asyncio.run(
+        plugin._migrate_room_aliases(client, "!old:hs", "!new:hs", ["#a:hs"], {})
+    )
+
+    assert client.aliases == {"#a:hs": "!old:hs"}
+    assert warnings == ["别名 #a:hs 迁移失败，已恢复指向旧房间：M_FORBIDDEN"]
+
+
+def test_alias_moves_to_new_room():
+    client = UpgradeClient({}, {"#a:hs": "!old:hs", "#b:hs": "!other:hs"})
+    plugin = build_plugin(client, UpgradeCommandsMixin)
+
+    warnings = asyncio.run(
+        plugin._migrate_room_aliases(
+            client, "!old:hs", "!new:hs", ["#a:hs", "#b:hs", "#gone:hs"], {}
+        )
+    )
+
+    assert client.aliases == {"#a:hs": "!new:hs", "#b:hs": "!other:hs"}
+    assert warnings == []
+
+
+def test_upgradebulk_resumes_from_checkpoint(data_dir):
+    rooms = {
+        "!done:hs": _state("9"),
+        "!half:hs": _state("9", tombstone_sender="@bot:hs", replacement="!half2:hs"),
+        "!crashed:hs": _state(
+            "9", alias="#c:hs", tombstone_sender="@bot:hs", replacement="!c2:hs"
+        ),
+        "!foreign:hs": _state("9", tombstone_sender="@mod:hs", replacement="!f2:hs"),
+        "!current:hs": _state("10"),
+        "!fresh:hs": _state("9"),
+    }
+    client = UpgradeClient(rooms, {"#c:hs": "!crashed:hs"})
+    plugin = build_plugin(client, UpgradeCommandsMixin)
+    checkpoint_path = plugin._upgrade_checkpoint_path("10", "all")
+    checkpoint_path.parent.mkdir(parents=True)
+    checkpoint_path.write_text(
+        '{"rooms": {"!done:hs": {"status": "upgraded"},'
+        ' "!half:hs": {"status": "upgrading", "replacement_room": "!half2:hs"}}}',
+        encoding="utf-8",
+    )
+
+    replies = run_command(plugin.cmd_upgrade_bulk(FakeEvent(), "10", "all"))
+
+    assert "待处理 5 个（检查点已完成 1 个）" in replies[0]
+    assert replies[1].startswith("批量升级完成：升级 3 个，跳过 2 个，失败 0 个")
+    # 中断后的房间不再重复 upgrade_room，只补完迁移
+    assert client.upgraded == ["!fresh:hs"]
+    assert client.aliases == {"#c:hs": "!c2:hs"}
+    rooms_record = load_json_file(checkpoint_path, {})["rooms"]
+    assert {rid: r["status"] for rid, r in rooms_record.items()} == {
+        "!done:hs": "upgraded",
+        "!half:hs": "upgraded",
+        "!crashed:hs": "upgraded",
+        "!foreign:hs": "skipped",
+        "!current:hs": "skipped",
+        "!fresh:hs": "upgraded",
+    }
+    assert rooms_record["!fresh:hs"]["replacement_room"] == "!fresh:hs-v10"
@@ -1,7 +1,46 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+from pathlib import Path
+
 from astrbot.api import logger
 
+PLUGIN_NAME = "astrbot_plugin_matrix_admin"
+
+
+def get_plugin_data_dir() -> Path:
+    try:
+        from astrbot.api.star import StarTools
+
+        data_dir = Path(StarTools.get_data_dir(PLUGIN_NAME))
+    except Exception:
+        from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+
+        data_dir = Path(get_astrbot_data_path()) / "plugin_data" / PLUGIN_NAME
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
+
+
+def load_json_file(path: Path, default=None):
+    try:
+        with open(path, encoding="utf-8") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return default
+    except Exception as exc:
+        logger.warning(f"[MatrixAdmin] 读取 {path} 失败，已忽略：{exc}")
+        return default
+
+
+def write_json_file_atomic(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fp:
+        json.dump(data, fp, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
 
 def normalize_room_ids(raw_rooms) -> list[str]:
     if isinstance(raw_rooms, str):
@@ -77,16 +116,38 @@ def split_reason_and_room_id(reason_or_room: str) -> tuple[str, str]:
     return raw, ""
 
 
-def apply_admin_room_config(plugin) -> None:
+def admin_room_config_version(*parts) -> str:
+    """对下发给验证模块的配置计算版本号，用于判断是否需要重新下发。"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def apply_admin_room_config(
+    plugin,
+    adapter_ids: list[str] | None = None,
+    force: bool = False,
+) -> int:
+    """向验证模块下发通知配置，返回实际下发的 adapter 数量。
+
+    已下发的配置按 adapter 记录在 plugin._admin_room_config_applied 中
+    （版本号 + 验证模块对象 id），配置与验证模块均未变化时跳过。
+    adapter_ids 为 None 时处理全部 adapter，并清理已消失 adapter 的记录。
+    """
     matrix_utils_cls = plugin._get_matrix_utils_cls()
     if matrix_utils_cls is None:
-        return
-
-    adapter_ids = matrix_utils_cls.list_matrix_platform_ids(plugin.context)
+        return 0
+
+    applied = plugin._admin_room_config_applied
+    full_pass = adapter_ids is None
+    if full_pass:
+        adapter_ids = matrix_utils_cls.list_matrix_platform_ids(plugin.context)
+        for stale_id in set(applied) - set(adapter_ids or []):
+            applied.pop(stale_id, None)
     if not adapter_ids:
         logger.debug("[MatrixAdmin] 未发现 Matrix adapter，跳过验证通知配置下发")
-        return
+        return 0
 
+    pushed = 0
     for adapter_id in adapter_ids:
         e2ee_manager = matrix_utils_cls.get_matrix_e2ee_manager(
             plugin.context,
@@ -97,9 +158,15 @@ def apply_admin_room_config(plugin) -> None:
             getattr(e2ee_manager, "_verification", None) if e2ee_manager else None
         )
         if not verification:
+            applied.pop(adapter_id, None)
             continue
 
         rooms = plugin.verify_room_templates.get(adapter_id, [])
+        version = admin_room_config_version(rooms, plugin.verify_room_id)
+        marker = (version, id(verification))
+        if not force and applied.get(adapter_id) == marker:
+            continue
+
         verification.set_admin_notify_rooms(rooms)
         verification.set_admin_notify_room(plugin.verify_room_id)
         logger.debug(
@@ -108,3 +175,6 @@ def apply_admin_room_config(plugin) -> None:
             rooms,
             bool(plugin.verify_room_id),
         )
+        applied[adapter_id] = marker
+        pushed += 1
+    return pushed